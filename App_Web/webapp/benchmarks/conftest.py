@@ -0,0 +1,39 @@
+"""Fixtures for the protocol benchmarks - the recorded hub traffic"""
+
+import os
+import random
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))  # webapp/, so "mpy.protocol" imports as in the browser
+
+from mpy.protocol import FrameDemux  # noqa: E402
+
+TRAFFIC = os.path.join(HERE, "data", "hub_traffic.txt")
+
+
+@pytest.fixture(scope="session")
+def traffic():
+    """Recorded hub output (see record_traffic.py): framed lines plus the plain prints from boot"""
+    with open(TRAFFIC, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="session")
+def traffic_messages(traffic):
+    """The recorded traffic as (channel, payload) pairs"""
+    return FrameDemux().feed(traffic)
+
+
+@pytest.fixture(scope="session")
+def data_payloads(traffic_messages):
+    """JSON payloads of the recorded data channel"""
+    return [payload for channel, payload in traffic_messages if channel == "D"]
+
+
+@pytest.fixture
+def rng():
+    return random.Random(42)
+
@@ -0,0 +1,44 @@
+"""
+Record hub serial output for the benchmarks (data/hub_traffic.txt).
+
+Runs hubCode with some modules in the emulator (Emulator/), sends it the
+commands the webapp would and saves everything the hub printed, frames
+and all, exactly as the webapp would read it.
+
+    python record_traffic.py --modules 12
+"""
+
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "..", "Emulator"))
+
+from mpyemu import Emulator, Radio  # noqa: E402
+
+COMMANDS = ["PING", "Shake", "stats", "Flash", "PING", "Notes", "Stop_show", "stats", "PING", "Rainbow"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, default=12)
+    parser.add_argument("--loss", type=float, default=0.05)
+    parser.add_argument("--out", default=os.path.join(HERE, "data", "hub_traffic.txt"))
+    args = parser.parse_args()
+
+    with Emulator(Radio(latency_ms=2, loss=args.loss, seed=7)) as emu:
+        hub = emu.add_hub()
+        for i in range(args.modules):
+            emu.add_module(f"plush{i + 1}", pos=(1 + i % 4 * 2.5, i // 4 * 2.5), boot_ms=41 * i)
+        emu.run(3)
+        for command in COMMANDS:
+            hub.serial.send_json({"cmd": command})
+            emu.run(2)
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            f.write(hub.serial.text() + "\n")
+        print(f"{len(hub.serial.lines)} lines -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmarks for the webapp's receive path (mpy/protocol.py) on CPython.
+
+    pip install pytest pytest-benchmark
+    python -m pytest benchmarks                       # from App_Web/webapp
+    python -m pytest benchmarks --benchmark-autosave  # keep a baseline ...
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%  # ... and fail on regressions
+
+Each benchmark also checks its result, so a fast wrong answer fails too.
+"""
+
+import json
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from mpy.protocol import (BleFramer, FrameDemux, HubMessages, battery_level, format_device,  # noqa: E402
+                          parse_hub_response, signal_bars)
+from traffic import chunks, device_list, frame  # noqa: E402
+
+
+def handle_all(messages):
+    """Run (channel, payload) pairs through HubMessages like the bridge in main.py does"""
+    hub = HubMessages()
+    events = 0
+    for channel, payload in messages:
+        if channel == "D" and hub.handle(payload) is not None:
+            events += 1
+    return hub, events
+
+
+def test_recorded_serial_traffic(benchmark, traffic, rng):
+    """The recorded session, in reads that end anywhere, through the demux and message handler"""
+    reads = chunks(traffic, rng)
+
+    def receive():
+        demux = FrameDemux()
+        messages = []
+        for data in reads:
+            messages.extend(demux.feed(data))
+        return demux, handle_all(messages)
+
+    demux, (hub, events) = benchmark(receive)
+    assert demux.errors == 0
+    assert events > 0 and hub.errors == 0
+    assert len(hub.devices) == 12
+
+
+def test_serial_noise(benchmark, traffic, rng):
+    """Recorded traffic with corrupted frames and unframed prints mixed in"""
+    lines = [line + "\n" for line in traffic.split("\n") if line]  # not splitlines(), frames start with \x1e
+    noisy = []
+    for line in lines:
+        noisy.append(line)
+        if rng.random() < 0.2:
+            noisy.append(line[:len(line) // 2] + "X" + line[len(line) // 2 + 1:])  # bad checksum or length
+        if rng.random() < 0.1:
+            noisy.append("Traceback (most recent call last):\n")
+    reads = chunks("".join(noisy), rng)
+
+    def receive():
+        demux = FrameDemux()
+        count = 0
+        for data in reads:
+            count += len(demux.feed(data))
+        return demux, count
+
+    demux, count = benchmark(receive)
+    assert demux.errors > 0
+    assert count >= len(lines)
+
+
+@pytest.mark.parametrize("mtu", [20, 100])
+def test_ble_fragment_storm(benchmark, data_payloads, rng, mtu):
+    """Every recorded data message framed for BLE and cut into MTU-sized notifications"""
+    stream = "".join(f"MSG:{len(payload)}|{payload}" for payload in data_payloads * 10)
+    fragments = chunks(stream, rng, 1, mtu)
+
+    def receive():
+        framer = BleFramer()
+        out = []
+        for i, fragment in enumerate(fragments):
+            out.extend(framer.feed(fragment, i * 0.001))
+        return out
+
+    out = benchmark(receive)
+    assert out == data_payloads * 10
+
+
+def test_ble_timeout_drops_partial(benchmark, data_payloads):
+    """A message cut off mid-way is dropped after the timeout; the next one still arrives"""
+    payload = data_payloads[-1]
+    first = f"MSG:{len(payload)}|{payload[:10]}"
+    second = f"MSG:{len(payload)}|{payload}"
+
+    def receive():
+        framer = BleFramer()
+        out = framer.feed(first, 0.0)
+        out += framer.feed(second, 5.0)
+        return out
+
+    assert benchmark(receive) == [payload]
+
+
+@pytest.mark.parametrize("n", [50, 500])
+def test_large_device_list(benchmark, n):
+    """A big scan result: dedupe by MAC, bucket RSSI and battery, sanitize ids"""
+    message = device_list(n)
+    text = json.dumps(message)
+
+    def receive():
+        return HubMessages().handle(text)
+
+    kind, devices = benchmark(receive)
+    assert kind == "devices"
+    assert len(devices) == n
+    assert devices[0]["id"] == "Plush-0-x"
+
+
+def test_scan_stream(benchmark):
+    """One "device" message per module as the scan runs, then the final list"""
+    message = device_list(200, duplicates=0)
+    lines = [json.dumps({"type": "device", "device": dev}) for dev in message["list"]]
+    lines.append(json.dumps(message))
+    serial = "".join(frame("D", line) for line in lines)
+
+    def receive():
+        hub = HubMessages()
+        hub.start_scan()
+        for _, payload in FrameDemux().feed(serial):
+            event = hub.handle(payload)
+        return hub, event
+
+    hub, (kind, devices) = benchmark(receive)
+    assert kind == "devices" and len(devices) == 200
+    assert len(hub.scan_results) == 200
+
+
+def test_malformed_json(benchmark, data_payloads):
+    """Truncated, garbled and wrongly typed messages are counted, not raised"""
+    rng = random.Random(3)
+    bad = []
+    for payload in data_payloads:
+        bad.append(payload[:rng.randint(1, len(payload) - 1)])        # truncated
+        bad.append(payload.replace(":", "", 1))                        # garbled
+    bad += ['{"type": "devices", "list": 5}', '{"type": "device"}', "[1, 2]", "{", "{}"]
+
+    def receive():
+        hub = HubMessages()
+        for text in bad:
+            hub.handle(text)
+        return hub
+
+    hub = benchmark(receive)
+    assert hub.errors > len(data_payloads)
+
+
+def test_truncated_device_list_repair():
+    """The one repair parse_hub_response tries: close a list cut off inside a string"""
+    assert parse_hub_response('{"type": "devices", "list": ["a') == {"type": "devices", "list": ["a"]}
+    assert parse_hub_response('{"type": ') is None
+
+
+def test_buckets(benchmark):
+    """RSSI and battery bucketing over their whole range"""
+    def bucket():
+        return [(signal_bars(v - 110), battery_level(v)) for v in range(101)]
+
+    result = benchmark(bucket)
+    assert result[0] == (0, "low") and result[100] == (3, "full")
+    assert format_device({"id": "a b_c!", "rssi": -60, "battery": 60})["id"] == "a-b-c"
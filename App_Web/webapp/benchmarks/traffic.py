@@ -0,0 +1,35 @@
+"""Generators for hub traffic the recording doesn't cover"""
+
+import random
+
+from mpy.protocol import FRAME_START
+
+
+def frame(channel, payload):
+    """One hub output line, as SerialBridge in hubCode/main.py writes it"""
+    checksum = sum(payload.encode("utf-8")) & 0xFF
+    return f"{FRAME_START}{channel}{len(payload)}:{payload}{checksum:02x}\n"
+
+
+def chunks(text, rng, low=1, high=64):
+    """Split text at random points, like serial reads and BLE notifications end anywhere"""
+    out = []
+    i = 0
+    while i < len(text):
+        n = rng.randint(low, high)
+        out.append(text[i:i + n])
+        i += n
+    return out
+
+
+def device_list(n, duplicates=0.1, seed=1):
+    """A hub "devices" message with n modules, some listed twice"""
+    rng = random.Random(seed)
+    devices = []
+    for i in range(n):
+        dev = {"id": f"Plush_{i} x", "mac": f"30:ae:a4:{i >> 8 & 0xff:02x}:{i & 0xff:02x}:00",
+               "rssi": rng.randint(-100, -30), "battery": rng.randint(0, 100), "type": "plushie"}
+        devices.append(dev)
+        if rng.random() < duplicates:
+            devices.append(dict(dev, rssi=dev["rssi"] - 3))
+    return {"type": "devices", "list": devices, "done": True}
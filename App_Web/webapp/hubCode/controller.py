@@ -1,41 +1,85 @@
 from machine import SoftI2C, Pin, ADC
-import time, json
-import ubinascii
+import time
 
 import  utilities.now as now
+import utilities.ota as ota
+import utilities.wire as wire
 
 ROW = 10
+GAMES = range(-1, 7)   # -1 stops the game, 0-6 as in main.py GAME_MAP
 
 class Control:
-    def connect(self):
+    def connect(self, callback = None):
         def my_callback(msg, mac, rssi):
             if not ('/ping' in msg):
                 print(mac, msg, rssi)
 
-        self.n = now.Now(my_callback)
+        self.n = now.Now(callback if callback else my_callback)
         self.n.connect(False)
+        self.ota_sender = None
         self.mac = self.n.wifi.config('mac')
         print(self.mac)
+        self.packets()
+        
+    def packets(self):
+        # every control and game message packed once; sending patches seq/rssi/at in place
+        self.ping_packet = wire.Packet('/ping', 1)
+        self.beacon_packet = wire.Packet('/time', 0)
+        self.notify_packet = wire.Packet('/notify', 1, seq = True)
+        self.scan_packet = wire.Packet('/scan', (1, 0, 0, 0), seq = True)
+        # game_packets[layout][game], layout = 2 if rssi is sent + 1 if at is
+        self.game_packets = [{game: wire.Packet('/game', game, True, layout & 2, layout & 1) for game in GAMES}
+                             for layout in range(4)]
+        
+    def game_packet(self, game, rssi = None, at = None):
+        packets = self.game_packets[(2 if rssi is not None else 0) | (1 if at is not None else 0)]
+        packet = packets.get(game)
+        if packet is None:
+            packet = packets[game] = wire.Packet('/game', game, True, rssi is not None, at is not None)
+        return packet.fill(self.n.next_seq(), rssi, at)
         
     def shutdown(self):
-        stop = json.dumps({'topic':'/game', 'value':-1})
-        self.n.publish(stop)
+        self.n.broadcast(self.game_packet(-1))
         
     def ping(self):
-        ping = json.dumps({'topic':'/ping', 'value':1})
-        self.n.publish(ping)
+        self.n.publish(self.ping_packet.buf)
+        
+    def beacon(self):
+        # hub clock for module time sync - sent as late as possible before the radio
+        self.n.publish(self.beacon_packet.set(time.ticks_ms()))
         
     def notify(self):
-        note = json.dumps({'topic':'/notify', 'value':1})
-        self.n.publish(note)
+        self.n.broadcast(self.notify_packet.fill(self.n.next_seq()))
         print('notified')
         
-    def choose(self, game):
-        encoded_bytes = ubinascii.b2a_base64(self.mac)
-        encoded_string = encoded_bytes.decode('ascii')
-
-        setup = json.dumps({'topic':'/game', 'value':(game,encoded_string)})
-        self.n.publish(setup)
+    def scan(self, slots = 1, nonce = 0, slot_ms = 0, scan = 0):
+        # modules answer in slot hash(mac, nonce) % slots, each slot_ms wide;
+        # the ones whose reply we acked earlier in scan 'scan' stay quiet
+        self.scan_packet.set(slots, nonce, slot_ms, scan)
+        self.n.broadcast(self.scan_packet.fill(self.n.next_seq()))
+        
+    def show(self, program, rssi = None, at = None):
+        # one packet per light show - modules render it locally from 'at'
+        self.n.broadcast(wire.encode('/show', program, self.n.next_seq(), rssi, at))
+        
+    async def distribute(self, files, reset = False, progress = None):
+        # OTA: push [(hub path, module path), ...] to every module in range
+        # returns {module path: macs still missing chunks}
+        self.ota_sender = ota.Sender(self.n)
+        try:
+            return await self.ota_sender.send_bundle(files, reset, progress)
+        finally:
+            self.ota_sender = None
+        
+    def choose(self, game, macs = None, rssi = None, at = None):
+        # rssi: only modules hearing us at >= rssi dBm act on it
+        # at: start at this hub ticks_ms on every module
+        # modules take the controller mac from the ESP-NOW header
+        setup = self.game_packet(game, rssi, at)
+        if macs:
+            return self.n.publish_to(macs, setup)   # macs that did not ack
+        self.n.broadcast(setup)
+        return []
 
 
 class Display:
@@ -9,16 +9,36 @@ Hardware: ESP32-C6 with external antenna
 """
 
 import sys
-import select
+import gc
 import json
 import time
+import random
 import asyncio
+import ubinascii
+from collections import deque
 import utilities.now as now
+import utilities.ota as ota
+import utilities.wire as wire
 from controller import Control
 
 # Try to import display support
 ROW_HEIGHT = 10  # Pixels per line on 128x64 display (can fit 6 lines)
 MAX_DISPLAY_LINES = 6
+DISPLAY_MIN_MS = 100  # At most one display refresh per this many ms
+
+# Device scan settings (slotted replies, see start_scan)
+SCAN_SLOT_MS = 20      # Width of one reply slot
+SCAN_MIN_SLOTS = 8     # Fewest slots in a round (more for the modules known to be around)
+SCAN_MAX_SLOTS = 256   # Upper bound when widening after collisions
+SCAN_MAX_ROUNDS = 5    # Rounds per scan - later ones only hold the modules not heard yet
+SCAN_GUARD_MS = 250    # Extra wait after the last slot for late replies
+RX_QUEUE_SIZE = 64     # ESP-NOW messages buffered between IRQ and event loop
+TIME_BEACON_MS = 1000  # Period of the /time beacon modules sync their clocks to
+START_DELAY_MS = 1000  # Games start this long after the command, on every module at once - covers the
+                       # module's queue poll (100 ms), stopping its game (one loop, up to 500 ms)
+                       # and its two switch animations (~270 ms), so `at` is still ahead when it gets there
+OTA_DIR = "ota"        # Files for over-the-air module updates live here on the hub
+STATS_TICK_MS = 100    # Period of the stats task that measures event-loop lag
 
 try:
     from machine import I2C, SoftI2C, Pin
@@ -38,48 +58,77 @@ GAME_MAP = {
     "Off": 6,          # Hibernate game → deep sleep
 }
 
+# Light shows run locally on the modules (see Plushie_Module/utilities/show.py)
+# k: keyframes [color, ms] (color = index into the modules' COLORS or [r, g, b])
+# n: passes (0 = until the next command), led/dt: ms delay per LED / per module
+SHOW_MAP = {
+    "Flash": {"k": [[8, 0], [8, 150], [[0, 0, 0], 150]], "n": 3},
+    "Wave": {"k": [[3, 300], [[0, 0, 0], 300]], "n": 4, "dt": 150},
+    "Chase": {"k": [[0, 200], [1, 200], [2, 200], [3, 200], [4, 200], [5, 200], [6, 200], [7, 200]], "n": 0, "led": 80},
+    "Twinkle": {"k": [[8, 200], [[0, 0, 0], 600]], "n": 5, "dt": 100},
+    "Stop_show": {"k": []},
+}
+
+# Serial frames (hub -> webapp): FRAME_START, channel, payload length, ':',
+# payload, 2 hex digit checksum (sum of the payload's UTF-8 bytes), newline.
+# stdout and stderr share one USB CDC stream, so the channel tells the webapp what
+# each line is without parsing it, and muted channels cost nothing.
+FRAME_START = "\x1e"
+CH_DATA = "D"       # JSON for the webapp (acks, devices, ...)
+CH_DEBUG = "G"      # human-readable debug text
+CH_TELEMETRY = "T"  # JSON statistics
+CH_REPL = "R"       # hub program state, so the host knows when the REPL is free
+
+def frame(channel, payload):
+    """Wrap one payload string in a serial frame (without the newline)"""
+    return f"{FRAME_START}{channel}{len(payload)}:{payload}{sum(payload.encode()) & 0xff:02x}"
+
 class SerialBridge:
     """Handle USB Serial communication with webapp"""
     
-    def __init__(self, command_callback, debug_callback):
+    def __init__(self, command_callback, debug_callback, stats=None):
         """
         Initialize serial bridge
         
         Args:
             command_callback: Function to call with (cmd_type, cmd_data)
             debug_callback: Function to call for debug messages
+            stats: HubStats counting the messages sent
         """
         self.command_callback = command_callback
         self.debug = debug_callback
+        self.stats = stats
         self.buffer = ""
+        self.muted = set()  # channels the webapp asked us not to send
     
-    def send(self, data):
-        """Send JSON message to webapp via Serial"""
+    def send(self, data, channel=CH_DATA):
+        """Send a message to webapp via Serial - dicts go as JSON, strings as they are"""
+        if channel in self.muted:
+            return
         try:
-            msg = json.dumps(data)
-            print(msg)  # Print to stdout (USB Serial) - JSON only!
+            payload = data if isinstance(data, str) else json.dumps(data)
+            print(frame(channel, payload))
+            if self.stats:
+                self.stats.msg_tx += 1
         except Exception as e:
-            self.debug("Ser TX Err")
+            if channel != CH_DEBUG:
+                self.debug("Ser TX Err")
     
-    def check_input(self):
-        """Check for incoming Serial data (non-blocking)"""
-        # Use select to check if stdin has data
-        rlist, _, _ = select.select([sys.stdin], [], [], 0)
-        
-        if rlist:
+    def log(self, msg):
+        """Send a debug line on the debug channel"""
+        self.send(str(msg).replace("\n", " "), CH_DEBUG)
+    
+    async def read_loop(self):
+        """Command task - sleeps until a line arrives on USB Serial, then dispatches it"""
+        reader = asyncio.StreamReader(sys.stdin)
+        while True:
             try:
-                # Read available data
-                chunk = sys.stdin.read(1)
-                if chunk:
-                    self.buffer += chunk
-                    
-                    # Check for complete lines
-                    while '\n' in self.buffer:
-                        line, self.buffer = self.buffer.split('\n', 1)
-                        line = line.strip()
-                        
-                        if line:
-                            self._process_command(line)
+                line = await reader.readline()
+                if isinstance(line, bytes):
+                    line = line.decode()
+                line = line.strip()
+                if line:
+                    self._process_command(line)
             except Exception as e:
                 self.debug("Ser RX Err")
     
@@ -88,17 +137,31 @@ class SerialBridge:
         try:
             cmd = json.loads(line)
             cmd_type = cmd.get("cmd")
+            if cmd_type == "mute":
+                # {"cmd": "mute", "channel": "G", "on": true} - the data channel always stays on
+                channel = cmd.get("channel", CH_DEBUG)
+                if not cmd.get("on", True):
+                    self.muted.discard(channel)
+                elif channel != CH_DATA:
+                    self.muted.add(channel)
+                return
             self.command_callback(cmd_type, cmd)
         except Exception as e:
             self.debug("CMD Err")
 
 class HubDisplay:
-    """Simple rolling display for hub debug messages"""
+    """Rolling display for hub debug messages.
+    
+    update() only queues the message; run() draws queued messages at most every
+    DISPLAY_MIN_MS by scrolling the framebuffer and sends only the pages that changed.
+    """
     
     def __init__(self):
         """Initialize SSD1306 display if available"""
         self.display = None
-        self.lines = []
+        self.pending = deque([], MAX_DISPLAY_LINES)  # older messages would scroll off anyway
+        self.count = 0      # lines on screen
+        self.shadow = None  # what the panel shows now
         
         if not DISPLAY_AVAILABLE:
             return
@@ -113,38 +176,70 @@ class HubDisplay:
             self.display.fill(0)
             self.display.text("Hub Starting...", 2, 2, 1)
             self.display.show()
+            self.count = 1
+            self.shadow = bytearray(self.display.buffer)
             print("Display initialized successfully", file=sys.stderr)
         except Exception as e:
             self.display = None
             print(f"Display not available: {e}", file=sys.stderr)
     
     def update(self, msg):
-        """Update display with new message (rolling buffer)"""
+        """Queue a message for the next render - no display I/O here"""
         if not self.display:
             return
         
-        try:
-            # Truncate message to fit display width (~20 chars at 6x8 font)
-            if len(msg) > 20:
-                msg = msg[:17] + "..."
-            
-            # Add to rolling buffer
-            self.lines.append(msg)
-            if len(self.lines) > MAX_DISPLAY_LINES:
-                self.lines = self.lines[-MAX_DISPLAY_LINES:]
-            
-            # Clear and redraw all lines
-            self.display.fill(0)
-            y = 2
-            for line in self.lines:
-                self.display.text(line, 2, y, 1)
-                y += ROW_HEIGHT
-            
-            self.display.show()
-        except Exception as e:
-            # If display update fails, disable it
-            print(f"Display update error: {e}", file=sys.stderr)
-            self.display = None
+        # Truncate message to fit display width (~20 chars at 6x8 font)
+        if len(msg) > 20:
+            msg = msg[:17] + "..."
+        self.pending.append(msg)
+    
+    async def run(self):
+        """Render task - draws queued messages at most every DISPLAY_MIN_MS"""
+        while self.display:
+            if self.pending:
+                try:
+                    self._render()
+                except Exception as e:
+                    # If display update fails, disable it
+                    print(f"Display update error: {e}", file=sys.stderr)
+                    self.display = None
+            await asyncio.sleep_ms(DISPLAY_MIN_MS)
+    
+    def _render(self):
+        """Scroll up to make room for the queued lines and draw them at the bottom"""
+        lines = []
+        while self.pending:
+            lines.append(self.pending.popleft())
+        
+        d = self.display
+        shift = self.count + len(lines) - MAX_DISPLAY_LINES
+        if shift >= MAX_DISPLAY_LINES or shift > self.count:
+            d.fill(0)
+            self.count = 0
+        elif shift > 0:
+            d.scroll(0, -shift * ROW_HEIGHT)
+            self.count -= shift
+            top = 2 + self.count * ROW_HEIGHT
+            d.fill_rect(0, top, d.width, d.height - top, 0)
+        
+        for line in lines:
+            d.text(line, 2, 2 + self.count * ROW_HEIGHT, 1)
+            self.count += 1
+        self._flush()
+    
+    def _flush(self):
+        """Send the pages between the first and last one that differ from the panel"""
+        d = self.display
+        w = d.width
+        buf = d.buffer
+        changed = [p for p in range(d.pages) if buf[p * w:(p + 1) * w] != self.shadow[p * w:(p + 1) * w]]
+        # pages that match the shadow are already on the panel, so after this nothing is dirty
+        d.dirty = None
+        if not changed:
+            return
+        start, end = changed[0] * w, (changed[-1] + 1) * w
+        d.show_region(0, w - 1, changed[0], changed[-1])
+        self.shadow[start:end] = buf[start:end]
     
     def close(self):
         """Display shutdown message"""
@@ -156,35 +251,118 @@ class HubDisplay:
             except:
                 pass
 
+class HubStats:
+    """Runtime counters and gauges, sent to the webapp by the stats command"""
+    
+    def __init__(self):
+        self.start = time.ticks_ms()
+        self.cmd_rx = 0         # commands from the webapp
+        self.msg_tx = 0         # messages to the webapp
+        self.queue_drops = 0    # ESP-NOW messages lost to a full rx queue
+        self.rx_per_s = 0
+        self.reset()
+    
+    def reset(self):
+        """Restart the high-water marks and minimums"""
+        self.queue_hwm = 0
+        self.lag_ms = 0
+        self.lag_max_ms = 0
+        self.mem_free_min = gc.mem_free()
+    
+    def queued(self, depth):
+        """Record the rx queue depth after a message was added"""
+        if depth > self.queue_hwm:
+            self.queue_hwm = depth
+    
+    async def run(self, now):
+        """Stats task - a late wake-up is event-loop lag; also samples memory and rx rate"""
+        last = time.ticks_ms()
+        second = last
+        rx_last = now.rx_count
+        while True:
+            await asyncio.sleep_ms(STATS_TICK_MS)
+            t = time.ticks_ms()
+            self.lag_ms = max(0, time.ticks_diff(t, last) - STATS_TICK_MS)
+            self.lag_max_ms = max(self.lag_max_ms, self.lag_ms)
+            self.mem_free_min = min(self.mem_free_min, gc.mem_free())
+            last = t
+            elapsed = time.ticks_diff(t, second)
+            if elapsed >= 1000:
+                self.rx_per_s = round((now.rx_count - rx_last) * 1000 / elapsed, 1)
+                rx_last = now.rx_count
+                second = t
+    
+    def snapshot(self, hub):
+        return {
+            "type": "stats",
+            "uptime_ms": time.ticks_diff(time.ticks_ms(), self.start),
+            "cmd_rx": self.cmd_rx,
+            "msg_tx": self.msg_tx,
+            "tx_ok": hub.n.tx_ok,
+            "tx_fail": hub.n.tx_fail,
+            "rx": hub.n.rx_count,
+            "rx_per_s": self.rx_per_s,
+            "queue": len(hub.queue),
+            "queue_hwm": self.queue_hwm,
+            "queue_drops": self.queue_drops,
+            "rx_dropped": hub.n.rx_dropped(),
+            "loop_lag_ms": self.lag_ms,
+            "loop_lag_max_ms": self.lag_max_ms,
+            "mem_free": gc.mem_free(),
+            "mem_free_min": self.mem_free_min,
+        }
+
 class SimpleHub(Control):
     """Simple USB Serial to ESP-NOW bridge hub - inherits ESP-NOW methods from Control"""
     
     def __init__(self):
-        """Initialize simple hub - transmit-only, no device scanning"""
+        """Initialize simple hub - broadcasts commands, answers PING with a device scan"""
         self.running = False
         
+        # ESP-NOW messages from the receive task, handled by the registry task
+        self.queue = deque([], RX_QUEUE_SIZE)
+        self.rx_event = asyncio.Event()  # set when there is something for the registry task
+        self.stopped = asyncio.Event()
+        self.stats = HubStats()
+        
+        # Device scan state (one scan in flight at a time)
+        self.scan_active = False
+        self.scan_start = 0
+        self.scan_threshold = None
+        self.scan_found = {}
+        self.scan_round = 0
+        self.scan_slots = SCAN_MIN_SLOTS
+        self.scan_nonce = 0
+        self.scan_id = random.getrandbits(16)  # same in every round of a scan
+        self.scan_heard = set()   # macs that answered this scan, at any rssi
+        self.scan_new = 0         # of those, first heard in this round
+        self.scan_drops = 0       # _rx_drops() when the round started
+        self.scan_slot_hits = {}  # slot -> replies heard in this round
+        self.known = set()        # macs of every module heard from (scan replies, stats)
+        
         # Display for debug messages
         self.display = HubDisplay()
         
         # Serial bridge for webapp communication
         self.serial = SerialBridge(
             command_callback=self._handle_command,
-            debug_callback=self._debug
+            debug_callback=self._debug,
+            stats=self.stats
         )
         
         self._debug("Hub Init")
     
     def _debug(self, msg):
-        """Print debug message to stderr and update display"""
-        print(msg, file=sys.stderr)
+        """Send debug message on the debug channel and update display"""
+        self.serial.log(msg)
         self.display.update(msg)
     
     def connect(self):
         """Initialize ESP-NOW using Control.connect() + C6 external antenna"""
         self._debug("Connecting")
         
-        # Call parent's connect() to set up ESP-NOW
-        super().connect()
+        # Call parent's connect() to set up ESP-NOW, queueing received messages
+        super().connect(self._now_callback)
         
         # Add C6 external antenna configuration
         self.n.antenna()
@@ -199,23 +377,71 @@ class SimpleHub(Control):
             "mac": mac_str
         })
     
+    def _now_callback(self, msg, mac, rssi):
+        """ESP-NOW receive callback (receive task) - queue the message for the registry task"""
+        if len(self.queue) >= RX_QUEUE_SIZE:
+            self.stats.queue_drops += 1
+        self.queue.append((msg, mac, rssi))
+        self.stats.queued(len(self.queue))
+        self.rx_event.set()
+    
     def _handle_command(self, cmd_type, cmd):
         """Handle command from webapp (callback from SerialBridge)"""
-        if cmd_type in GAME_MAP:
+        self.stats.cmd_rx += 1
+        if cmd_type == "PING":
+            self.start_scan(cmd.get("rssi", "all"))
+        
+        elif cmd_type in GAME_MAP:
             # Send game command using inherited choose() method
             game_num = GAME_MAP[cmd_type]
             # Show game name (truncate to fit 12 char limit: "Gm:" + 9 chars)
             game_display = cmd_type[:9] if len(cmd_type) <= 9 else cmd_type[:8] + "."
             self._debug(f"Gm:{game_display}")
-            self.choose(game_num)
+            
+            # Unicast to the selected modules if the webapp named them, else broadcast;
+            # modules check the RSSI threshold themselves
+            macs = self._parse_macs(cmd.get("macs"))
+            threshold = self._parse_rssi(cmd.get("rssi", "all"))
+            at = time.ticks_add(time.ticks_ms(), START_DELAY_MS)
+            failed = self.choose(game_num, macs, threshold, at)
             
             # Send acknowledgment to webapp
+            ack = {
+                "type": "ack",
+                "command": cmd_type,
+                "status": "sent",
+                "rssi": cmd.get("rssi", "all")
+            }
+            if failed:
+                self._debug(f"NoAck:{len(failed)}")
+                ack["status"] = "partial" if len(failed) < len(macs) else "failed"
+                ack["failed"] = [':'.join(f'{b:02x}' for b in mac) for mac in failed]
+            self.serial.send(ack)
+        
+        elif cmd_type in SHOW_MAP:
+            # Broadcast the whole show once; an "order" list of mac suffixes
+            # sequences modules by position instead of by mac hash
+            program = dict(SHOW_MAP[cmd_type])
+            if cmd.get("order"):
+                program["by"] = [str(m).replace(':', '')[-6:].lower() for m in cmd["order"]]
+            self._debug(f"Show:{cmd_type[:7]}")
+            at = time.ticks_add(time.ticks_ms(), START_DELAY_MS)
+            self.show(program, self._parse_rssi(cmd.get("rssi", "all")), at)
             self.serial.send({
                 "type": "ack",
                 "command": cmd_type,
                 "status": "sent"
             })
         
+        elif cmd_type == "stats":
+            # {"cmd": "stats", "reset": true} also restarts high-water marks
+            self.serial.send(self.stats.snapshot(self), CH_TELEMETRY)
+            if cmd.get("reset"):
+                self.stats.reset()
+        
+        elif cmd_type == "OTA":
+            self.start_ota(cmd.get("files", []), cmd.get("reset", False))
+        
         elif cmd_type == "Off":
             # Use inherited shutdown() method
             self.shutdown()
@@ -230,26 +456,297 @@ class SimpleHub(Control):
             unk_display = str(cmd_type)[:8] if cmd_type else "None"
             self._debug(f"Unk:{unk_display}")
     
+    def _parse_macs(self, macs):
+        """Convert ["aa:bb:cc:dd:ee:ff", ...] from the webapp to 6-byte MACs"""
+        parsed = []
+        for mac in macs or []:
+            try:
+                raw = ubinascii.unhexlify(mac.replace(':', ''))
+            except Exception:
+                continue
+            if len(raw) == 6 and raw not in parsed:
+                parsed.append(raw)
+        return parsed
+    
+    def _parse_rssi(self, rssi_threshold):
+        """Convert "all" / "-70" from the webapp to None / -70"""
+        if rssi_threshold == "all":
+            return None
+        try:
+            return int(rssi_threshold)
+        except (TypeError, ValueError):
+            return None
+    
+    def start_scan(self, rssi_threshold="all"):
+        """Start a slotted device scan.
+        
+        Each round broadcasts (slots, nonce, slot width). A module replies in
+        slot hash(mac, nonce) % slots, so replies are spread over the round
+        instead of arriving all at once. Replies are unicast, and a module
+        whose reply was acked stays quiet for the rest of the scan (same
+        scan id), so later rounds only hold the modules not heard yet.
+        Another round, sized for the replies still expected, runs while
+        known modules are missing or two replies landed in one slot (or the
+        slots were crowded). If the hub dropped packets in a round, the
+        modules it lost think they were heard, so the next round takes a new
+        scan id and everyone answers again. The scan ends after a round that
+        heard nobody new, a round with nothing left to wait for, or
+        SCAN_MAX_ROUNDS rounds.
+        """
+        if self.scan_active:
+            # Join the scan in flight instead of flooding modules with PINGs
+            self._debug("Scan busy")
+            return
+        
+        self.scan_threshold = self._parse_rssi(rssi_threshold)
+        
+        self.scan_found = {}
+        self.scan_heard = set()
+        self.scan_round = 0
+        self.scan_id = self._next_scan_id()
+        self.scan_active = True
+        self._debug("Scan")
+        # Size the first round from the modules known to be around
+        self._start_scan_round(self._scan_slots_for(len(self.known)))
+    
+    def _next_scan_id(self):
+        """A fresh scan id - never the last one, which modules may still hold"""
+        return (self.scan_id + 1 + random.getrandbits(8)) & 0xffff
+    
+    def _rx_drops(self):
+        """ESP-NOW packets lost on the way in, by the driver or to a full rx queue"""
+        return self.n.rx_dropped() + self.stats.queue_drops
+    
+    def _scan_slots_for(self, modules):
+        """~2 slots per module expected to answer"""
+        slots = SCAN_MIN_SLOTS
+        while slots < 2 * modules and slots < SCAN_MAX_SLOTS:
+            slots *= 2
+        return slots
+    
+    def _start_scan_round(self, slots):
+        """Broadcast one scan round (repeated, like a game command)"""
+        self.scan_round += 1
+        self.scan_slots = slots
+        self.scan_nonce = random.getrandbits(16)
+        self.scan_new = 0
+        self.scan_slot_hits = {}
+        self.scan_drops = self._rx_drops()
+        self.scan_start = time.ticks_ms()
+        self.scan(slots, self.scan_nonce, SCAN_SLOT_MS, self.scan_id)
+        self.rx_event.set()  # registry task picks up the new deadline
+    
+    def _scan_time_left(self):
+        """ms until every slot of the current round (plus guard time) has passed"""
+        window = self.scan_slots * SCAN_SLOT_MS + SCAN_GUARD_MS
+        return window - time.ticks_diff(time.ticks_ms(), self.scan_start)
+    
+    def _scan_round_over(self):
+        """True once every slot of the current round (plus guard time) has passed"""
+        return self._scan_time_left() < 0
+    
+    def _scan_collided(self):
+        """Guess whether replies were lost to collisions in this round"""
+        # Two replies in one slot means others may have collided and vanished;
+        # more than half the slots in use makes that likely as well
+        for hits in self.scan_slot_hits.values():
+            if hits > 1:
+                return True
+        return 2 * len(self.scan_slot_hits) > self.scan_slots
+    
+    def _handle_scan_reply(self, topic, value, mac, rssi):
+        """Record a /scan/<name> reply and stream it to the webapp"""
+        mac_str = ':'.join(f'{b:02x}' for b in mac)
+        try:
+            strength = rssi[mac][0]
+        except (KeyError, IndexError, TypeError):
+            strength = -100
+        
+        battery, module_type = value[0], value[1]
+        self.known.add(mac)
+        if mac not in self.scan_heard:
+            self.scan_heard.add(mac)
+            self.scan_new += 1
+        if len(value) > 3 and value[3] == self.scan_nonce:
+            slot = value[2]
+            self.scan_slot_hits[slot] = self.scan_slot_hits.get(slot, 0) + 1
+        
+        if self.scan_threshold is not None and strength < self.scan_threshold:
+            return
+        
+        device = {
+            "id": topic[len('/scan/'):].strip(),
+            "mac": mac_str,
+            "rssi": strength,
+            "battery": battery if battery is not None else -1,
+            "type": module_type
+        }
+        is_new = mac_str not in self.scan_found
+        self.scan_found[mac_str] = device
+        if is_new:
+            self.serial.send({"type": "device", "device": device})
+    
+    def _check_scan(self):
+        """Move the scan on when its current round is over"""
+        if not self._scan_round_over():
+            return
+        
+        # Known modules that have not answered yet - after a restart, or lost replies
+        missing = len(self.known) - len(self.scan_heard)
+        # Replies the radio acked but the hub had no room for: those modules think they
+        # were heard, so the next round gets a new scan id and everyone answers again
+        lost = self._rx_drops() != self.scan_drops
+        if self.scan_round < SCAN_MAX_ROUNDS and (lost or self.scan_new and (missing > 0 or self._scan_collided())):
+            if lost:
+                self.scan_id = self._next_scan_id()
+                expected = max(len(self.known), self.scan_slots)     # everyone, in at least twice the slots
+            elif missing > 0:
+                expected = missing
+            elif 2 * len(self.scan_slot_hits) > self.scan_slots:
+                expected = self.scan_new     # crowded - as many again may not have got through
+            else:
+                expected = sum(1 for hits in self.scan_slot_hits.values() if hits > 1)
+            slots = self._scan_slots_for(expected)
+            self._debug(f"Scan x{slots}")
+            self._start_scan_round(slots)
+        else:
+            self._finish_scan()
+    
+    def _finish_scan(self):
+        """Send the complete device list, which also tells the webapp the scan is over"""
+        self.scan_active = False
+        self._debug(f"Found:{len(self.scan_found)}")
+        self.serial.send({
+            "type": "devices",
+            "list": list(self.scan_found.values()),
+            "done": True
+        })
+    
+    def start_ota(self, files, reset=False):
+        """Send files from OTA_DIR on the hub to all modules (one transfer at a time)"""
+        if self.ota_sender:
+            self._debug("OTA busy")
+            return
+        bundle = []
+        for path in files:
+            src = f"{OTA_DIR}/{path}"
+            try:
+                open(src).close()
+            except OSError:
+                self.serial.send({"type": "ota", "status": "failed", "error": f"missing {src}"})
+                return
+            bundle.append((src, path))
+        if bundle:
+            asyncio.create_task(self._run_ota(bundle, reset))
+    
+    async def _run_ota(self, bundle, reset):
+        """OTA task - reports progress to the webapp after every poll"""
+        def progress(path, round, missing, modules):
+            self._debug(f"OTA r{round} m{missing}")
+            self.serial.send({"type": "ota", "status": "progress", "file": path,
+                              "round": round, "missing": missing, "modules": modules})
+        
+        self._debug(f"OTA {len(bundle)} files")
+        try:
+            incomplete = await self.distribute(bundle, reset, progress)
+        except Exception as e:
+            self._debug("OTA Err")
+            self.serial.send({"type": "ota", "status": "failed", "error": str(e)})
+            return
+        self.serial.send({
+            "type": "ota",
+            "status": "partial" if incomplete else "done",
+            "incomplete": {path: [':'.join(f'{b:02x}' for b in mac) for mac in macs]
+                           for path, macs in incomplete.items()}
+        })
+    
+    def _process_queue(self):
+        """Handle ESP-NOW messages queued by the receive IRQ"""
+        while len(self.queue):
+            msg, mac, rssi = self.queue.popleft()
+            if ota.is_ota(msg):
+                if self.ota_sender:
+                    self.ota_sender.receive(msg, mac)
+                continue
+            decoded = wire.decode(msg)
+            if decoded is None:
+                continue
+            topic, value = decoded[0], decoded[1]
+            
+            if self.scan_active and topic.startswith('/scan/'):
+                try:
+                    self._handle_scan_reply(topic, value, mac, rssi)
+                except Exception as e:
+                    self._debug("Scan Err")
+            
+            elif topic.startswith('/stats/'):
+                # Module health (Plushie_Module/utilities/metrics.py) goes straight to telemetry
+                self.known.add(mac)
+                self.serial.send({
+                    "type": "module_stats",
+                    "id": topic[len('/stats/'):],
+                    "mac": ':'.join(f'{b:02x}' for b in mac),
+                    "stats": value
+                }, CH_TELEMETRY)
+        
+        if self.scan_active:
+            self._check_scan()
+    
+    async def _registry_task(self):
+        """Handle ESP-NOW replies as they arrive, waking for the scan deadline too"""
+        while self.running:
+            if self.scan_active:
+                try:
+                    await asyncio.wait_for_ms(self.rx_event.wait(), max(1, self._scan_time_left() + 1))
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self.rx_event.wait()
+            self.rx_event.clear()
+            self._process_queue()
+    
+    async def _beacon_task(self):
+        """Broadcast the hub clock every TIME_BEACON_MS to keep module clocks in step"""
+        while self.running:
+            self.beacon()
+            await asyncio.sleep_ms(TIME_BEACON_MS)
+    
+    def stop(self):
+        """End run()"""
+        self.running = False
+        self.stopped.set()
+    
     async def run(self):
-        """Main event loop"""
+        """Start the hub tasks and idle until stopped.
+        
+        Nothing polls: the command task sleeps in readline(), the receive task
+        on the ESP-NOW IRQ flag, and the registry task on rx_event.
+        """
         self.connect()
         self.running = True
         
+        tasks = [
+            asyncio.create_task(self.serial.read_loop()),   # webapp commands
+            asyncio.create_task(self.n.receive()),          # ESP-NOW -> queue
+            asyncio.create_task(self._registry_task()),     # queue -> scan results, OTA
+            asyncio.create_task(self._beacon_task()),       # time sync
+            asyncio.create_task(self.display.run()),        # display I/O, off the command path
+            asyncio.create_task(self.stats.run(self.n)),    # loop lag, memory, rx rate
+        ]
+        
         self._debug("Running")
         self._debug("Wait CMD")
+        self.serial.send({"state": "running"}, CH_REPL)
         
         try:
-            while self.running:
-                # Check for Serial commands
-                self.serial.check_input()
-                
-                # Small delay for responsiveness
-                await asyncio.sleep(0.01)
+            await self.stopped.wait()
         
         except KeyboardInterrupt:
             self._debug("Stopping")
         
         finally:
+            for task in tasks:
+                task.cancel()
             self.close()
     
     def close(self):
@@ -258,7 +755,9 @@ class SimpleHub(Control):
             self.n.close()
         self._debug("Stopped")
         self.display.close()
+        # Tell the host the REPL prompt comes next
+        self.serial.send({"state": "stopped"}, CH_REPL)
 
-# Run simple hub (transmit-only, no device scanning)
+# Run simple hub
 hub = SimpleHub()
 asyncio.run(hub.run())
\ No newline at end of file
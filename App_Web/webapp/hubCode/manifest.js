@@ -17,6 +17,9 @@ export const HUB_FILES = [
     { path: 'utilities/i2c_bus.py', remotePath: 'utilities/i2c_bus.py' },
     { path: 'utilities/wifi.py', remotePath: 'utilities/wifi.py' },
     { path: 'utilities/now.py', remotePath: 'utilities/now.py' },
+    { path: 'utilities/ota.py', remotePath: 'utilities/ota.py' },
+    { path: 'utilities/wire.py', remotePath: 'utilities/wire.py' },
+    { path: 'utilities/native.py', remotePath: 'utilities/native.py' },
     { path: 'utilities/colors.py', remotePath: 'utilities/colors.py' },
     { path: 'utilities/base64.py', remotePath: 'utilities/base64.py' },
     { path: 'utilities/lc709203f.py', remotePath: 'utilities/lc709203f.py' },
@@ -1,4 +1,5 @@
 #accel.py
+import struct
 from machine import Pin, SoftI2C
 from time import sleep_ms, ticks_ms, ticks_diff
 from micropython import const
@@ -37,6 +38,7 @@ class LIS2DW12:
         self.i2c = SoftI2C(scl=Pin(SCL), sda=Pin(SDA))
         self.address = ADDRESS
         self._scale = 2
+        self._raw = bytearray(6)
         
         if self.who_am_i() != _DEVICE_ID:
             raise RuntimeError("Failed to find LIS2DW12")
@@ -82,15 +84,9 @@ class LIS2DW12:
         return bool(status & 0x01)
     
     def read_raw(self):
-        data = self._read_register(_OUT_X_L, 6)
-        
-        x = data[0] | (data[1] << 8)
-        y = data[2] | (data[3] << 8)
-        z = data[4] | (data[5] << 8)
-        if x >= 0x8000: x -= 0x10000
-        if y >= 0x8000: y -= 0x10000
-        if z >= 0x8000: z -= 0x10000
-        return (x, y, z)
+        # x, y, z as little-endian int16s - struct unpacks them in C
+        self.i2c.readfrom_mem_into(self.address, _OUT_X_L, self._raw)
+        return struct.unpack('<hhh', self._raw)
     
     def read_accel(self):
         x, y, z = self.read_raw()
@@ -7,35 +7,53 @@ LED_PIN = 20
 
 from utilities.colors import *
 
+def _fill(buf, pixel, count):
+    count = min(count, len(buf) // len(pixel))
+    buf[:count * len(pixel)] = pixel * count
+
+try:
+    from utilities.native import fill   # viper build of _fill - no allocation
+except Exception:   # no viper emitter here
+    fill = _fill
+
 class Lights():
     def __init__(self):
         self.np = neopixel.NeoPixel(Pin(LED_PIN), NUM_LED)
         self.default_color = RED
         self.default_intensity = 1
+        self.raw = bytearray(self.np.bpp)       # one pixel in the strip's byte order, for fill()
+        self.dark = bytes(self.np.bpp)
         
     def defaults(self, color = None, intensity = None):
         color = color if color else self.default_color
         intensity = intensity  if intensity else self.default_intensity
         return color, intensity
 
+    def scale(self, color, intensity):
+        # the color at this intensity - worked out once per call, not per pixel
+        pixel = tuple(int(c*intensity) for c in color)
+        order = self.np.ORDER
+        for j in range(len(pixel)):
+            self.raw[order[j]] = pixel[j]
+        return pixel
+
     def on(self, num, color = None, intensity = None):
         color, intensity = self.defaults(color, intensity)
         if num < NUM_LED:
-            self.np[num] = [int(c*intensity) for c in color]
+            self.np[num] = self.scale(color, intensity)
             self.np.write()
             
     def all_on(self, color = None, intensity = None, number = NUM_LED):
         color, intensity = self.defaults(color, intensity)
-        for i in range(number):
-            self.np[i] = [int(c*intensity) for c in color]
+        self.scale(color, intensity)
+        fill(self.np.buf, self.raw, min(number, NUM_LED))
         self.np.write()
         
     def off(self, num):
         self.on(num, [0,0,0])
         
     def all_off(self, num = NUM_LED):
-        for i in range(NUM_LED):
-            self.np[i] = OFF
+        fill(self.np.buf, self.dark, NUM_LED)
         self.np.write()
         
     async def animate(self, color = None, intensity = None, number = NUM_LED, repeat= 1, timeout = 1.0, speed = 0.1):
@@ -53,6 +71,7 @@ class Lights():
 
     def show_number(self, number, color = None, intensity = None):
         color, intensity = self.defaults(color, intensity)
-        for i in range(NUM_LED):
-            self.np[i] = [int(c*intensity) for c in color] if (i == number) else OFF
+        fill(self.np.buf, self.dark, NUM_LED)
+        if 0 <= number < NUM_LED:
+            self.np[number] = self.scale(color, intensity)
         self.np.write()
@@ -2,13 +2,26 @@ from machine import Pin
 import network
 import espnow
 import time
+import random
+import asyncio
+
+MAX_PEERS = 20    # ESP-NOW peer table limit, including the broadcast address
+REPEATS = 3       # copies of each reliable broadcast
+REPEAT_MS = 40    # spacing between copies
+JITTER_MS = 20    # random extra spacing so hubs and modules don't stay in step
 
 class Now():
     def __init__(self, callback = None):
         self.connected= False
         self.everyone = b'\xff\xff\xff\xff\xff\xff'    # talk to all mac addresses
         self.callback = callback if callback else self.default
-        self.peers = []
+        self.peers = []    # unicast peers, least recently used first
+        # sequence number of the last numbered packet - random so that after a reboot the
+        # new count is not taken for repeats of the old one by modules' Dedupe windows
+        self.seq = random.getrandbits(16)
+        self.tx_ok = 0     # sends espnow reported as delivered
+        self.tx_fail = 0   # sends that returned False or raised
+        self.rx_count = 0  # packets received
     
     def default(self, msg, mac, rssi):
         mac_str = ':'.join(f'{b:02x}' for b in mac)
@@ -30,14 +43,33 @@ class Now():
     def irq_receive(self, remote_network):
         try:
             mac, msg = remote_network.irecv()
+            if mac is None:
+                return
             rssi = remote_network.peers_table
             #if mac != None and mac not in self.peers: #check if the peer has already been added
             #    self.peers.append(mac)
             #    self.now_network.add_peer(mac)
-            self.callback(msg, mac, rssi)
+            self.callback(bytes(msg), bytes(mac), rssi)   # irecv reuses its buffers - copy before they are queued
         except Exception as e:
             print(f"Receive Error: {e}")
 
+    async def receive(self):
+        # Receive task: the IRQ only sets a flag, messages are read here in the event loop
+        flag = asyncio.ThreadSafeFlag()
+        self.now_network.irq(lambda net: flag.set())
+        while self.connected:
+            await flag.wait()
+            while True:
+                mac, msg = self.now_network.irecv(0)
+                if mac is None:
+                    break
+                self.rx_count += 1
+                try:
+                    # irecv reuses the same mac and msg buffers every call - copy before they are queued
+                    self.callback(bytes(msg), bytes(mac), self.now_network.peers_table)
+                except Exception as e:
+                    print(f"Receive Error: {e}")
+
     def connect(self, antenna = True):
         # Set up the network and ESPNow
         self.wifi = network.WLAN(network.STA_IF) # ESP network type
@@ -54,7 +86,77 @@ class Now():
         if not mac:
             mac = self.everyone
         if self.connected:
-            self.now_network.send(mac, msg)
+            try:
+                ok = self.now_network.send(mac, msg)
+            except OSError:
+                ok = False
+            if ok:
+                self.tx_ok += 1
+            else:
+                self.tx_fail += 1
+
+    def rx_dropped(self):
+        # packets espnow threw away because its receive buffer was full
+        try:
+            return self.now_network.stats()[4]
+        except Exception:
+            return -1    # firmware without ESPNow.stats()
+
+    def next_seq(self):
+        self.seq = (self.seq + 1) & 0xffff
+        return self.seq
+
+    def broadcast(self, msg, repeats = REPEATS):
+        # send now and repeat in the background - receivers drop copies by seq
+        self.publish(msg)
+        if repeats > 1:
+            asyncio.create_task(self._repeat(msg, repeats - 1))
+
+    async def _repeat(self, msg, count):
+        for i in range(count):
+            await asyncio.sleep_ms(REPEAT_MS + random.getrandbits(8) % (JITTER_MS + 1))
+            self.publish(msg)
+
+    def use_peer(self, mac):
+        # register mac, dropping the least recently used peer when the table is full
+        if mac in self.peers:
+            self.peers.remove(mac)
+        else:
+            if len(self.peers) >= MAX_PEERS - 1:
+                oldest = self.peers.pop(0)
+                try:
+                    self.now_network.del_peer(oldest)
+                except OSError:
+                    pass
+            try:
+                self.now_network.add_peer(mac)
+            except OSError:
+                pass    # already registered
+        self.peers.append(mac)
+
+    def send(self, mac, msg):
+        # unicast and wait for the ack - True if the module got it
+        if not self.connected:
+            return False
+        self.use_peer(mac)
+        try:
+            ok = self.now_network.send(mac, msg, True)
+        except OSError:
+            ok = False
+        if ok:
+            self.tx_ok += 1
+        else:
+            self.tx_fail += 1
+        return ok
+
+    def publish_to(self, macs, msg, retries = 2):
+        # unicast to each mac, resending only to the ones that did not ack
+        pending = list(macs)
+        for attempt in range(retries + 1):
+            pending = [mac for mac in pending if not self.send(mac, msg)]
+            if not pending:
+                break
+        return pending    # macs that never acked
 
     def close(self):
         self.now_network.irq(None)
@@ -0,0 +1,112 @@
+import struct
+import random
+import asyncio
+import ubinascii
+
+# Binary OTA packets - the first byte tells them apart from the JSON messages.
+# Keep in step with Plushie_Module/utilities/ota.py
+MAGIC = 0xA7
+OFFER, DATA, NACK, COMMIT = 0, 1, 2, 3
+OFFER_FMT = '<BBHBIHIHH'   # magic, kind, bundle, file, size, chunks, crc, slots, slot_ms + path
+DATA_FMT = '<BBHBHI'       # magic, kind, bundle, file, index, crc + chunk
+NACK_FMT = '<BBHB'         # magic, kind, bundle, file + bitmap of missing chunks
+COMMIT_FMT = '<BBHBB'      # magic, kind, bundle, files, reset
+
+CHUNK_SIZE = 200    # ESP-NOW payloads are at most 250 bytes
+CHUNK_GAP_MS = 15   # between data packets so the modules keep up with flash writes
+POLL_SLOTS = 16     # NACK reply slots per poll
+POLL_SLOT_MS = 25
+POLL_GUARD_MS = 250
+MAX_ROUNDS = 8      # data + poll rounds per file
+REPEATS = 3         # copies of offers and commits
+
+def is_ota(msg):
+    return len(msg) > 4 and msg[0] == MAGIC
+
+class Sender:
+    # Pushes files from the hub filesystem to every module in broadcast rounds:
+    # send the missing chunks, poll, and merge the modules' NACK bitmaps.
+    def __init__(self, now):
+        self.now = now
+        self.bundle = 0
+        self.file = 0
+        self.missing = set()
+        self.replies = {}   # mac -> True if the module has the whole file
+
+    def receive(self, msg, mac):
+        # NACK from a module (called from the hub's receive queue)
+        if len(msg) < 5 or msg[1] != NACK:
+            return
+        magic, kind, bundle, file = struct.unpack_from(NACK_FMT, msg)
+        if bundle != self.bundle or file != self.file:
+            return
+        complete = True
+        for byte_index, bits in enumerate(msg[5:]):
+            for bit in range(8):
+                if bits >> bit & 1:
+                    self.missing.add(byte_index * 8 + bit)
+                    complete = False
+        self.replies[bytes(mac)] = complete
+
+    def _read_chunk(self, f, index):
+        f.seek(index * CHUNK_SIZE)
+        return f.read(CHUNK_SIZE)
+
+    def _file_info(self, src):
+        crc = 0
+        size = 0
+        with open(src, 'rb') as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                crc = ubinascii.crc32(data, crc)
+                size += len(data)
+        return size, crc
+
+    async def _offer(self, path, size, chunks, crc, slots = 0, slot_ms = 0):
+        msg = struct.pack(OFFER_FMT, MAGIC, OFFER, self.bundle, self.file,
+                          size, chunks, crc, slots, slot_ms) + path.encode()
+        for i in range(1 if slots else REPEATS):
+            self.now.publish(msg)
+            await asyncio.sleep_ms(CHUNK_GAP_MS)
+
+    async def send_file(self, src, path, progress = None):
+        # returns the macs that answered a poll without having the whole file
+        size, crc = self._file_info(src)
+        chunks = (size + CHUNK_SIZE - 1) // CHUNK_SIZE
+        await self._offer(path, size, chunks, crc)
+        self.missing = set(range(chunks))
+        self.replies = {}
+        with open(src, 'rb') as f:
+            for round in range(MAX_ROUNDS):
+                for index in sorted(self.missing):
+                    data = self._read_chunk(f, index)
+                    self.now.publish(struct.pack(DATA_FMT, MAGIC, DATA, self.bundle, self.file,
+                                                 index, ubinascii.crc32(data)) + data)
+                    await asyncio.sleep_ms(CHUNK_GAP_MS)
+                # poll - modules that missed the offer join from here
+                self.missing = set()
+                self.replies = {}
+                await self._offer(path, size, chunks, crc, POLL_SLOTS, POLL_SLOT_MS)
+                await asyncio.sleep_ms(POLL_SLOTS * POLL_SLOT_MS + POLL_GUARD_MS)
+                if progress:
+                    progress(path, round, len(self.missing), len(self.replies))
+                if not self.missing:
+                    break
+        return [mac for mac, complete in self.replies.items() if not complete]
+
+    async def send_bundle(self, files, reset = False, progress = None):
+        # files: [(path on the hub, path on the modules), ...]
+        # returns {module path: macs still missing chunks}
+        self.bundle = random.getrandbits(16)
+        incomplete = {}
+        for self.file, (src, path) in enumerate(files):
+            failed = await self.send_file(src, path, progress)
+            if failed:
+                incomplete[path] = failed
+        msg = struct.pack(COMMIT_FMT, MAGIC, COMMIT, self.bundle, len(files), 1 if reset else 0)
+        for i in range(REPEATS):
+            self.now.publish(msg)
+            await asyncio.sleep_ms(CHUNK_GAP_MS)
+        return incomplete
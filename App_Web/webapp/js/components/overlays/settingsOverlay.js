@@ -1,9 +1,55 @@
 /**
  * Settings Overlay Component
- * App settings including device scanning toggle
+ * App settings including device scanning toggle and hub performance charts
  */
 
 import { state, setState } from '../../state/store.js';
+import { PyBridge } from '../../utils/pyBridge.js';
+
+const STATS_POLL_MS = 2000;
+const STATS_HISTORY = 60;
+
+// Hub stats shown as sparklines: [key, label, unit]
+const STAT_CHARTS = [
+    ['rx_per_s', 'ESP-NOW RX', '/s'],
+    ['loop_lag_ms', 'Loop lag', 'ms'],
+    ['queue_hwm', 'RX queue peak', ''],
+    ['mem_free_min', 'Min free heap', 'B'],
+];
+
+// Kept across overlay openings so the charts don't start empty
+const statsHistory = [];
+
+function drawSparkline(canvas, values) {
+    const ctx = canvas.getContext('2d');
+    const { width, height } = canvas;
+    ctx.clearRect(0, 0, width, height);
+    if (values.length < 2) return;
+    const max = Math.max(...values);
+    const min = Math.min(...values);
+    const span = max - min || 1;
+    ctx.strokeStyle = '#2563eb';
+    ctx.lineWidth = 1.5;
+    ctx.beginPath();
+    values.forEach((v, i) => {
+        const x = (i / (STATS_HISTORY - 1)) * width;
+        const y = height - 2 - ((v - min) / span) * (height - 4);
+        if (i === 0) ctx.moveTo(x, y); else ctx.lineTo(x, y);
+    });
+    ctx.stroke();
+}
+
+function renderStats(overlay) {
+    const latest = statsHistory[statsHistory.length - 1];
+    if (!latest) return;
+    for (const [key, , unit] of STAT_CHARTS) {
+        overlay.querySelector(`#stat-${key}`).textContent = `${latest[key]}${unit}`;
+        drawSparkline(overlay.querySelector(`#chart-${key}`), statsHistory.map((s) => s[key]));
+    }
+    overlay.querySelector('#statTotals').textContent =
+        `Commands ${latest.cmd_rx} · TX ok ${latest.tx_ok} / failed ${latest.tx_fail} · ` +
+        `RX drops ${latest.queue_drops} · worst lag ${latest.loop_lag_max_ms}ms`;
+}
 
 export function createSettingsOverlay(onBack) {
     const overlay = document.createElement('div');
@@ -43,6 +89,28 @@ export function createSettingsOverlay(onBack) {
                     </div>
                 </div>
             </div>
+            <!-- Hub Performance Section -->
+            <div class="bg-white rounded-xl border border-gray-200 overflow-hidden mb-4">
+                <div class="px-4 py-3 border-b border-gray-200">
+                    <h3 class="font-semibold text-gray-900">Hub Performance</h3>
+                </div>
+                <div class="p-4">
+                    <div class="grid grid-cols-2 gap-3">
+                        ${STAT_CHARTS.map(([key, label]) => `
+                            <div>
+                                <div class="flex justify-between text-sm">
+                                    <span class="text-gray-500">${label}</span>
+                                    <span class="font-medium text-gray-900" id="stat-${key}">–</span>
+                                </div>
+                                <canvas id="chart-${key}" width="160" height="32" class="w-full h-8"></canvas>
+                            </div>
+                        `).join('')}
+                    </div>
+                    <div class="mt-3 text-xs text-gray-500" id="statTotals">
+                        ${state.hubConnected ? 'Waiting for hub stats…' : 'Connect a hub over USB to see stats.'}
+                    </div>
+                </div>
+            </div>
         </div>
     `;
     
@@ -56,5 +124,27 @@ export function createSettingsOverlay(onBack) {
         console.log(`Device scanning ${e.target.checked ? 'enabled' : 'disabled'}`);
     };
     
+    // Hub stats: poll while the overlay is on screen, chart each telemetry snapshot
+    window.onHubTelemetry = (stats) => {
+        if (stats.type !== 'stats') return;
+        statsHistory.push(stats);
+        if (statsHistory.length > STATS_HISTORY) statsHistory.shift();
+        if (overlay.isConnected) renderStats(overlay);
+    };
+    const poll = () => {
+        if (!overlay.isConnected) {
+            clearInterval(timer);
+            return;
+        }
+        if (state.hubConnected) {
+            PyBridge.requestHubStats().catch((e) => console.warn('Hub stats request failed:', e));
+        }
+    };
+    const timer = setInterval(poll, STATS_POLL_MS);
+    setTimeout(() => {
+        renderStats(overlay);
+        poll();
+    }, 0);
+    
     return overlay;
 }
@@ -183,6 +183,17 @@ class App {
             });
         };
 
+        // Direct function for Python to call while a scan is still running
+        window.onDevicesDiscovered = (devices) => {
+            console.log(`Scan progress: ${devices?.length || 0} devices so far`);
+            
+            // Show modules as they answer; isRefreshing stays set until the scan resolves
+            setState({
+                allDevices: devices,
+                lastUpdateTime: new Date(),
+            });
+        };
+
         // Direct function calls only - no event listeners needed
 
         // Direct function for Python to call (BLE connections)
@@ -676,7 +687,10 @@ class App {
                 rssiThreshold = "all";
             }
 
-            const result = await PyBridgeToUse.sendCommandToHub(newMessage.command, rssiThreshold);
+            // Selected modules with a known MAC get unicast; "all" stays a broadcast
+            const macs = rssiThreshold === "all" ? null : devices.map((d) => d.mac).filter(Boolean);
+
+            const result = await PyBridgeToUse.sendCommandToHub(newMessage.command, rssiThreshold, macs?.length ? macs : null);
 
             // Use unified error handler
             const isError = handleError(result, "Send Command");
@@ -801,12 +815,25 @@ class App {
         }
 
         try {
-            // Send PING with RSSI threshold
+            // Send PING with RSSI threshold - resolves when the scan completes or times out
             const result = await PyBridgeToUse.refreshDevices(rssiThreshold);
             
-            console.log("✓ PING sent, waiting for device responses from hub...");
-            // Note: isRefreshing will be cleared by onDevicesUpdated callback
-            // when hub sends back device list, OR by timeout
+            console.log(`✓ Device scan finished: ${result?.length || 0} devices`);
+            
+            // Normally onDevicesUpdated already cleared the refresh state; on a
+            // deadline the resolved (partial) list is all we get
+            if (state.isRefreshing) {
+                if (this.refreshTimeout) {
+                    clearTimeout(this.refreshTimeout);
+                    this.refreshTimeout = null;
+                }
+                this.lastRefreshTime = Date.now(); // Update cooldown timer
+                setState({
+                    allDevices: result || [],
+                    lastUpdateTime: new Date(),
+                    isRefreshing: false,
+                });
+            }
             
             // Empty array is legitimate - no retry needed
             
@@ -83,8 +83,16 @@ const PyBridge = {
     return await callPython('disconnect_hub_serial');
   },
 
-  async sendCommandToHub(command, rssiThreshold) {
-    return await callPython('send_command_to_hub', command, rssiThreshold);
+  async sendCommandToHub(command, rssiThreshold, macs = null) {
+    return await callPython('send_command_to_hub', command, rssiThreshold, macs);
+  },
+
+  async requestHubStats(reset = false) {
+    return await callPython('request_hub_stats', reset);
+  },
+
+  async setHubDebugOutput(enabled) {
+    return await callPython('set_hub_debug_output', enabled);
   },
 
   async refreshDevices(rssiThreshold = "all") {
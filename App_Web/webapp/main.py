@@ -20,6 +20,7 @@ Communication Flow:
 Dependencies:
 - PyScript 2024.1.1 (browser Python execution)
 - mpy/hub_serial.py, hub_bluetooth.py, repl_controller.py, firmware_manager.py
+- mpy/protocol.py (hub message parsing, no browser APIs - see benchmarks/)
 - js/adapters/serialAdapter.js, bluetoothAdapter.js (browser APIs)
 - js/utils/pyBridge.js (JavaScript-Python bridge)
 """
@@ -50,6 +51,7 @@ from mpy.hub_bluetooth import BluetoothConnection
 from mpy.hub_serial import SerialConnection
 from mpy.repl_controller import ReplController
 from mpy.firmware_manager import FirmwareManager
+from mpy.protocol import HubMessages, BleFramer
 
 # Create component instances
 ble = BluetoothConnection()
@@ -69,58 +71,28 @@ hub_connection_mode = None  # "ble" or "serial"
 # Device data (will be updated via BLE from hub)
 devices = []
 
-# Message framing state for BLE transmission reassembly
-# Protocol: MSG:<length>|<payload>
-_frame_state = "waiting_header"  # States: "waiting_header", "receiving_payload"
-_expected_payload_length = 0
-_payload_buffer = ""
-_frame_buffer = ""  # Buffer for header parsing
-_last_fragment_time = 0
-_buffer_timeout = 2.0  # 2 second timeout for message completion
+# Device discovery state - one scan in flight, shared by all callers
+_scan_future = None  # asyncio.Future resolved with the final device list
+_scan_timeout = 5.0  # Seconds to wait for the hub's final device list
 
-def parse_hub_response(data):
-    """
-    Parse and validate JSON response from ESP32 hub.
-    
-    This function handles JSON parsing with a single repair attempt for truncated data.
-    It validates required fields and logs parsing failures for debugging.
+# Hub message handling and BLE reassembly (mpy/protocol.py, no browser APIs)
+hub_messages = HubMessages(log=console.log)
+ble_framer = BleFramer(log=console.log)
+
+def _finish_scan(device_list):
+    """Resolve the in-flight device scan (if any) with the final device list."""
+    global _scan_future
     
-    Parameters:
-    -----------
-    data : str
-        Raw JSON string from hub (should already be filtered to only JSON messages)
-        
-    Returns:
-    --------
-    dict or None: Parsed JSON data if successful, None if parsing failed
-        
-    Error Handling:
-    - Single repair attempt for truncated JSON
-    - Minimal logging (detailed errors handled by caller)
-    """
-    try:
-        # Try to parse JSON normally first
-        parsed = json.loads(data)
-        return parsed
-    except Exception as e:
-        # Single repair attempt for truncated JSON
-        if "Unterminated string" in str(e) or "Expecting" in str(e):
-            try:
-                fixed_data = data + '"]}'
-                parsed = json.loads(fixed_data)
-                console.log("⚠️ Fixed truncated JSON from hub")
-                return parsed
-            except:
-                return None
-        else:
-            return None
+    if _scan_future is not None and not _scan_future.done():
+        _scan_future.set_result(device_list)
+    _scan_future = None
 
 def process_complete_message(message_data):
     """
     Process a complete message received from the hub.
     
-    This is called once we've reassembled a complete framed message.
-    It parses the JSON and updates the UI accordingly.
+    Parsing happens in HubMessages (mpy/protocol.py); this passes the
+    result on to the frontend.
     
     The hub sends two types of messages:
     1. JSON data (starts with '{') - commands, acks, device lists
@@ -128,272 +100,53 @@ def process_complete_message(message_data):
     """
     global devices
     
-    # Quick check: Is this JSON or a debug message?
-    message_data = message_data.strip()
-    
-    if not message_data.startswith('{'):
-        # Not JSON - this is a debug/print statement from the hub
-        console.info(f"📡 Hub: {message_data}")
+    event = hub_messages.handle(message_data)
+    if event is None:
         return
+    kind, value = event
     
-    # It's JSON - try to parse it
-    console.log("=== PROCESSING HUB JSON ===")
-    console.log(f"Message: {message_data}")
-    
-    # Parse JSON using centralized function
-    parsed = parse_hub_response(message_data)
-    if not parsed:
-        console.error(f"❌ Failed to parse hub JSON: {message_data}")
-        return
-    
-    # Validate required fields
-    if 'type' not in parsed:
-        console.log("Missing 'type' field in hub response")
-        return
-    
-    # Handle different message types
-    if parsed.get("type") == "devices":
-        console.log("Found devices type - processing device list")
-        
-        # Validate device list
-        if 'list' not in parsed:
-            console.log("Missing 'list' field in devices response")
-            return
-            
-        device_list = parsed.get("list", [])
-        if not isinstance(device_list, list):
-            console.log("Device list is not an array")
-            return
-        
-        # Deduplicate devices by MAC address (keep first occurrence)
-        seen_macs = set()
-        unique_devices = []
-        for dev in device_list:
-            mac = dev.get("mac", "")
-            if mac and mac not in seen_macs:
-                seen_macs.add(mac)
-                unique_devices.append(dev)
-            elif mac in seen_macs:
-                console.log(f"Skipping duplicate device with MAC: {mac}")
+    if kind == "debug":
+        console.info(f"📡 Hub: {value}")
+    elif kind == "devices":
+        devices = value
         
-        console.log(f"Filtered {len(device_list)} devices to {len(unique_devices)} unique devices")
+        # A devices list ends any scan in flight
+        _finish_scan(devices)
         
-        # Convert to expected format
-        devices = []
-        for dev in unique_devices:
-            # Calculate signal bars from RSSI
-            rssi = dev.get("rssi", -100)
-            if rssi >= -50:
-                signal = 3
-            elif rssi >= -70:
-                signal = 2
-            elif rssi >= -85:
-                signal = 1
-            else:
-                signal = 0
-            
-            # Convert battery percentage to level
-            battery_pct = dev.get("battery", 50)
-            if battery_pct >= 75:
-                battery = "full"
-            elif battery_pct >= 50:
-                battery = "high"
-            elif battery_pct >= 25:
-                battery = "medium"
-            else:
-                battery = "low"
-            
-            # Get original device name
-            device_name = dev.get("id", "Unknown")
-            
-            # Create sanitized ID for DOM selectors (remove spaces and special chars)
-            # Replace spaces with hyphens and remove any characters that aren't alphanumeric or hyphens
-            sanitized_id = device_name.replace(" ", "-").replace("_", "-")
-            # Remove any remaining special characters
-            sanitized_id = ''.join(c for c in sanitized_id if c.isalnum() or c == '-')
-            
-            console.log(f"DEBUG SANITIZATION: '{device_name}' -> '{sanitized_id}'")
-            
-            devices.append({
-                "id": sanitized_id,  # Sanitized ID for DOM selectors
-                "name": device_name,  # Original name for display
-                "type": "module",
-                "rssi": rssi,
-                "signal": signal,
-                "battery": battery
-            })
-        
-        # Call JavaScript directly
         if hasattr(window, 'onDevicesUpdated'):
-            console.log("Python: Calling onDevicesUpdated directly")
-            console.log(f"Devices to send: {devices}")
-            
-            # Convert Python list to JavaScript array using to_js()
-            # This creates proper JavaScript objects that won't be garbage collected
-            js_devices = to_js(devices, dict_converter=Object.fromEntries)
-            
-            console.log(f"Converted to JS: {len(devices)} devices")
-            window.onDevicesUpdated(js_devices)
-            console.log("onDevicesUpdated called successfully")
+            # to_js creates proper JavaScript objects that won't be garbage collected
+            window.onDevicesUpdated(to_js(devices, dict_converter=Object.fromEntries))
         else:
             console.log("Python: onDevicesUpdated not available")
         
         console.log(f"Updated {len(devices)} devices from hub")
-    elif parsed.get("type") == "ack":
-        # Acknowledgment from hub that command was sent
-        console.log("Received acknowledgment from hub")
-        command = parsed.get("command", "unknown")
-        status = parsed.get("status", "unknown")
-        rssi = parsed.get("rssi", "all")
-        
-        if status == "sent":
-            console.log(f"✓ Command '{command}' sent successfully (RSSI: {rssi})")
-            # Optionally show toast for user feedback
-            # showToast(f"Command '{command}' sent to modules", "success")
-        else:
-            console.log(f"✗ Command '{command}' failed to send (status: {status})")
-            # Optionally show error toast
-            # showToast(f"Command '{command}' failed", "error")
-    elif parsed.get("type") == "error":
-        # Error message from hub
-        console.log("Received error from hub")
-        error_msg = parsed.get("message", "Unknown error")
-        console.log(f"Hub error: {error_msg}")
-        
+    elif kind == "device":
+        console.log(f"Scan: {len(value)} devices so far")
+        if hasattr(window, 'onDevicesDiscovered'):
+            window.onDevicesDiscovered(to_js(value, dict_converter=Object.fromEntries))
+    elif kind == "error":
         # Show error to user
         if hasattr(window, 'showToast'):
-            window.showToast(error_msg, "error")
-    else:
-        console.log(f"Unknown message type: {parsed.get('type')}")
+            window.showToast(value, "error")
 
 def on_ble_data(data):
     """
     Handle incoming BLE data with message framing protocol.
     
-    Message Framing Protocol:
-    -------------------------
-    Format: MSG:<length>|<payload>
-    
-    Example:
-    - Fragment 1: "MSG:330|"  (header indicating 330 bytes follow)
-    - Fragment 2-N: Payload chunks (100 bytes each typically)
-    
-    State Machine:
-    1. waiting_header: Looking for "MSG:<length>|" header
-    2. receiving_payload: Accumulating payload bytes until we have <length> bytes
-    
-    This approach is much more robust than trying to detect JSON completeness,
-    as it explicitly tells us how many bytes to expect.
+    Fragments (MSG:<length>|<payload>, see BleFramer in mpy/protocol.py)
+    are reassembled and each complete payload is processed.
     
     Parameters:
     -----------
-    data : str
-        Raw string fragment from BLE notification
+    data : str or dict
+        Raw string fragment from BLE notification (or a line the
+        notification handler already parsed as JSON)
     """
-    global _frame_state, _expected_payload_length, _payload_buffer, _frame_buffer, _last_fragment_time
-    
-    console.log(f"=== BLE FRAGMENT v2.0 (FRAMED) ===")
-    console.log(f"State: {_frame_state}")
-    console.log(f"Fragment: {data[:50]}{'...' if len(data) > 50 else ''}")
-    console.log(f"Fragment length: {len(data)}")
-    
-    # Timeout handling
-    current_time = time.time()
-    if _frame_buffer or _payload_buffer:
-        if (current_time - _last_fragment_time) > _buffer_timeout:
-            console.log(f"TIMEOUT: Resetting frame state (no data for {_buffer_timeout}s)")
-            _frame_state = "waiting_header"
-            _frame_buffer = ""
-            _payload_buffer = ""
-            _expected_payload_length = 0
-    
-    _last_fragment_time = current_time
-    
-    # State machine for framed message reception
-    # Track if we just transitioned states in this call
-    state_changed = False
-    
-    if _frame_state == "waiting_header":
-        # Accumulate data until we find the header
-        _frame_buffer += data
-        
-        # Look for frame header: MSG:<length>|
-        if "MSG:" in _frame_buffer and "|" in _frame_buffer:
-            # Extract header
-            header_start = _frame_buffer.index("MSG:")
-            header_end = _frame_buffer.index("|", header_start)
-            
-            # Parse length from header
-            try:
-                length_str = _frame_buffer[header_start + 4:header_end]
-                _expected_payload_length = int(length_str)
-                console.log(f"HEADER RECEIVED: Expecting {_expected_payload_length} bytes of payload")
-                
-                # Any data after the "|" is the start of the payload
-                payload_start = header_end + 1
-                _payload_buffer = _frame_buffer[payload_start:]
-                _frame_buffer = ""
-                
-                # Transition to receiving payload state
-                _frame_state = "receiving_payload"
-                state_changed = True  # Mark that we just transitioned
-                console.log(f"State -> receiving_payload (already have {len(_payload_buffer)} bytes)")
-                
-                # Check if header fragment contained complete payload
-                if len(_payload_buffer) >= _expected_payload_length:
-                    # Complete message was in header fragment!
-                    complete_payload = _payload_buffer[:_expected_payload_length]
-                    console.log(f"PAYLOAD COMPLETE: {len(complete_payload)} bytes received (in header fragment)")
-                    console.log(f"Processing complete framed message...")
-                    
-                    # Process the complete message
-                    process_complete_message(complete_payload)
-                    
-                    # Reset state for next message
-                    _frame_state = "waiting_header"
-                    _payload_buffer = ""
-                    _frame_buffer = ""
-                    _expected_payload_length = 0
-                    console.log("State -> waiting_header (ready for next message)")
-                    return
-                
-            except (ValueError, IndexError) as e:
-                console.log(f"ERROR: Failed to parse header: {e}")
-                console.log(f"Header buffer: {_frame_buffer}")
-                _frame_buffer = ""
-                return
-        else:
-            console.log(f"Still waiting for header (buffer: {len(_frame_buffer)} bytes)")
-            return
-    
-    # Only process payload if we're already in receiving_payload state 
-    # (not if we just transitioned to it in this same call)
-    if _frame_state == "receiving_payload" and not state_changed:
-        # Add new fragment to payload buffer
-        _payload_buffer += data
-        
-        console.log(f"Payload progress: {len(_payload_buffer)}/{_expected_payload_length} bytes")
-        
-        # Check if we have the complete payload
-        if len(_payload_buffer) >= _expected_payload_length:
-            # Extract exact payload (trim any extra data)
-            complete_payload = _payload_buffer[:_expected_payload_length]
-            
-            console.log(f"PAYLOAD COMPLETE: {len(complete_payload)} bytes received")
-            console.log(f"Processing complete framed message...")
-            
-            # Process the complete message
-            process_complete_message(complete_payload)
-            
-            # Reset state for next message
-            _frame_state = "waiting_header"
-            _payload_buffer = ""
-            _frame_buffer = ""
-            _expected_payload_length = 0
-            
-            console.log("State -> waiting_header (ready for next message)")
-        else:
-            console.log(f"Waiting for more payload ({_expected_payload_length - len(_payload_buffer)} bytes remaining)")
+    if isinstance(data, dict):
+        process_complete_message(data)
+        return
+    for payload in ble_framer.feed(data, time.time()):
+        process_complete_message(payload)
 
 
 # Set the callback for BLE data
@@ -500,6 +253,9 @@ async def connect_hub_serial():
             
             # Set up data callback to reuse BLE data processing
             serial.on_data_callback = on_serial_data
+            serial.on_debug_callback = on_serial_debug
+            serial.on_telemetry_callback = on_serial_telemetry
+            serial.on_repl_callback = on_serial_repl
             
             console.log("Serial connected successfully")
             
@@ -567,6 +323,44 @@ def on_serial_data(data):
     # Process the message (it will handle JSON vs debug message filtering)
     process_complete_message(data)
 
+def on_serial_debug(text):
+    """Handle the hub's debug channel (and unframed prints)."""
+    console.info(f"📡 Hub: {text}")
+
+def on_serial_telemetry(data):
+    """Handle the hub's telemetry channel."""
+    if hasattr(window, 'onHubTelemetry'):
+        window.onHubTelemetry(to_js(data, dict_converter=Object.fromEntries))
+
+def on_serial_repl(data):
+    """Handle the hub's REPL-control channel (program running/stopped)."""
+    console.log(f"Hub program {data.get('state')}")
+
+async def request_hub_stats(reset=False):
+    """Ask the hub for a stats snapshot; it arrives via window.onHubTelemetry."""
+    js_result = Object.new()
+    if not serial_connected:
+        js_result.status = "error"
+        js_result.error = "Not connected to hub"
+        return js_result
+    cmd_obj = {"cmd": "stats"}
+    if reset:
+        cmd_obj["reset"] = True
+    sent = await serial.send_json(cmd_obj)
+    js_result.status = "sent" if sent else "error"
+    return js_result
+
+async def set_hub_debug_output(enabled):
+    """Turn the hub's debug channel on or off (off saves USB bandwidth)."""
+    js_result = Object.new()
+    if not serial_connected:
+        js_result.status = "error"
+        js_result.error = "Not connected to hub"
+        return js_result
+    sent = await serial.mute("G", not enabled)
+    js_result.status = "sent" if sent else "error"
+    return js_result
+
 def on_serial_connection_lost():
     """
     Handle unexpected serial connection loss.
@@ -587,12 +381,14 @@ def on_serial_connection_lost():
     console.log(f"AFTER: serial_connected={serial_connected}, mode={hub_connection_mode}")
     console.log(f"serial.is_connected() = {serial.is_connected()}")
 
-async def send_command_to_hub(command, rssi_threshold="all"):
+async def send_command_to_hub(command, rssi_threshold="all", macs=None):
     """Send command to hub for ESP-NOW broadcast to modules.
     
     Args:
         command: Command name (e.g., "play", "pause", "win")
         rssi_threshold: "all" or "-XX" for RSSI >= -XX dBm
+        macs: Optional list of module MACs ("aa:bb:..") - the hub unicasts to
+              these instead of broadcasting (serial only)
     
     Returns:
         JavaScript object with status: "sent"|"error"
@@ -608,6 +404,9 @@ async def send_command_to_hub(command, rssi_threshold="all"):
         
         # Format for Serial (JSON)
         cmd_obj = {"cmd": command, "rssi": rssi_threshold}
+        if macs:
+            # JS arrays arrive as JsProxy - convert to a Python list
+            cmd_obj["macs"] = [str(mac) for mac in macs if mac]
         message = json.dumps(cmd_obj)
         success = await serial.send_json(message)
         
@@ -662,52 +461,77 @@ def get_connection_status():
     js_result.device = hub_device_name if (actual_connected_bool and hub_device_name) else ""
     return js_result
 
-async def refresh_devices_from_hub(rssi_threshold="all"):
-    """Request device list from hub with RSSI filtering.
+async def refresh_devices_from_hub(rssi_threshold="all", timeout=None):
+    """Scan for devices via the hub and wait for the result.
+    
+    Module replies are streamed to window.onDevicesDiscovered as they arrive.
+    Resolves when the hub sends its final device list or the deadline passes
+    (with whatever was found so far). Concurrent calls share the scan in
+    flight instead of sending another PING.
     
     Args:
         rssi_threshold: "all" for no filter, or "-XX" for RSSI >= -XX dBm
+        timeout: Seconds to wait for the hub (default _scan_timeout)
     
     Returns:
         JavaScript array of device objects
     """
-    global devices
+    global devices, _scan_future
+    
+    # Join the scan already in flight
+    if _scan_future is not None and not _scan_future.done():
+        console.log("Device scan already in progress - waiting for its result")
+        result = await _scan_future
+        return to_js(result, dict_converter=Object.fromEntries)
     
     # Convert rssi_threshold to string for protocol
     threshold_str = str(rssi_threshold)
     
+    # Check connection based on mode
+    if hub_connection_mode == "serial":
+        connected = serial.is_connected()
+    elif hub_connection_mode == "ble":
+        connected = ble.is_connected()
+    else:
+        connected = False
+    
+    if not connected:
+        console.log("Cannot refresh: Hub not connected")
+        return to_js([])
+    
+    # Register the scan before sending so fast replies are not missed
+    scan = asyncio.get_event_loop().create_future()
+    _scan_future = scan
+    hub_messages.start_scan()
+    
     # Send PING command based on connection mode
     if hub_connection_mode == "serial":
-        if not serial.is_connected():
-            console.log("Cannot refresh: Hub not connected")
-            return to_js([])
-        
         # Format for Serial (JSON)
         ping_obj = {"cmd": "PING", "rssi": threshold_str}
         ping_command = json.dumps(ping_obj)
-        await serial.send_json(ping_command)
-        
-    elif hub_connection_mode == "ble":
-        if not ble.is_connected():
-            console.log("Cannot refresh: Hub not connected")
-            return to_js([])
-        
+        sent = await serial.send_json(ping_command)
+    else:
         # Format for BLE (legacy format)
         ping_command = f'"PING":"{threshold_str}"'
-        await ble.send(ping_command)
-    
-    else:
-        console.log("Cannot refresh: Hub not connected")
-        return to_js([])
+        sent = await ble.send(ping_command)
     
-    # Wait for response (hub should send back device list)
-    # The response will be handled by on_ble_data or on_serial_data callback
-    # which will update the global devices list
+    if not sent:
+        _finish_scan(devices)
+        return to_js(devices, dict_converter=Object.fromEntries)
     
     console.log(f"Device scan requested from hub ({hub_connection_mode}) with RSSI threshold: {threshold_str}")
     
+    # Results arrive through on_ble_data / on_serial_data, which resolve the scan
+    try:
+        result = await asyncio.wait_for(asyncio.shield(scan), timeout or _scan_timeout)
+    except asyncio.TimeoutError:
+        console.log(f"Device scan deadline passed - using {len(hub_messages.scan_results)} partial results")
+        devices = list(hub_messages.scan_results.values())
+        result = devices
+        _finish_scan(result)
+    
     # Convert Python list to JavaScript array using to_js()
-    return to_js(devices, dict_converter=Object.fromEntries)
+    return to_js(result, dict_converter=Object.fromEntries)
 
 def get_devices():
     """Return list of available devices (legacy, use refresh_devices_from_hub)."""
@@ -731,11 +555,12 @@ def send_command(command, device_ids):
     """Send command to specific devices (legacy, use send_command_to_hub)."""
     console.log(f"Python: Sending '{command}' to {len(device_ids)} devices")
     
-    if ble.is_connected():
-        # Use BLE to send command to hub
-        # Convert range slider to RSSI threshold (this will be done in JS)
+    if ble.is_connected() or serial.is_connected():
+        # Look up the MACs of the selected devices so the hub can unicast
+        wanted = set(str(device_id) for device_id in device_ids)
+        macs = [dev["mac"] for dev in devices if dev["id"] in wanted and dev.get("mac")]
         rssi_threshold = "all"  # Default to all
-        return send_command_to_hub(command, rssi_threshold)
+        return send_command_to_hub(command, rssi_threshold, macs)
     else:
         # Return error if not connected
         js_result = Object.new()
@@ -1095,6 +920,8 @@ window.disconnect_hub_serial = create_proxy(disconnect_hub_serial)
 window.send_command_to_hub = create_proxy(send_command_to_hub)
 window.refresh_devices = create_proxy(refresh_devices)
 window.refresh_devices_from_hub = create_proxy(refresh_devices_from_hub)
+window.set_hub_debug_output = create_proxy(set_hub_debug_output)
+window.request_hub_stats = create_proxy(request_hub_stats)
 
 # Firmware upload and device management functions
 window.upload_firmware = create_proxy(upload_firmware)
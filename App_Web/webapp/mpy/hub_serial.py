@@ -8,6 +8,7 @@ Responsibilities:
 - Connect/disconnect serial port
 - Send/receive JSON messages
 - Manage JSON read loop
+- Demultiplex framed hub output into data/debug/telemetry/REPL channels
 - Handle connection loss
 
 Architecture:
@@ -19,15 +20,21 @@ from pyscript import window
 import asyncio
 import json
 
+from mpy.protocol import FrameDemux, CH_DATA, CH_DEBUG, CH_TELEMETRY, CH_REPL, JSON_CHANNELS
+
 
 class SerialConnection:
     """Manages Serial connection and JSON message protocol"""
     
     def __init__(self):
         """Initialize Serial connection manager"""
-        self.on_data_callback = None
+        self.on_data_callback = None        # data channel, parsed JSON dict
+        self.on_debug_callback = None       # debug channel, text
+        self.on_telemetry_callback = None   # telemetry channel, parsed JSON dict
+        self.on_repl_callback = None        # REPL-control channel, parsed JSON dict
         self.on_connection_lost_callback = None
         self.read_loop_stop = None
+        self.demux = FrameDemux()
         print("🔌 SerialConnection initialized")
         
         # Check if JS adapter is available
@@ -105,6 +112,14 @@ class SerialConnection:
             print(f"Serial send error: {e}")
             return False
     
+    async def mute(self, channel=CH_DEBUG, on=True):
+        """
+        Ask the hub to stop (or resume) sending a channel.
+        
+        Muting debug frees USB bandwidth and parse time; data cannot be muted.
+        """
+        return await self.send_json({"cmd": "mute", "channel": channel, "on": on})
+    
     async def send_raw(self, data):
         """
         Send raw bytes without adding newline (for REPL commands).
@@ -140,26 +155,31 @@ class SerialConnection:
             # Stop existing loop
             self.read_loop_stop()
         
+        self.demux = FrameDemux()
+        callbacks = {
+            CH_DATA: lambda: self.on_data_callback,
+            CH_DEBUG: lambda: self.on_debug_callback,
+            CH_TELEMETRY: lambda: self.on_telemetry_callback,
+            CH_REPL: lambda: self.on_repl_callback,
+        }
+        
         # Start read loop with JS adapter
         def on_data(data):
             """Handle incoming data from JS adapter"""
             if not data:
                 return
-                
-            # Parse line-delimited JSON messages
-            lines = data.split('\n')
-            for line in lines:
-                line = line.strip()
-                if not line:
+            
+            for channel, payload in self.demux.feed(data):
+                callback = callbacks.get(channel, lambda: None)()
+                if not callback:
                     continue
-                
-                try:
-                    message = json.loads(line)
-                    if self.on_data_callback:
-                        self.on_data_callback(message)
-                except json.JSONDecodeError:
-                    # Not valid JSON, ignore
-                    pass
+                if channel in JSON_CHANNELS:
+                    try:
+                        payload = json.loads(payload)
+                    except json.JSONDecodeError:
+                        # Not valid JSON, ignore
+                        continue
+                callback(payload)
         
         def on_error(error):
             """Handle read errors"""
@@ -0,0 +1,358 @@
+"""
+Hub Protocol
+
+Everything the webapp does with bytes from the hub that does not need the
+browser: serial frame parsing, BLE message reassembly, JSON parsing and
+repair, and turning hub messages into device lists for the UI.
+
+Responsibilities:
+- Demultiplex framed serial output into data/debug/telemetry/REPL channels
+- Reassemble BLE "MSG:<length>|<payload>" fragments
+- Parse hub JSON (with one repair attempt for truncated messages)
+- Bucket RSSI and battery into signal bars and battery levels
+- Track scan results and the current device list
+
+Architecture:
+- No pyscript/js imports, so it runs (and is benchmarked) on plain CPython
+- main.py and hub_serial.py are the bridge: they feed data in and pass the
+  results on to JavaScript
+- Logging goes through an optional log callable (console.log in the browser)
+"""
+
+import json
+
+
+# Hub output frames: FRAME_START, channel, payload length, ':', payload,
+# 2 hex digit checksum (sum of the payload's UTF-8 bytes), newline.
+# Must match SerialBridge in hubCode/main.py.
+FRAME_START = "\x1e"
+CH_DATA = "D"       # JSON for the webapp
+CH_DEBUG = "G"      # debug text
+CH_TELEMETRY = "T"  # JSON statistics
+CH_REPL = "R"       # hub program state
+JSON_CHANNELS = (CH_DATA, CH_TELEMETRY, CH_REPL)
+
+# BLE framing: MSG:<length>|<payload>
+BLE_HEADER = "MSG:"
+BLE_TIMEOUT = 2.0  # seconds without a fragment before a partial message is dropped
+
+
+class FrameDemux:
+    """Reassemble hub output into (channel, payload) pairs.
+
+    Serial reads can end anywhere, so partial lines are kept until the next
+    chunk. Lines without a frame are passed through as data (JSON from older
+    hub firmware) or debug (any other print on the hub).
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.errors = 0  # frames dropped for a bad length or checksum
+
+    def feed(self, data):
+        """Add received text and return the complete messages as (channel, payload)"""
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split("\n")
+        messages = []
+        for line in lines:
+            line = line.rstrip("\r")
+            if not line.strip():
+                continue
+            if line.startswith(FRAME_START):
+                message = self.parse_frame(line)
+                if message:
+                    messages.append(message)
+                else:
+                    self.errors += 1
+            elif line.lstrip().startswith("{"):
+                messages.append((CH_DATA, line.strip()))
+            else:
+                messages.append((CH_DEBUG, line))
+        return messages
+
+    @staticmethod
+    def parse_frame(line):
+        """Check one frame line; returns (channel, payload) or None if it is damaged"""
+        channel = line[1:2]
+        header, sep, rest = line[2:].partition(":")
+        if not sep or not header.isdigit():
+            return None
+        length = int(header)
+        payload, checksum = rest[:length], rest[length:]
+        if len(payload) != length or len(checksum) != 2:
+            return None
+        try:
+            if int(checksum, 16) != sum(payload.encode("utf-8")) & 0xFF:
+                return None
+        except ValueError:
+            return None
+        return channel, payload
+
+
+class BleFramer:
+    """Reassemble BLE notifications framed as MSG:<length>|<payload>.
+
+    State Machine:
+    1. waiting_header: looking for "MSG:<length>|"
+    2. receiving_payload: collecting fragments until <length> characters arrived
+
+    A fragment may hold the end of one message and the start of the next;
+    the rest is kept as the start of the next header. A partial message is
+    dropped when no fragment arrives for BLE_TIMEOUT seconds.
+    """
+
+    def __init__(self, log=None, timeout=BLE_TIMEOUT):
+        self.log = log
+        self.timeout = timeout
+        self.state = "waiting_header"
+        self.expected = 0       # payload length from the header
+        self.payload = ""
+        self.buffer = ""        # text before a complete header
+        self.last_time = 0
+        self.errors = 0         # unreadable headers
+
+    def reset(self):
+        """Forget any partial message"""
+        self.state = "waiting_header"
+        self.expected = 0
+        self.payload = ""
+        self.buffer = ""
+
+    def feed(self, data, now):
+        """Add one notification (received at time now, in seconds) and return the completed payloads"""
+        log = self.log
+        if (self.buffer or self.payload) and now - self.last_time > self.timeout:
+            if log:
+                log(f"TIMEOUT: Resetting frame state (no data for {self.timeout}s)")
+            self.reset()
+        self.last_time = now
+
+        messages = []
+        if self.state == "receiving_payload":
+            self.payload += data
+        else:
+            self.buffer += data
+        while True:
+            if self.state == "waiting_header":
+                start = self.buffer.find(BLE_HEADER)
+                end = self.buffer.find("|", start) if start >= 0 else -1
+                if end < 0:
+                    if log:
+                        log(f"Still waiting for header (buffer: {len(self.buffer)} bytes)")
+                    break
+                length = self.buffer[start + len(BLE_HEADER):end]
+                if not length.isdigit():
+                    if log:
+                        log(f"ERROR: Failed to parse header: {self.buffer[start:end + 1]}")
+                    self.errors += 1
+                    self.buffer = self.buffer[end + 1:]
+                    continue
+                self.expected = int(length)
+                self.payload = self.buffer[end + 1:]
+                self.buffer = ""
+                self.state = "receiving_payload"
+                if log:
+                    log(f"HEADER RECEIVED: Expecting {self.expected} bytes of payload")
+            if len(self.payload) < self.expected:
+                if log:
+                    log(f"Payload progress: {len(self.payload)}/{self.expected} bytes")
+                break
+            messages.append(self.payload[:self.expected])
+            if log:
+                log(f"PAYLOAD COMPLETE: {self.expected} bytes received")
+            self.buffer = self.payload[self.expected:]
+            self.payload = ""
+            self.expected = 0
+            self.state = "waiting_header"
+        return messages
+
+
+def parse_hub_response(data, log=None):
+    """
+    Parse and validate JSON response from ESP32 hub.
+
+    Parameters:
+    -----------
+    data : str
+        Raw JSON string from hub (should already be filtered to only JSON messages)
+    log : callable, optional
+        Called with a note when a truncated message had to be repaired
+
+    Returns:
+    --------
+    dict or None: Parsed JSON data if successful, None if parsing failed
+
+    Error Handling:
+    - Single repair attempt for truncated JSON
+    - Minimal logging (detailed errors handled by caller)
+    """
+    try:
+        # Try to parse JSON normally first
+        return json.loads(data)
+    except Exception as e:
+        # Single repair attempt for truncated JSON
+        if "Unterminated string" in str(e) or "Expecting" in str(e):
+            try:
+                parsed = json.loads(data + '"]}')
+                if log:
+                    log("⚠️ Fixed truncated JSON from hub")
+                return parsed
+            except Exception:
+                return None
+        return None
+
+
+def signal_bars(rssi):
+    """Signal strength in bars (0-3) for an RSSI in dBm"""
+    if rssi >= -50:
+        return 3
+    if rssi >= -70:
+        return 2
+    if rssi >= -85:
+        return 1
+    return 0
+
+
+def battery_level(percent):
+    """Battery level name ("full", "high", "medium", "low") for a percentage"""
+    if percent >= 75:
+        return "full"
+    if percent >= 50:
+        return "high"
+    if percent >= 25:
+        return "medium"
+    return "low"
+
+
+def format_device(dev):
+    """
+    Convert a device dict from the hub into the format used by the frontend.
+
+    Parameters:
+    -----------
+    dev : dict
+        Device entry from the hub ({"id", "mac", "rssi", "battery", ...})
+
+    Returns:
+    --------
+    dict: Device with sanitized id, display name, signal bars and battery level
+    """
+    rssi = dev.get("rssi", -100)
+
+    # Get original device name
+    device_name = dev.get("id", "Unknown")
+
+    # Create sanitized ID for DOM selectors (remove spaces and special chars)
+    # Replace spaces with hyphens and remove any characters that aren't alphanumeric or hyphens
+    sanitized_id = device_name.replace(" ", "-").replace("_", "-")
+    # Remove any remaining special characters
+    sanitized_id = ''.join(c for c in sanitized_id if c.isalnum() or c == '-')
+
+    return {
+        "id": sanitized_id,  # Sanitized ID for DOM selectors
+        "name": device_name,  # Original name for display
+        "mac": dev.get("mac", ""),
+        "type": "module",
+        "rssi": rssi,
+        "signal": signal_bars(rssi),
+        "battery": battery_level(dev.get("battery", 50))
+    }
+
+
+def unique_devices(device_list):
+    """Drop entries without a MAC and repeats of a MAC (the first one wins)"""
+    seen_macs = set()
+    unique = []
+    for dev in device_list:
+        mac = dev.get("mac", "") if isinstance(dev, dict) else ""
+        if mac and mac not in seen_macs:
+            seen_macs.add(mac)
+            unique.append(dev)
+    return unique
+
+
+class HubMessages:
+    """Turn complete hub messages into events for the UI.
+
+    handle() returns (kind, value) or None when there is nothing to do:
+    - ("debug", text): a plain text print from the hub
+    - ("devices", list): final device list (ends a scan)
+    - ("device", list): one more module answered a scan; value is all found so far
+    - ("ack", message) and ("error", text)
+
+    devices holds the last final list, scan_results the modules heard in the
+    scan in flight (MAC -> formatted device).
+    """
+
+    def __init__(self, log=None):
+        self.log = log
+        self.devices = []
+        self.scan_results = {}
+        self.errors = 0     # messages that could not be parsed
+
+    def start_scan(self):
+        """Forget the partial results of the previous scan"""
+        self.scan_results = {}
+
+    def handle(self, message):
+        """Handle one message: a dict already parsed by the serial loop, or text"""
+        log = self.log
+        if isinstance(message, dict):
+            parsed = message
+        else:
+            message = message.strip()
+            if not message.startswith('{'):
+                # Not JSON - this is a debug/print statement from the hub
+                return ("debug", message)
+            parsed = parse_hub_response(message, log)
+            if not isinstance(parsed, dict):
+                self.errors += 1
+                if log:
+                    log(f"❌ Failed to parse hub JSON: {message}")
+                return None
+
+        kind = parsed.get("type")
+        if kind == "devices":
+            device_list = parsed.get("list")
+            if not isinstance(device_list, list):
+                if log:
+                    log("Missing or invalid 'list' field in devices response")
+                return None
+            unique = unique_devices(device_list)
+            if log:
+                log(f"Filtered {len(device_list)} devices to {len(unique)} unique devices")
+            self.devices = [format_device(dev) for dev in unique]
+            return ("devices", self.devices)
+
+        if kind == "device":
+            # Partial scan result - one module answered, more may follow
+            dev = parsed.get("device")
+            if not isinstance(dev, dict) or not dev.get("mac"):
+                if log:
+                    log("Missing 'device' field in device response")
+                return None
+            self.scan_results[dev["mac"]] = format_device(dev)
+            return ("device", list(self.scan_results.values()))
+
+        if kind == "ack":
+            if log:
+                command = parsed.get("command", "unknown")
+                status = parsed.get("status", "unknown")
+                if status == "sent":
+                    log(f"✓ Command '{command}' sent successfully (RSSI: {parsed.get('rssi', 'all')})")
+                elif status == "partial":
+                    failed = parsed.get("failed", [])
+                    log(f"⚠️ Command '{command}' not acknowledged by {len(failed)} modules: {failed}")
+                else:
+                    log(f"✗ Command '{command}' failed to send (status: {status})")
+            return ("ack", parsed)
+
+        if kind == "error":
+            error_msg = parsed.get("message", "Unknown error")
+            if log:
+                log(f"Hub error: {error_msg}")
+            return ("error", error_msg)
+
+        if log:
+            log(f"Unknown message type: {kind}")
+        return None
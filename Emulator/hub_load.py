@@ -0,0 +1,301 @@
+"""
+Hub load generator - how much module traffic and how many commands one hub handles.
+
+Emulated (default): the real hubCode plus N virtual modules running
+swarm/main.py on the emulator's radio.
+
+    python hub_load.py --modules 200 --battery-ms 2000 --stats-ms 10000 --cmd-rate 2
+    python hub_load.py --modules 100 --loss 0.05 --cpu-scale 40 --json report.json
+
+Real hub: a second ESP32 runs swarm/main.py (see its docstring) and this
+script drives the hub over USB serial (needs pyserial).
+
+    python hub_load.py --port /dev/ttyACM0 --seconds 60 --cmd-rate 1
+
+Reports command latency (serial in -> ack out), scan time and modules found,
+and the hub's own stats: rx rate, queue and driver drops, loop lag, memory.
+The emulator adds fan-out latency (command -> each module), uplink latency
+(module /stats -> hub telemetry), radio losses and the hub's CPython heap.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+
+from mpyemu.serial import parse_frame
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SWARM_CODE = os.path.join(HERE, "swarm")
+WIRE_CODE = os.path.join(HERE, "..", "Plushie_Module", "utilities", "wire.py")
+COMMANDS = ["Shake", "stats", "Flash", "Notes"]
+SHOWS = {"Flash", "Wave", "Chase", "Twinkle", "Stop_show"}
+
+
+def percentiles(samples):
+    """p50/p90/p99/max in ms of samples in seconds"""
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+
+    def p(q):
+        return round(s[min(len(s) - 1, math.ceil(q * len(s)) - 1)] * 1000, 2)
+    return {"n": len(s), "p50": p(0.5), "p90": p(0.9), "p99": p(0.99), "max": round(s[-1] * 1000, 2)}
+
+
+class Recorder:
+    """Pairs commands written to the hub with the frames that answer them.
+
+    The hub handles serial commands one at a time, so answers come back in
+    order: an ack for game and show commands and a stats frame for stats.
+    A PING is answered by the device list when its scan ends, later.
+    """
+
+    def __init__(self, now):
+        self.now = now              # seconds, virtual or wall clock
+        self.pending = []           # [(cmd, sent at)]
+        self.scanning = []          # PING send times
+        self.latency = []
+        self.scans = []             # (seconds, modules found)
+        self.stats = None           # last hub stats snapshot
+        self.module_stats = []      # (id, k, arrived at)
+        self.bad_frames = 0
+        self.sent = {"game": [], "show": []}   # command write times, for fan-out
+
+    def command(self, cmd):
+        t = self.now()
+        if cmd == "PING":
+            self.scanning.append(t)
+            return
+        self.pending.append((cmd, t))
+        if cmd in SHOWS:
+            self.sent["show"].append(t)
+        elif cmd not in ("stats", "PING"):
+            self.sent["game"].append(t)
+
+    def _answers(self, cmd, ch, msg):
+        if cmd == "stats":
+            return ch == "T" and msg.get("type") == "stats"
+        return ch == "D" and msg.get("type") == "ack" and msg.get("command") == cmd
+
+    def line(self, line):
+        try:
+            ch, payload = parse_frame(line)
+        except ValueError:
+            self.bad_frames += 1
+            return
+        if ch not in ("D", "T"):
+            return
+        try:
+            msg = json.loads(payload)
+        except ValueError:
+            self.bad_frames += 1
+            return
+        t = self.now()
+        if ch == "T" and msg.get("type") == "stats":
+            self.stats = msg
+        elif ch == "T" and msg.get("type") == "module_stats":
+            self.module_stats.append((msg.get("id"), msg.get("stats", {}).get("n"), t))
+        if ch == "D" and msg.get("type") == "devices" and msg.get("done") and self.scanning:
+            # PINGs sent while a scan runs join it, so one list answers them all
+            self.scans.append((t - self.scanning[0], len(msg.get("list", []))))
+            self.scanning = []
+        for i, (cmd, sent) in enumerate(self.pending):
+            if self._answers(cmd, ch, msg):
+                del self.pending[:i + 1]     # anything before it went unanswered
+                self.latency.append(t - sent)
+                break
+
+    def report(self):
+        return {
+            "commands": percentiles(self.latency),
+            "unanswered": len(self.pending) + len(self.scanning),
+            "scans": [{"ms": round(s * 1000), "found": n} for s, n in self.scans],
+            "bad_frames": self.bad_frames,
+            "hub": self.stats,
+        }
+
+
+def run_emulated(args):
+    import tracemalloc
+    from mpyemu import Emulator, Radio
+
+    if args.heap:
+        tracemalloc.start()
+    radio = Radio(latency_ms=args.latency, loss=args.loss, seed=args.seed)
+    emu = Emulator(radio, cpu_scale=args.cpu_scale)
+    rec = Recorder(lambda: emu.seconds)
+    hub = emu.add_hub()
+    hub.serial.listeners.append(rec.line)
+
+    with open(WIRE_CODE) as f:
+        wire = f.read()
+    rng = random.Random(args.seed)
+    boards = math.ceil(args.modules / args.per_board)
+    fanout = {"game": [], "show": []}
+    uplink_sent = {}
+    swarms = []
+    for b in range(boards):
+        count = min(args.per_board, args.modules - b * args.per_board)
+        config = {"count": count, "prefix": "load", "first": b * args.per_board, "battery_ms": args.battery_ms,
+                  "stats_ms": args.stats_ms, "ping_ms": args.ping_ms, "scan": True, "log": True}
+        angle, dist = rng.uniform(0, 2 * math.pi), args.radius * math.sqrt(rng.random())
+        device = emu.add_device(f"swarm{b}", SWARM_CODE, files={"swarm.json": json.dumps(config), "wire.py": wire},
+                                pos=(dist * math.cos(angle), dist * math.sin(angle)),
+                                boot_ms=rng.uniform(0, 1000))
+        swarms.append(device)
+
+        def on_line(line, device=device):
+            word = line.split(" ", 2)
+            if word[0] == "RX" and len(word) == 3:
+                kind = "show" if word[1] == "/show" else "game" if word[1] == "/game" else None
+                if kind and rec.sent[kind]:
+                    fanout[kind].append(emu.seconds - rec.sent[kind][-1])
+            elif word[0] == "TX" and len(word) == 3:
+                uplink_sent[(word[1], int(word[2]))] = emu.seconds
+        device.serial.listeners.append(on_line)
+
+    emu.run(args.warmup)
+    hub.serial.send_json({"cmd": "stats", "reset": True})
+    emu.run(0.2)
+    rec.pending.clear()
+    rec.scanning.clear()
+    rec.module_stats.clear()
+    uplink_sent.clear()
+
+    commands = itertools.cycle(args.commands)
+    t = 0.0
+    while args.cmd_rate and t < args.seconds:
+        cmd = next(commands)
+        emu.after(t, lambda cmd=cmd: (rec.command(cmd), hub.serial.send_json({"cmd": cmd})))
+        t += 1 / args.cmd_rate
+    t = args.scan_every
+    while args.scan_every and t < args.seconds:
+        emu.after(t, lambda: (rec.command("PING"), hub.serial.send_json({"cmd": "PING"})))
+        t += args.scan_every
+
+    wall = time.perf_counter()
+    emu.run(args.seconds)
+    rec.command("stats")
+    hub.serial.send_json({"cmd": "stats"})
+    emu.run(1)
+    wall = time.perf_counter() - wall
+
+    uplink = [at - uplink_sent[(name, k)] for name, k, at in rec.module_stats if (name, k) in uplink_sent]
+    hub_net = next(iter(hub.nodes), None)
+    report = rec.report()
+    report.update({
+        "mode": "emulated",
+        "modules": args.modules,
+        "virtual_s": round(args.seconds, 1),
+        "wall_s": round(wall, 2),
+        "fanout_game": percentiles(fanout["game"]),
+        "fanout_show": percentiles(fanout["show"]),
+        "uplink_stats": percentiles(uplink),
+        "uplink_delivered": f"{len(uplink)}/{len(uplink_sent)}",
+        "module_tx": sum(n.counters[0] for d in swarms for n in d.nodes),
+        "radio": radio.stats(),
+        "hub_espnow_rx_dropped": hub_net.counters[4] if hub_net else None,
+        "errors": {d.name: len(d.errors) for d in [hub] + swarms if d.errors},
+    })
+    if args.heap:
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, "hubCode/*")])
+        report["hub_heap_bytes"] = sum(s.size for s in snapshot.statistics("filename"))
+        tracemalloc.stop()
+    emu.close()
+    return report
+
+
+def run_real(args):
+    try:
+        import serial
+    except ImportError:
+        raise SystemExit("real hub mode needs pyserial: pip install pyserial")
+    import threading
+
+    rec = Recorder(time.monotonic)
+    port = serial.Serial(args.port, args.baud, timeout=0.1)
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def reader():
+        buf = b""
+        while not done.is_set():
+            buf += port.read(4096)
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                with lock:
+                    rec.line(line.decode(errors="replace").rstrip("\r"))
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+
+    def send(cmd):
+        with lock:
+            rec.command(cmd)
+        port.write((json.dumps({"cmd": cmd}) + "\n").encode())
+
+    send("stats")
+    time.sleep(0.5)
+    port.write(b'{"cmd": "stats", "reset": true}\n')
+    time.sleep(0.5)
+    with lock:
+        rec.pending.clear()
+    commands = itertools.cycle(args.commands)
+    start = time.monotonic()
+    next_cmd = start
+    next_scan = start + args.scan_every if args.scan_every else None
+    while time.monotonic() - start < args.seconds:
+        now = time.monotonic()
+        if args.cmd_rate and now >= next_cmd:
+            send(next(commands))
+            next_cmd += 1 / args.cmd_rate
+        if next_scan and now >= next_scan:
+            send("PING")
+            next_scan += args.scan_every
+        time.sleep(0.005)
+    send("stats")
+    time.sleep(1)
+    done.set()
+    thread.join()
+    port.close()
+    report = rec.report()
+    report.update({"mode": "real", "port": args.port, "seconds": args.seconds})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", help="serial port of a real hub (default: emulate it)")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--seconds", type=float, default=30, help="length of the measured run")
+    parser.add_argument("--cmd-rate", type=float, default=1, help="webapp commands per second")
+    parser.add_argument("--commands", nargs="+", default=COMMANDS, help="commands to cycle through")
+    parser.add_argument("--scan-every", type=float, default=10, help="seconds between PINGs (0 = none)")
+    emulated = parser.add_argument_group("emulated hub")
+    emulated.add_argument("--modules", type=int, default=50)
+    emulated.add_argument("--per-board", type=int, default=1, help="virtual modules per emulated ESP32")
+    emulated.add_argument("--battery-ms", type=int, default=60000)
+    emulated.add_argument("--stats-ms", type=int, default=30000)
+    emulated.add_argument("--ping-ms", type=int, default=0)
+    emulated.add_argument("--loss", type=float, default=0.0)
+    emulated.add_argument("--latency", type=float, default=1.0, help="radio latency in ms")
+    emulated.add_argument("--radius", type=float, default=10.0, help="modules spread over this many metres")
+    emulated.add_argument("--warmup", type=float, default=3.0)
+    emulated.add_argument("--cpu-scale", type=float, default=0)
+    emulated.add_argument("--heap", action="store_true", help="track the hub's CPython heap (slower)")
+    emulated.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args()
+
+    report = run_real(args) if args.port else run_emulated(args)
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+mpyemu - run the playground's MicroPython code on a laptop.
+
+Unmodified hub (App_Web/webapp/hubCode) and module (Plushie_Module) code runs
+against emulated hardware on one virtual clock, so whole-playground scenarios
+and benchmarks run offline, faster than real time and repeatably.
+"""
+
+from .clock import VirtualClock, VirtualLoop, Idle
+from .radio import Radio
+from .device import Device
+from .sensors import LIS2DW12, MAX17048, SSD1306
+from .serial import VirtualSerial, parse_frame
+from .emulator import Emulator, HUB_CODE, MODULE_CODE
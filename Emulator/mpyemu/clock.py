@@ -0,0 +1,73 @@
+"""
+Virtual time for the emulator.
+
+Every device runs as tasks on one asyncio loop whose clock only moves when
+the loop has nothing to do: instead of waiting in select() the selector jumps
+the clock to the next timer. Blocking calls (time.sleep, I2C transfers) move
+it directly. Python code itself takes no virtual time unless cpu_scale is set.
+"""
+
+import time
+import asyncio
+import selectors
+
+
+class Idle(RuntimeError):
+    """Nothing is scheduled and nothing can wake the loop - the emulation is stuck"""
+
+
+class VirtualClock:
+    """Microsecond clock shared by all devices"""
+
+    def __init__(self):
+        self.us = 0
+
+    def advance(self, seconds):
+        if seconds > 0:
+            self.us += max(1, int(seconds * 1_000_000 + 0.999999))
+
+    def advance_us(self, us):
+        if us > 0:
+            self.us += int(us)
+
+    @property
+    def seconds(self):
+        return self.us / 1_000_000
+
+
+class VirtualSelector(selectors.SelectSelector):
+    """select() that never blocks - a timeout becomes a jump of the virtual clock.
+
+    With cpu_scale > 0 the host time spent running callbacks since the last
+    select() is also charged to the clock, scaled (MicroPython on an ESP32
+    runs very roughly 30-100x slower than CPython on a laptop).
+    """
+
+    def __init__(self, clock, cpu_scale=0):
+        super().__init__()
+        self.clock = clock
+        self.cpu_scale = cpu_scale
+        self.last = time.perf_counter()
+
+    def select(self, timeout=None):
+        if self.cpu_scale:
+            now = time.perf_counter()
+            self.clock.advance((now - self.last) * self.cpu_scale)
+        ready = super().select(0)
+        if not ready and timeout != 0:
+            if timeout is None:
+                raise Idle("emulator idle: no timers, no pending events")
+            self.clock.advance(timeout)
+        self.last = time.perf_counter()
+        return ready
+
+
+class VirtualLoop(asyncio.SelectorEventLoop):
+    """asyncio loop running on a VirtualClock"""
+
+    def __init__(self, clock=None, cpu_scale=0):
+        self.clock = clock or VirtualClock()
+        super().__init__(VirtualSelector(self.clock, cpu_scale))
+
+    def time(self):
+        return self.clock.us / 1_000_000
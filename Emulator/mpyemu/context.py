@@ -0,0 +1,33 @@
+"""
+The device that is running right now.
+
+Each device's code runs in its own contextvars.Context, so the fake hardware
+modules (shared by every device) find their device with current().
+"""
+
+import contextvars
+
+CURRENT = contextvars.ContextVar("mpyemu_device", default=None)
+
+
+def current():
+    device = CURRENT.get()
+    if device is None:
+        raise RuntimeError("not running on an emulated device")
+    return device
+
+
+class DeviceReset(BaseException):
+    """machine.reset() - unwinds the device's stack, then the device reboots"""
+
+
+class DeviceSleep(BaseException):
+    """machine.deepsleep() - the device halts until its timer or a wake pin"""
+
+    def __init__(self, ms=0):
+        super().__init__(ms)
+        self.ms = ms
+
+
+class DeviceExit(BaseException):
+    """sys.exit() - the program ends and the device sits at the REPL"""
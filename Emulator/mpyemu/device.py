@@ -0,0 +1,419 @@
+"""
+One emulated ESP32: its filesystem, modules, pins, peripherals and serial port.
+
+The device's files are copied to a temporary directory and run unmodified.
+Imports go through Device.import_: MicroPython's built-in modules come from
+mpyemu.port, the rest from the device filesystem, then a short list of
+host standard-library modules. Each device gets its own module table, so
+two modules' copies of utilities/now.py never share state.
+"""
+
+import os
+import sys
+import types
+import random
+import shutil
+import hashlib
+import builtins
+import tempfile
+import importlib
+import traceback
+import contextvars
+import weakref
+
+from .context import CURRENT, DeviceReset, DeviceSleep, DeviceExit
+from .serial import VirtualSerial
+from .port import machine
+
+# MicroPython name -> mpyemu.port module
+PORT_MODULES = {
+    "time": "utime", "utime": "utime",
+    "asyncio": "uasyncio", "uasyncio": "uasyncio",
+    "os": "uos", "uos": "uos",
+    "gc": "ugc",
+    "machine": "machine", "network": "network", "espnow": "espnow",
+    "neopixel": "neopixel", "framebuf": "framebuf", "micropython": "micropython",
+    "esp32": "esp32",
+}
+
+# MicroPython name -> host module that behaves the same
+HOST_MODULES = {
+    "json": "json", "ujson": "json",
+    "struct": "struct", "ustruct": "struct",
+    "binascii": "binascii", "ubinascii": "binascii",
+    "collections": "collections", "ucollections": "collections",
+    "math": "math", "cmath": "cmath",
+    "re": "re", "ure": "re",
+    "errno": "errno", "uerrno": "errno",
+    "io": "io", "uio": "io",
+    "array": "array", "heapq": "heapq", "hashlib": "hashlib",
+    "warnings": "warnings", "getopt": "getopt",
+}
+
+SKIP_FILES = shutil.ignore_patterns("__pycache__", ".*", "*.pyc")
+
+
+class PinState:
+    """Electrical state of one GPIO, shared by every Pin object for it"""
+
+    def __init__(self, device, id):
+        self.device = device
+        self.id = id
+        self.mode = None
+        self.pull = None
+        self.level = 0
+        self.driven = False     # the test holds this input at a level
+        self.handler = None
+        self.trigger = 0
+        self.owner = None
+
+    def set(self, value):
+        self.level = 1 if value else 0
+
+    def drive(self, value):
+        """The outside world pulls the pin to value - fires the IRQ on a matching edge"""
+        value = 1 if value else 0
+        old, self.level, self.driven = self.level, value, True
+        device = self.device
+        if device.state == "sleeping":
+            pins, level = device.wake_pins
+            if self.id in pins and value == (1 if level else 0):
+                device.emulator.loop.call_soon(device.boot)
+            return
+        edge = machine.Pin.IRQ_RISING if value > old else machine.Pin.IRQ_FALLING if value < old else 0
+        if edge & self.trigger and self.handler:
+            device.call_soon(self.handler, self.owner)
+
+
+class Device:
+    def __init__(self, emulator, name, path, pos=(0.0, 0.0), files=None, mac=None,
+                 drift_ppm=0.0, heap_size=180_000, echo=False):
+        self.emulator = emulator
+        self.name = name
+        self.source = path
+        self.pos = pos                  # metres, for the radio model
+        self.root = tempfile.mkdtemp(prefix=f"mpyemu-{name}-")
+        shutil.copytree(path, self.root, dirs_exist_ok=True, ignore=SKIP_FILES)
+        for rel, content in (files or {}).items():
+            self.write_file(rel, content)
+        self.mac = mac or bytes([0x30, 0xAE, 0xA4]) + hashlib.sha1(name.encode()).digest()[:3]
+        self.drift_ppm = drift_ppm      # how fast this crystal runs, parts per million
+        self.heap_size = heap_size
+        self.heap_free = heap_size * 3 // 4
+        self.random = random.Random(name)
+        self.serial = VirtualSerial(name, echo)
+        self.context = contextvars.Context()
+        self.context.run(CURRENT.set, self)
+
+        self.state = "off"              # off, running, repl, sleeping
+        self.generation = 0             # bumped at every boot and halt - stale callbacks check it
+        self.boots = 0
+        self.boot_us = 0
+        self.reset_cause = machine.PWRON_RESET
+        self.errors = []                # (virtual seconds, formatted traceback)
+        self.modules = {}
+        self.main_task = None
+        self.tasks = weakref.WeakSet()
+        self.timers = set()
+        self.nodes = set()              # active ESPNow interfaces
+        self.pins = {}
+        self.i2c = {}                   # address -> peripheral
+        self.adc = {}                   # pin id -> reading for machine.ADC
+        self.wake_pins = ([], False)
+        self.rtc_memory = b""
+        self.scheduled = 0
+        self.pixels = []                # last neopixel frame written, [(r, g, b), ...]
+        self.pixel_writes = 0
+        self.tones = []                 # PWM changes (ticks_ms, pin, freq, duty_u16)
+        self.blocked_us = 0             # virtual time spent in blocking calls
+
+    # -- files
+
+    def host_path(self, path):
+        path = os.path.normpath(os.path.join(self.root, str(path).lstrip("/")))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise OSError(2, "ENOENT")
+        return path
+
+    def write_file(self, rel, content):
+        path = self.host_path(rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+
+    def read_file(self, rel, mode="r"):
+        with open(self.host_path(rel), mode) as f:
+            return f.read()
+
+    def open(self, path, mode="r", *args, **kwargs):
+        return builtins.open(self.host_path(path), mode, *args, **kwargs)
+
+    # -- console
+
+    def print(self, *args, sep=" ", end="\n", file=None):
+        if file is not None and file not in (self.sys.stdout, self.sys.stderr):
+            builtins.print(*args, sep=sep, end=end, file=file)
+            return
+        self.serial.output(sep.join(str(a) for a in args) + end)
+
+    def print_exception(self, exc, file=None):
+        text = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+        self.serial.output(text)
+        return text
+
+    def _make_sys(self):
+        mod = types.ModuleType("sys")
+        mod.stdin = self.serial.stdin
+        mod.stdout = self.serial.stdout
+        mod.stderr = self.serial.stdout
+        mod.platform = "esp32"
+        mod.byteorder = "little"
+        mod.maxsize = 2**31 - 1
+        mod.argv = []
+        mod.path = ["", ".frozen", "/lib"]
+        mod.modules = self.modules
+        mod.implementation = types.SimpleNamespace(name="micropython", version=(1, 24, 0), _machine="mpyemu ESP32")
+        mod.version = "3.4.0; MicroPython v1.24.0 (mpyemu)"
+        mod.version_info = (3, 4, 0)
+        mod.print_exception = self.print_exception
+        mod.exc_info = sys.exc_info
+
+        def exit(code=0):
+            raise DeviceExit(code)
+        mod.exit = exit
+        return mod
+
+    def _make_random(self):
+        mod = types.ModuleType("random")
+        r = self.random
+        for name in ("getrandbits", "seed", "randrange", "randint", "choice", "random", "uniform"):
+            setattr(mod, name, getattr(r, name))
+        return mod
+
+    # -- imports
+
+    def import_(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            for i in range(level - 1):
+                package = package.rpartition(".")[0]
+            name = f"{package}.{name}" if name else package
+        module = self._load(name)
+        if not fromlist:
+            return self.modules[name.partition(".")[0]]
+        for item in fromlist:
+            if item != "*" and not hasattr(module, item) and hasattr(module, "__path__"):
+                try:
+                    self._load(f"{name}.{item}")
+                except ImportError:
+                    pass
+        return module
+
+    def _load(self, name):
+        if name in self.modules:
+            return self.modules[name]
+        parent, _, leaf = name.rpartition(".")
+        if parent:
+            parent_module = self._load(parent)
+        module = self._find(name)
+        if parent:
+            setattr(parent_module, leaf, module)
+        return module
+
+    def _find(self, name):
+        path = name.replace(".", "/")
+        if "." not in name and name in PORT_MODULES:
+            module = importlib.import_module(f"{__package__}.port.{PORT_MODULES[name]}")
+        elif os.path.isfile(self.host_path(path + ".py")):
+            return self.exec_file(path + ".py", name)
+        elif os.path.isdir(self.host_path(path)):
+            if os.path.isfile(self.host_path(path + "/__init__.py")):
+                return self.exec_file(path + "/__init__.py", name, package=True)
+            module = types.ModuleType(name)     # namespace package, as MicroPython allows
+            module.__path__ = [path]
+        elif "." not in name and name in HOST_MODULES:
+            module = importlib.import_module(HOST_MODULES[name])
+        else:
+            raise ImportError(f"no module named '{name}'")
+        self.modules[name] = module
+        return module
+
+    def exec_file(self, rel, name, package=False):
+        """Run one source file from the device filesystem as module name"""
+        source = self.read_file(rel)
+        filename = f"{os.path.basename(self.source)}/{rel}"     # hubCode/main.py, for tracebacks and tracemalloc
+        key = (filename, source)
+        code = self.emulator.code_cache.get(key)
+        if code is None:
+            code = self.emulator.code_cache[key] = compile(source, filename, "exec")
+        module = types.ModuleType(name)
+        module.__file__ = rel
+        module.__builtins__ = self.builtins
+        if package:
+            module.__path__ = [os.path.dirname(rel)]
+        module.__package__ = name if package else name.rpartition(".")[0]
+        self.modules[name] = module
+        try:
+            exec(code, module.__dict__)
+        except BaseException:
+            self.modules.pop(name, None)
+            raise
+        return module
+
+    # -- scheduling (everything runs in this device's context, and is dropped after a reboot)
+
+    def _guard(self, generation, fn, args):
+        if generation != self.generation:
+            return
+        try:
+            fn(*args)
+        except (DeviceReset, DeviceSleep, DeviceExit) as e:
+            self.fault(e)
+        except Exception as e:
+            self.fault(e, "Uncaught exception in IRQ callback handler")
+
+    def call_soon(self, fn, *args):
+        return self.emulator.loop.call_soon(self._guard, self.generation, fn, args, context=self.context.copy())
+
+    def call_later(self, delay, fn, *args):
+        return self.emulator.loop.call_later(delay, self._guard, self.generation, fn, args, context=self.context.copy())
+
+    def spawn(self, coro, main=False):
+        task = self.emulator.loop.create_task(coro, context=self.context.copy())
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+        if main:
+            self.main_task = task
+        return task
+
+    def _task_done(self, task):
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is None:
+            if task is self.main_task and self.state == "running":
+                self.state = "repl"     # the program returned
+            return
+        self.fault(exc, "Task exception wasn't retrieved")
+
+    def fault(self, exc, note=None):
+        if isinstance(exc, DeviceReset):
+            self.emulator.loop.call_soon(self.boot, self.reset_cause)
+        elif isinstance(exc, DeviceSleep):
+            self.deepsleep(exc.ms)
+        elif isinstance(exc, DeviceExit):
+            self.halt("repl")
+        else:
+            if note:
+                self.serial.output(note + "\n")
+            self.errors.append((self.emulator.clock.seconds, self.print_exception(exc)))
+
+    # -- time
+
+    def ticks_us(self):
+        elapsed = self.emulator.clock.us - self.boot_us
+        return int(elapsed * (1 + self.drift_ppm / 1_000_000))
+
+    def block(self, seconds):
+        """The CPU is busy (time.sleep, a bus transfer).
+
+        There is one clock, so the whole world waits - a long block shows up as
+        loop lag on every device. blocked_us says which device caused it.
+        """
+        before = self.emulator.clock.us
+        self.emulator.clock.advance(seconds)
+        self.blocked_us += self.emulator.clock.us - before
+
+    # -- power
+
+    def power_on(self, delay=0.0):
+        gen = self.generation
+        self.emulator.loop.call_later(delay, lambda: gen == self.generation and self.boot())
+
+    def boot(self, cause=None):
+        """(Re)start from main.py with a fresh heap, keeping the filesystem"""
+        self.halt("off")
+        self.reset_cause = cause or (machine.PWRON_RESET if not self.boots else self.reset_cause)
+        self.state = "running"
+        self.boots += 1
+        self.boot_us = self.emulator.clock.us
+        self.builtins = dict(builtins.__dict__, __import__=self.import_, open=self.open, print=self.print)
+        self.sys = self._make_sys()
+        self.modules.clear()
+        self.modules.update({"sys": self.sys, "usys": self.sys, "random": self._make_random()})
+        self.modules["urandom"] = self.modules["random"]
+        self.call_soon(self._run_main)
+
+    def _run_main(self):
+        try:
+            if os.path.isfile(self.host_path("boot.py")):
+                self.exec_file("boot.py", "boot")
+            self.exec_file("main.py", "__main__")
+        except (DeviceReset, DeviceSleep, DeviceExit) as e:
+            self.fault(e)
+        except Exception as e:
+            self.fault(e)
+            self.state = "repl"
+
+    def halt(self, state="off"):
+        """Stop everything the program started - tasks, timers, radio, IRQs"""
+        self.generation += 1
+        self.state = state
+        for task in list(self.tasks):
+            task.cancel()
+        self.tasks = weakref.WeakSet()
+        self.main_task = None
+        for timer in list(self.timers):
+            timer.deinit()
+        for node in list(self.nodes):
+            node.active(False)
+        for pin in self.pins.values():
+            pin.handler = None
+        self.scheduled = 0
+
+    def deepsleep(self, ms=0):
+        self.halt("sleeping")
+        self.reset_cause = machine.DEEPSLEEP_RESET
+        if ms:
+            gen = self.generation
+            self.emulator.loop.call_later(ms / 1000, lambda: gen == self.generation and self.boot())
+
+    def reset(self, cause=machine.HARD_RESET):
+        """Reset from outside (the WDT, or a test)"""
+        self.emulator.loop.call_soon(self.boot, cause)
+
+    # -- hardware
+
+    def pin(self, id):
+        if id not in self.pins:
+            self.pins[id] = PinState(self, id)
+        return self.pins[id]
+
+    def add_i2c(self, peripheral):
+        self.i2c[peripheral.address] = peripheral
+        peripheral.attach(self)
+        return peripheral
+
+    def show_pixels(self, np):
+        self.pixels = [np[i] for i in range(np.n)]
+        self.pixel_writes += 1
+
+    # -- test inputs
+
+    def press(self, pin=0):
+        """Button to ground (the modules' buttons are active low)"""
+        self.pin(pin).drive(0)
+
+    def release(self, pin=0):
+        self.pin(pin).drive(1)
+
+    def tap(self, ms=120, pin=0):
+        self.press(pin)
+        self.emulator.loop.call_later(ms / 1000, self.release, pin)
+
+    def close(self):
+        self.halt("off")
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __repr__(self):
+        return f"<Device {self.name} {self.state}>"
@@ -0,0 +1,106 @@
+"""
+The emulated playground: a virtual clock, a radio and the devices on it.
+
+    emu = Emulator()
+    hub = emu.add_hub()
+    plush = emu.add_module("plush1", pos=(3, 0))
+    emu.run(2)                          # two virtual seconds
+    hub.serial.send_json({"cmd": "Shake"})
+    emu.run(1)
+    print(hub.serial.messages())        # the hub's data channel
+"""
+
+import os
+import asyncio
+
+from .clock import VirtualClock, VirtualLoop
+from .device import Device
+from .radio import Radio
+from .sensors import LIS2DW12, MAX17048, SSD1306
+
+REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HUB_CODE = os.path.join(REPO, "App_Web", "webapp", "hubCode")
+MODULE_CODE = os.path.join(REPO, "Plushie_Module")
+
+
+class Emulator:
+    def __init__(self, radio=None, cpu_scale=0, echo=False):
+        self.clock = VirtualClock()
+        self.loop = VirtualLoop(self.clock, cpu_scale)
+        self.loop.set_exception_handler(self._loop_error)
+        self.radio = radio or Radio()
+        self.radio.bind(self)
+        self.echo = echo            # print every device's output on the host as it happens
+        self.devices = {}
+        self.code_cache = {}        # (filename, source) -> code, shared by devices running the same tree
+        self.errors = []
+
+    def _loop_error(self, loop, context):
+        self.errors.append(context)
+
+    def add_device(self, name, path, boot_ms=0, **kwargs):
+        """Copy the tree at path onto a new device and power it on after boot_ms"""
+        kwargs.setdefault("echo", self.echo)
+        device = Device(self, name, path, **kwargs)
+        self.devices[name] = device
+        device.power_on(boot_ms / 1000)
+        return device
+
+    def add_hub(self, name="hub", path=HUB_CODE, **kwargs):
+        """The serial-to-ESP-NOW hub (hubCode/main.py) with its OLED"""
+        device = self.add_device(name, path, **kwargs)
+        device.display = device.add_i2c(SSD1306())
+        return device
+
+    def add_module(self, name, path=MODULE_CODE, battery=87.0, **kwargs):
+        """A playground module (Plushie_Module/main.py) named name, with accelerometer and fuel gauge"""
+        files = dict(kwargs.pop("files", {}))
+        files.setdefault("hubname", name)
+        device = self.add_device(name, path, files=files, **kwargs)
+        device.accel = device.add_i2c(LIS2DW12())
+        device.battery = device.add_i2c(MAX17048(percent=battery))
+        return device
+
+    # -- running
+
+    @property
+    def seconds(self):
+        return self.clock.seconds
+
+    def run(self, seconds):
+        """Advance the world by seconds of virtual time"""
+        self.loop.run_until_complete(asyncio.sleep(seconds))
+
+    def run_until(self, predicate, timeout=10.0, step_ms=5):
+        """Run until predicate() is true; returns False if timeout virtual seconds pass first"""
+        async def wait():
+            end = self.clock.seconds + timeout
+            while not predicate():
+                if self.clock.seconds >= end:
+                    return False
+                await asyncio.sleep(step_ms / 1000)
+            return True
+        return self.loop.run_until_complete(wait())
+
+    def after(self, seconds, fn, *args):
+        """Call fn (in the host context) seconds of virtual time from now"""
+        return self.loop.call_later(seconds, fn, *args)
+
+    def close(self):
+        """Stop every device, let their tasks unwind, then delete their filesystems"""
+        for device in self.devices.values():
+            device.halt("off")
+        pending = [t for t in asyncio.all_tasks(self.loop) if not t.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        for device in self.devices.values():
+            device.close()
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
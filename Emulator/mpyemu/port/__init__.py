@@ -0,0 +1,7 @@
+"""
+The MicroPython modules the device code imports, emulated.
+
+Device.import_ maps the MicroPython names onto these (time -> utime,
+asyncio -> uasyncio, os -> uos, gc -> ugc). One copy serves every device;
+anything per-device is looked up through context.current().
+"""
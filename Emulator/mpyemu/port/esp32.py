@@ -0,0 +1,38 @@
+"""esp32 - deep sleep wake sources"""
+
+from ..context import current
+
+WAKEUP_ALL_LOW = False
+WAKEUP_ANY_HIGH = True
+
+
+def wake_on_ext0(pin, level):
+    current().wake_pins = ([pin.id] if pin is not None else [], level)
+
+
+def wake_on_ext1(pins=None, level=WAKEUP_ALL_LOW):
+    current().wake_pins = ([p.id for p in pins or ()], level)
+
+
+def wake_on_touch(wake):
+    pass
+
+
+def wake_on_ulp(wake):
+    pass
+
+
+def gpio_deep_sleep_hold(enable):
+    pass
+
+
+def raw_temperature():
+    return 120
+
+
+def mcu_temperature():
+    return 40
+
+
+def idf_heap_info(capabilities):
+    return []
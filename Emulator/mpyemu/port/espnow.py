@@ -0,0 +1,183 @@
+"""espnow - ESPNow interfaces on the emulator's Radio"""
+
+from collections import deque
+
+from ..context import current
+
+MAX_DATA_LEN = 250
+ADDR_LEN = 6
+KEY_LEN = 16
+MAX_TOTAL_PEER_NUM = 20
+MAX_ENCRYPT_PEER_NUM = 6
+
+ERR_NOT_INIT = (-12389, "ESP_ERR_ESPNOW_NOT_INIT")
+ERR_FULL = (-12391, "ESP_ERR_ESPNOW_FULL")
+ERR_NOT_FOUND = (-12393, "ESP_ERR_ESPNOW_NOT_FOUND")
+ERR_EXIST = (-12395, "ESP_ERR_ESPNOW_EXIST")
+
+BUFFER_OVERHEAD = 8     # per-packet header in the receive ring buffer
+
+
+class ESPNow:
+    def __init__(self):
+        self.device = current()
+        self.mac = self.device.mac
+        self._active = False
+        self.rxbuf = 526            # bytes, as on the real port
+        self.timeout_ms = 300000
+        self.buffer = deque()
+        self._pair = [None, bytearray()]     # what irecv hands out, refilled every call
+        self.used = 0
+        self.peers = {}
+        self.peers_table = {}       # mac -> [rssi, time_ms] of the last packet from it
+        self.callback = None
+        self.counters = [0, 0, 0, 0, 0]  # tx_pkts, tx_responses, tx_failures, rx_packets, rx_dropped
+
+    # -- setup
+
+    def active(self, flag=None):
+        if flag is None:
+            return self._active
+        radio = self.device.emulator.radio
+        if flag and not self._active:
+            radio.attach(self)
+            self.device.nodes.add(self)
+        elif not flag and self._active:
+            radio.detach(self)
+            self.device.nodes.discard(self)
+            self.buffer.clear()
+            self.used = 0
+            self.peers = {}
+        self._active = bool(flag)
+        return self._active
+
+    def config(self, *args, rxbuf=None, timeout_ms=None, rate=None):
+        if args:
+            return {"rxbuf": self.rxbuf, "timeout_ms": self.timeout_ms}[args[0]]
+        if rxbuf is not None:
+            self.rxbuf = rxbuf
+        if timeout_ms is not None:
+            self.timeout_ms = timeout_ms
+
+    def irq(self, callback):
+        self.callback = callback
+
+    def add_peer(self, mac, lmk=None, channel=0, ifidx=0, encrypt=False):
+        mac = bytes(mac)
+        if mac in self.peers:
+            raise OSError(*ERR_EXIST)
+        if len(self.peers) >= MAX_TOTAL_PEER_NUM:
+            raise OSError(*ERR_FULL)
+        self.peers[mac] = (mac, lmk, channel, ifidx, encrypt)
+
+    def del_peer(self, mac):
+        if self.peers.pop(bytes(mac), None) is None:
+            raise OSError(*ERR_NOT_FOUND)
+
+    def mod_peer(self, mac, *args, **kwargs):
+        if bytes(mac) not in self.peers:
+            raise OSError(*ERR_NOT_FOUND)
+
+    def get_peer(self, mac):
+        try:
+            return self.peers[bytes(mac)]
+        except KeyError:
+            raise OSError(*ERR_NOT_FOUND)
+
+    def get_peers(self):
+        return tuple(self.peers.values())
+
+    def peer_count(self):
+        return (len(self.peers), 0)
+
+    def stats(self):
+        return tuple(self.counters)
+
+    # -- sending
+
+    def send(self, mac, msg=None, sync=True):
+        if msg is None:
+            mac, msg = None, mac
+        if not self._active:
+            raise OSError(*ERR_NOT_INIT)
+        if isinstance(msg, str):
+            msg = msg.encode()
+        if len(msg) > MAX_DATA_LEN:
+            raise ValueError("msg too long")
+        radio = self.device.emulator.radio
+        targets = list(self.peers) if mac is None else [bytes(mac)]
+        ok = True
+        for dst in targets:
+            if dst not in self.peers:
+                raise OSError(*ERR_NOT_FOUND)
+            self.counters[0] += 1
+            delivered = radio.transmit(self, dst, msg, sync)
+            if sync:
+                if delivered:
+                    self.counters[1] += 1
+                else:
+                    self.counters[2] += 1
+                    ok = False
+        return ok
+
+    # -- receiving
+
+    def deliver(self, mac, msg, rssi):
+        # called by the Radio in this device's context
+        if not self._active:
+            return
+        size = len(msg) + BUFFER_OVERHEAD
+        if self.used + size > self.rxbuf:
+            self.counters[4] += 1
+            return
+        self.buffer.append((mac, msg))
+        self.used += size
+        self.counters[3] += 1
+        self.peers_table[mac] = [rssi, self.device.ticks_us() // 1000]
+        if self.callback:
+            self.callback(self)
+
+    def any(self):
+        return bool(self.buffer)
+
+    def _next(self, timeout_ms):
+        if not self.buffer:
+            # a blocking wait would stop the whole emulation - move the clock instead
+            timeout = self.timeout_ms if timeout_ms is None else timeout_ms
+            if timeout > 0:
+                self.device.block(timeout / 1000)
+            return None, None
+        mac, msg = self.buffer.popleft()
+        self.used -= len(msg) + BUFFER_OVERHEAD
+        return mac, msg
+
+    def irecv(self, timeout_ms=None):
+        # like the firmware, every call returns the same list and msg bytearray
+        # (mac is the peer's bytes from peers_table) - copy msg to keep it
+        mac, msg = self._next(timeout_ms)
+        if mac is None:
+            return [None, None]
+        self._pair[0] = mac
+        self._pair[1][:] = msg
+        return self._pair
+
+    def recv(self, timeout_ms=None):
+        # new objects each call
+        mac, msg = self._next(timeout_ms)
+        if mac is None:
+            return [None, None]
+        return [bytes(mac), bytes(msg)]
+
+    def recvinto(self, data, timeout_ms=None):
+        mac, msg = self.irecv(timeout_ms)
+        if mac is None:
+            return 0
+        data[0] = mac
+        data[1] = msg
+        return len(msg)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.irecv()
@@ -0,0 +1,146 @@
+"""framebuf - the monochrome formats, drawn into the caller's buffer.
+
+text() draws a stand-in glyph per character (not the ROM font) and records
+the strings in .texts, so tests can check what was written.
+"""
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+MVLSB = MONO_VLSB
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        if format not in (MONO_VLSB, MONO_HLSB, MONO_HMSB):
+            raise ValueError("invalid format")
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+        self.format = format
+        self.stride = stride or width
+        self.texts = []
+
+    def _index(self, x, y):
+        if self.format == MONO_VLSB:
+            return (y >> 3) * self.stride + x, y & 7
+        index = (y * self.stride + x) >> 3
+        return index, (7 - (x & 7)) if self.format == MONO_HLSB else x & 7
+
+    # the drawing methods use _get/_set, not pixel(), like the C version -
+    # a subclass overriding pixel() does not see them
+
+    def _get(self, x, y):
+        index, bit = self._index(x, y)
+        return self.buffer[index] >> bit & 1
+
+    def _set(self, x, y, c):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            index, bit = self._index(x, y)
+            if c:
+                self.buffer[index] |= 1 << bit
+            else:
+                self.buffer[index] &= ~(1 << bit) & 0xff
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        if c is None:
+            return self._get(x, y)
+        self._set(x, y, c)
+
+    def fill(self, c):
+        value = 0xff if c else 0
+        for i in range(len(self.buffer)):
+            self.buffer[i] = value
+
+    def fill_rect(self, x, y, w, h, c):
+        for yy in range(max(0, y), min(self.height, y + h)):
+            for xx in range(max(0, x), min(self.width, x + w)):
+                self._set(xx, yy, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        dx, dy = abs(x2 - x1), -abs(y2 - y1)
+        sx, sy = (1 if x1 < x2 else -1), (1 if y1 < y2 else -1)
+        err = dx + dy
+        while True:
+            self._set(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def text(self, s, x, y, c=1):
+        self.texts.append((str(s), x, y))
+        del self.texts[:-64]
+        for i, ch in enumerate(str(s)):
+            if ch == " ":
+                continue
+            for col in range(7):
+                bits = (ord(ch) * (col + 3) * 37) >> 2 & 0x7e
+                for row in range(8):
+                    if bits >> row & 1:
+                        self._set(x + i * 8 + col, y + row, c)
+
+    def scroll(self, xstep, ystep):
+        # uncovered pixels keep their old value, as on the device
+        if self.format == MONO_VLSB:
+            pages = (self.height + 7) // 8
+            mask = (1 << self.height) - 1
+            cols = [sum(self.buffer[p * self.stride + x] << 8 * p for p in range(pages)) for x in range(self.width)]
+            new = []
+            for x in range(self.width):
+                if not 0 <= x - xstep < self.width:
+                    new.append(cols[x])
+                    continue
+                src = cols[x - xstep]
+                if ystep > 0:
+                    col = (src << ystep | cols[x] & ((1 << ystep) - 1)) & mask
+                elif ystep < 0:
+                    col = src >> -ystep | cols[x] & ~(mask >> -ystep) & mask
+                else:
+                    col = src
+                new.append(col)
+            for x, col in enumerate(new):
+                for p in range(pages):
+                    self.buffer[p * self.stride + x] = col >> 8 * p & 0xff
+            return
+        pixels = [[self._get(x, y) for x in range(self.width)] for y in range(self.height)]
+        for y in range(self.height):
+            for x in range(self.width):
+                sx, sy = x - xstep, y - ystep
+                if 0 <= sx < self.width and 0 <= sy < self.height:
+                    self._set(x, y, pixels[sy][sx])
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        for yy in range(fbuf.height):
+            for xx in range(fbuf.width):
+                c = fbuf._get(xx, yy)
+                if palette is not None:
+                    c = palette._get(c, 0)
+                if c != key:
+                    self._set(x + xx, y + yy, c)
+
+
+class FrameBuffer1(FrameBuffer):
+    pass
@@ -0,0 +1,309 @@
+"""machine - pins, buses, PWM, ADC and timers of the current device"""
+
+from ..context import current, DeviceReset, DeviceSleep
+
+PWRON_RESET, HARD_RESET, WDT_RESET, DEEPSLEEP_RESET, SOFT_RESET = 1, 2, 3, 4, 5
+
+
+class Pin:
+    IN, OUT, OPEN_DRAIN = 1, 3, 7
+    PULL_UP, PULL_DOWN = 1, 2
+    IRQ_RISING, IRQ_FALLING = 1, 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None, **kwargs):
+        self.id = id
+        self.device = current()
+        self.state = self.device.pin(id)
+        self.init(mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None, **kwargs):
+        if mode != -1:
+            self.state.mode = mode
+        if pull != -1 and pull is not None:
+            self.state.pull = pull
+            if not self.state.driven:
+                self.state.level = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self.state.set(value)
+
+    def value(self, v=None):
+        if v is None:
+            return self.state.level
+        self.state.set(v)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.state.set(1)
+
+    def off(self):
+        self.state.set(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, **kwargs):
+        self.state.handler = handler
+        self.state.trigger = trigger
+        self.state.owner = self
+        return self
+
+    def __repr__(self):
+        return f"Pin({self.id})"
+
+
+class Signal:
+    def __init__(self, pin, *args, invert=False, **kwargs):
+        self.pin = pin if isinstance(pin, Pin) else Pin(pin, *args, **kwargs)
+        self.invert = invert
+
+    def value(self, v=None):
+        if v is None:
+            return self.pin.value() ^ self.invert
+        self.pin.value(bool(v) ^ self.invert)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+
+class I2C:
+    """Every bus of a device reaches all of its peripherals. Transfers take
+    bus time: 9 clocks per byte at freq."""
+
+    def __init__(self, id=-1, *, scl=None, sda=None, freq=400000, timeout=50000):
+        self.device = current()
+        self.freq = freq
+
+    def _peripheral(self, addr):
+        peripheral = self.device.i2c.get(addr)
+        if peripheral is None:
+            raise OSError(19, "ENODEV")
+        return peripheral
+
+    def _bus(self, nbytes):
+        self.device.block((nbytes + 1) * 9 / self.freq)
+
+    def scan(self):
+        return sorted(self.device.i2c)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        data = self._peripheral(addr).read(memaddr, nbytes)
+        self._bus(nbytes + 2)
+        return data
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        buf = memoryview(buf).cast("B")     # fills bytes, whatever the buffer's item size
+        buf[:] = self.readfrom_mem(addr, memaddr, len(buf))
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        self._peripheral(addr).write(memaddr, bytes(buf))
+        self._bus(len(buf) + 1)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        data = self._peripheral(addr).read_raw(nbytes)
+        self._bus(nbytes)
+        return data
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self.readfrom(addr, len(buf))
+
+    def writeto(self, addr, buf, stop=True):
+        self._peripheral(addr).write_raw(bytes(buf))
+        self._bus(len(buf))
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        return self.writeto(addr, b"".join(bytes(b) for b in vector), stop)
+
+
+SoftI2C = I2C
+
+
+class PWM:
+    """Duty and frequency changes go to Device.tones as (ticks_ms, pin, freq, duty)"""
+
+    def __init__(self, dest, *, freq=None, duty=None, duty_u16=None, **kwargs):
+        self.device = current()
+        self.pin = dest if isinstance(dest, Pin) else Pin(dest)
+        self._freq = freq or 5000
+        self._duty = 0
+        if duty is not None:
+            self.duty(duty)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def _record(self):
+        self.device.tones.append((self.device.ticks_us() // 1000, self.pin.id, self._freq, self._duty))
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        if not 1 <= f <= 40_000_000:
+            raise ValueError("frequency must be from 1Hz to 40MHz")
+        self._freq = int(f)
+        self._record()
+
+    def duty(self, d=None):
+        if d is None:
+            return self._duty >> 6
+        self._duty = max(0, min(1023, int(d))) << 6
+        self._record()
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = max(0, min(65535, int(d)))
+        self._record()
+
+    def init(self, *, freq=None, duty=None, duty_u16=None, **kwargs):
+        if freq is not None:
+            self.freq(freq)
+        if duty is not None:
+            self.duty(duty)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def deinit(self):
+        self._duty = 0
+        self._record()
+
+
+class ADC:
+    """Reads Device.adc[pin id] (0-65535), mid-scale if the test never set it"""
+
+    ATTN_0DB, ATTN_2_5DB, ATTN_6DB, ATTN_11DB = 0, 1, 2, 3
+    WIDTH_9BIT, WIDTH_10BIT, WIDTH_11BIT, WIDTH_12BIT = 0, 1, 2, 3
+
+    def __init__(self, pin, *, atten=None):
+        self.device = current()
+        self.id = pin.id if isinstance(pin, Pin) else pin
+
+    def read_u16(self):
+        return self.device.adc.get(self.id, 32768)
+
+    def read(self):
+        return self.read_u16() >> 4
+
+    def read_uv(self):
+        return self.read_u16() * 3_300_000 // 65535
+
+    def atten(self, atten):
+        pass
+
+    def width(self, width):
+        pass
+
+
+class Timer:
+    """Callbacks run in the event loop like the ESP32's soft timers, at a fixed rate"""
+
+    ONE_SHOT, PERIODIC = 0, 1
+
+    def __init__(self, id=0, **kwargs):
+        self.device = current()
+        self.handle = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, *, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+        self.mode = mode
+        self.period = 1 / freq if freq > 0 else max(period, 1) / 1000
+        self.callback = callback
+        self.due = self.device.emulator.clock.seconds + self.period
+        self.device.timers.add(self)
+        self._schedule()
+
+    def _schedule(self):
+        delay = max(0, self.due - self.device.emulator.clock.seconds)
+        self.handle = self.device.call_later(delay, self._fire)
+
+    def _fire(self):
+        if self.mode == Timer.PERIODIC:
+            self.due += self.period
+            self._schedule()
+        else:
+            self.handle = None
+        if self.callback:
+            self.callback(self)
+
+    def deinit(self):
+        if self.handle:
+            self.handle.cancel()
+            self.handle = None
+        self.device.timers.discard(self)
+
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        self.device = current()
+        self.timeout = timeout / 1000
+        self.handle = None
+        self.feed()
+
+    def feed(self):
+        if self.handle:
+            self.handle.cancel()
+        self.handle = self.device.call_later(self.timeout, self.device.reset, WDT_RESET)
+
+
+class RTC:
+    def __init__(self, id=0):
+        self.device = current()
+
+    def datetime(self, dt=None):
+        from . import utime
+        y, mo, d, h, mi, s, wd, yd = utime.localtime()
+        return (y, mo, d, wd, h, mi, s, 0)
+
+    def memory(self, data=None):
+        if data is None:
+            return self.device.rtc_memory
+        self.device.rtc_memory = bytes(data)
+
+
+def reset():
+    current().reset_cause = HARD_RESET
+    raise DeviceReset()
+
+
+def soft_reset():
+    current().reset_cause = SOFT_RESET
+    raise DeviceReset()
+
+
+def deepsleep(ms=0):
+    raise DeviceSleep(ms)
+
+
+def lightsleep(ms=0):
+    current().block(ms / 1000)
+
+
+def idle():
+    pass
+
+
+def reset_cause():
+    return current().reset_cause
+
+
+def freq(hz=None):
+    return 160_000_000
+
+
+def unique_id():
+    return bytes(current().mac)
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+def wake_reason():
+    return 0
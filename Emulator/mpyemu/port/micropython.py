@@ -0,0 +1,63 @@
+"""micropython - const() and the code emitters.
+
+native is accepted and does nothing. viper and asm_thumb are missing on
+purpose: their bodies are not Python, so code using them has to keep an
+import-time fallback, and the emulator runs the fallback.
+"""
+
+from ..context import current
+
+SCHEDULE_DEPTH = 8      # MICROPY_SCHEDULER_DEPTH on the ESP32 port
+
+
+def const(value):
+    return value
+
+
+def native(f):
+    return f
+
+
+def schedule(func, arg):
+    device = current()
+    if device.scheduled >= SCHEDULE_DEPTH:
+        raise RuntimeError("schedule queue full")
+    device.scheduled += 1
+
+    def run():
+        device.scheduled -= 1
+        func(arg)
+    device.call_soon(run)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def opt_level(level=None):
+    return 0 if level is None else None
+
+
+def mem_info(verbose=False):
+    device = current()
+    device.print(f"stack: 0\nGC: total: {device.heap_size}, used: {device.heap_size - device.heap_free}, free: {device.heap_free}")
+
+
+def qstr_info(verbose=False):
+    pass
+
+
+def stack_use():
+    return 0
+
+
+def heap_lock():
+    return 0
+
+
+def heap_unlock():
+    return 0
+
+
+def kbd_intr(chr):
+    pass
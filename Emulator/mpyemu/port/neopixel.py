@@ -0,0 +1,40 @@
+"""neopixel - pixels live in a bytearray like the real driver; write() shows them"""
+
+from ..context import current
+
+NS_PER_BIT = 1250       # WS2812 at 800 kHz - write() keeps the CPU busy this long per bit
+
+
+class NeoPixel:
+    ORDER = (1, 0, 2, 3)
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.device = current()
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        if i < 0:
+            i += self.n
+        offset = i * self.bpp
+        for j in range(self.bpp):
+            self.buf[offset + self.ORDER[j]] = v[j]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.n
+        offset = i * self.bpp
+        return tuple(self.buf[offset + self.ORDER[j]] for j in range(self.bpp))
+
+    def fill(self, v):
+        for i in range(self.n):
+            self[i] = v
+
+    def write(self):
+        self.device.show_pixels(self)
+        self.device.block(len(self.buf) * 8 * NS_PER_BIT / 1e9)
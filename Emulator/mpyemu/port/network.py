@@ -0,0 +1,45 @@
+"""network - only what ESP-NOW needs: an active station with a mac address"""
+
+from ..context import current
+
+STA_IF, AP_IF = 0, 1
+STAT_IDLE, STAT_CONNECTING, STAT_GOT_IP = 1000, 1001, 1010
+
+
+class WLAN:
+    def __init__(self, interface_id=STA_IF):
+        self.device = current()
+        self.interface_id = interface_id
+        self._active = False
+
+    def active(self, flag=None):
+        if flag is None:
+            return self._active
+        self._active = bool(flag)
+        return self._active
+
+    def config(self, *args, **kwargs):
+        if args:
+            if args[0] == "mac":
+                return bytes(self.device.mac)
+            if args[0] in ("channel", "txpower"):
+                return 1 if args[0] == "channel" else 20
+            raise ValueError("unknown config param")
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        pass    # no access points in the emulator
+
+    def disconnect(self):
+        pass
+
+    def isconnected(self):
+        return False
+
+    def status(self, *args):
+        return STAT_IDLE
+
+    def scan(self):
+        return []
+
+    def ifconfig(self, *args):
+        return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
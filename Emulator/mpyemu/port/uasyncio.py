@@ -0,0 +1,110 @@
+"""asyncio / uasyncio - CPython asyncio on the virtual loop, with the MicroPython extras"""
+
+import asyncio as _asyncio
+from asyncio import CancelledError, Event, Lock, Task, TimeoutError, gather, sleep, current_task
+
+from ..context import CURRENT
+
+
+def create_task(coro):
+    device = CURRENT.get()
+    if device is None:
+        return _asyncio.ensure_future(coro)
+    return device.spawn(coro)
+
+
+def run(coro):
+    """main.py calls this at boot - the program becomes the device's main task"""
+    device = CURRENT.get()
+    if device is None:
+        raise RuntimeError("asyncio.run outside an emulated device")
+    return device.spawn(coro, main=True)
+
+
+async def sleep_ms(ms):
+    await sleep(ms / 1000)
+
+
+async def wait_for(aw, timeout):
+    # CPython 3.11's wait_for swallows a cancel that arrives just as aw
+    # finishes, which leaves halted devices' tasks running; this doesn't
+    async with _asyncio.timeout(timeout):
+        return await aw
+
+
+async def wait_for_ms(aw, ms):
+    return await wait_for(aw, ms / 1000)
+
+
+class ThreadSafeFlag:
+    """Set from an IRQ, awaited by one task; wait() clears it"""
+
+    def __init__(self):
+        self.event = Event()
+
+    def set(self):
+        self.event.set()
+
+    def clear(self):
+        self.event.clear()
+
+    async def wait(self):
+        await self.event.wait()
+        self.event.clear()
+
+
+class StreamReader:
+    """Stream over the device's virtual serial (sys.stdin)"""
+
+    def __init__(self, stream, *args):
+        self.stream = stream
+
+    async def readline(self):
+        return await self.stream.areadline()
+
+    async def read(self, n=-1):
+        return await self.stream.aread(n)
+
+    async def readexactly(self, n):
+        data = b""
+        while len(data) < n:
+            data += await self.stream.aread(n - len(data))
+        return data
+
+    def write(self, data):
+        self.stream.write(data)
+
+    async def drain(self):
+        pass
+
+
+Stream = StreamReader
+StreamWriter = StreamReader
+
+
+class _Loop:
+    # asyncio.get_event_loop() - the virtual loop already runs, so only scheduling works
+    def create_task(self, coro):
+        return create_task(coro)
+
+    def run_until_complete(self, coro):
+        return run(coro)
+
+    def run_forever(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def call_exception_handler(self, context):
+        pass
+
+
+def get_event_loop(*args):
+    return _Loop()
+
+
+new_event_loop = get_event_loop
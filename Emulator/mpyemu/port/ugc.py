@@ -0,0 +1,36 @@
+"""gc - the heap is a number on the device (Device.heap_free), not a measurement"""
+
+from ..context import current
+
+_enabled = True
+
+
+def collect():
+    pass
+
+
+def mem_free():
+    return current().heap_free
+
+
+def mem_alloc():
+    device = current()
+    return device.heap_size - device.heap_free
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def isenabled():
+    return _enabled
+
+
+def threshold(amount=None):
+    return -1
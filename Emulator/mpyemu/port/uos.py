@@ -0,0 +1,73 @@
+"""os / uos - the device filesystem is a temporary directory on the host"""
+
+import os as _os
+
+from ..context import current
+
+sep = "/"
+
+
+def _path(path):
+    return current().host_path(path)
+
+
+def listdir(path=""):
+    return sorted(_os.listdir(_path(path)))
+
+
+def ilistdir(path=""):
+    for name in listdir(path):
+        full = _os.path.join(_path(path), name)
+        yield (name, 0x4000 if _os.path.isdir(full) else 0x8000, 0, _os.path.getsize(full))
+
+
+def mkdir(path):
+    _os.mkdir(_path(path))
+
+
+def rmdir(path):
+    _os.rmdir(_path(path))
+
+
+def remove(path):
+    _os.remove(_path(path))
+
+
+def rename(old, new):
+    _os.replace(_path(old), _path(new))
+
+
+def stat(path):
+    s = _os.stat(_path(path))
+    return (0x4000 if _os.path.isdir(_path(path)) else 0x8000, 0, 0, 0, 0, 0,
+            s.st_size, int(s.st_mtime), int(s.st_mtime), int(s.st_mtime))
+
+
+def statvfs(path=""):
+    # 4 KB blocks, 1 MB of flash for files
+    return (4096, 4096, 256, 200, 200, 0, 0, 0, 0, 255)
+
+
+def getcwd():
+    return ""
+
+
+def chdir(path):
+    if path not in ("", "/"):
+        raise OSError(95, "the emulator only has the root directory")
+
+
+def sync():
+    pass
+
+
+def urandom(n):
+    return bytes(current().random.getrandbits(8) for i in range(n))
+
+
+def uname():
+    return ("esp32", "mpyemu", "1.24.0", "emulated", "ESP32C6 (mpyemu)")
+
+
+def dupterm(*args):
+    return None
@@ -0,0 +1,63 @@
+"""time / utime - ticks count from the device's boot on the virtual clock"""
+
+import time as _time
+
+from ..context import current
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALF = TICKS_PERIOD // 2
+EPOCH = 946684800       # MicroPython counts seconds from 2000-01-01
+
+
+def ticks_us():
+    return current().ticks_us() & TICKS_MAX
+
+
+def ticks_ms():
+    return current().ticks_us() // 1000 & TICKS_MAX
+
+
+def ticks_cpu():
+    return ticks_us()
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + TICKS_HALF) & TICKS_MAX) - TICKS_HALF
+
+
+def sleep(seconds):
+    current().block(seconds)
+
+
+def sleep_ms(ms):
+    current().block(ms / 1000)
+
+
+def sleep_us(us):
+    current().block(us / 1_000_000)
+
+
+def time():
+    return int(current().emulator.clock.seconds)
+
+
+def time_ns():
+    return current().emulator.clock.us * 1000
+
+
+def gmtime(secs=None):
+    t = _time.gmtime(EPOCH + (time() if secs is None else int(secs)))
+    return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec, t.tm_wday, t.tm_yday)
+
+
+localtime = gmtime
+
+
+def mktime(t):
+    import calendar
+    return calendar.timegm(tuple(t[:6]) + (0, 0, 0)) - EPOCH
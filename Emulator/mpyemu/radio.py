@@ -0,0 +1,100 @@
+"""
+Virtual 2.4 GHz medium for the emulated ESP-NOW interfaces.
+
+Packets share one channel: each takes airtime at the PHY rate, so bursts
+queue up behind each other, then arrive after latency + jitter. Every
+receiver rolls its own loss and gets an RSSI from a log-distance path-loss
+model of the device positions (metres), plus noise. Per-link overrides
+replace the model for one direction of one pair.
+"""
+
+import math
+import random
+
+BROADCAST = b"\xff\xff\xff\xff\xff\xff"
+OVERHEAD_BYTES = 60     # 802.11 action frame + vendor element around the payload
+
+
+class Link:
+    def __init__(self, loss=None, rssi=None, latency_ms=None):
+        self.loss = loss
+        self.rssi = rssi
+        self.latency_ms = latency_ms
+
+
+class Radio:
+    def __init__(self, latency_ms=1.0, jitter_ms=0.5, loss=0.0, rate_bps=1_000_000,
+                 rssi_1m=-40.0, path_loss=2.5, noise_db=2.0, sensitivity=-95.0, seed=0):
+        self.latency_ms = latency_ms    # fixed delay after the airtime
+        self.jitter_ms = jitter_ms      # uniform random extra delay
+        self.loss = loss                # chance each receiver misses a packet
+        self.rate_bps = rate_bps        # ESP-NOW default PHY rate
+        self.rssi_1m = rssi_1m          # dBm heard at one metre
+        self.path_loss = path_loss      # path-loss exponent (2 = free space)
+        self.noise_db = noise_db        # standard deviation of the RSSI noise
+        self.sensitivity = sensitivity  # packets weaker than this are lost
+        self.random = random.Random(seed)
+        self.nodes = {}                 # mac -> attached ESPNow
+        self.links = {}                 # (src mac, dst mac) -> Link
+        self.busy_until = 0             # clock us when the channel is free
+        self.emulator = None
+        self.sent = 0
+        self.delivered = 0
+        self.lost = 0
+
+    def bind(self, emulator):
+        self.emulator = emulator
+
+    def attach(self, node):
+        self.nodes[bytes(node.mac)] = node
+
+    def detach(self, node):
+        if self.nodes.get(bytes(node.mac)) is node:
+            del self.nodes[bytes(node.mac)]
+
+    def link(self, a, b, loss=None, rssi=None, latency_ms=None, both=True):
+        """Override the model from device a to device b (and back unless both=False)"""
+        self.links[(bytes(a.mac), bytes(b.mac))] = Link(loss, rssi, latency_ms)
+        if both:
+            self.links[(bytes(b.mac), bytes(a.mac))] = Link(loss, rssi, latency_ms)
+
+    def rssi(self, src, dst):
+        (x1, y1), (x2, y2) = src.device.pos, dst.device.pos
+        d = max(0.1, math.hypot(x2 - x1, y2 - y1))
+        return self.rssi_1m - 10 * self.path_loss * math.log10(d) + self.random.gauss(0, self.noise_db)
+
+    def airtime_us(self, size):
+        return (size + OVERHEAD_BYTES) * 8 * 1_000_000 // self.rate_bps
+
+    def transmit(self, src, dst_mac, msg, sync=False):
+        """Put one packet on the air. For a unicast returns True if it was delivered
+        (the ack), and with sync the sender blocks until then, like the real send()."""
+        clock = self.emulator.clock
+        start = max(clock.us, self.busy_until)
+        self.busy_until = start + self.airtime_us(len(msg))
+        self.sent += 1
+        if dst_mac == BROADCAST:
+            targets = [node for mac, node in self.nodes.items() if node is not src]
+        else:
+            node = self.nodes.get(bytes(dst_mac))
+            targets = [node] if node is not None else []
+        delivered = False
+        for dst in targets:
+            link = self.links.get((bytes(src.mac), bytes(dst.mac)))
+            loss = self.loss if link is None or link.loss is None else link.loss
+            rssi = self.rssi(src, dst) if link is None or link.rssi is None else link.rssi
+            latency = self.latency_ms if link is None or link.latency_ms is None else link.latency_ms
+            if rssi < self.sensitivity or self.random.random() < loss:
+                self.lost += 1
+                continue
+            delay_us = self.busy_until - clock.us + (latency + self.random.uniform(0, self.jitter_ms)) * 1000
+            dst.device.call_later(delay_us / 1_000_000, dst.deliver, bytes(src.mac), bytes(msg), int(rssi))
+            self.delivered += 1
+            delivered = True
+        if sync and dst_mac != BROADCAST:
+            # the sender waits for the MAC-layer ack (or its timeout)
+            clock.advance_us(self.busy_until - clock.us + self.latency_ms * 1000)
+        return delivered if dst_mac != BROADCAST else True
+
+    def stats(self):
+        return {"sent": self.sent, "delivered": self.delivered, "lost": self.lost}
@@ -0,0 +1,254 @@
+"""
+Scriptable I2C peripherals.
+
+A peripheral answers register reads and writes at one address. Attach them
+to a device with Device.add_i2c(); every I2C/SoftI2C bus the device opens
+sees all of them.
+"""
+
+import math
+
+G_REST = (0.0, 0.0, 1.0)
+
+
+class Registers:
+    """8-bit register file with auto-increment, the common case"""
+
+    def __init__(self, address):
+        self.address = address
+        self.regs = bytearray(256)
+        self.device = None      # set by Device.add_i2c
+
+    def attach(self, device):
+        self.device = device
+
+    @property
+    def seconds(self):
+        return self.device.emulator.clock.seconds if self.device else 0.0
+
+    def read(self, reg, n):
+        return bytes(self.regs[(reg + i) & 0xff] for i in range(n))
+
+    def write(self, reg, data):
+        for i, b in enumerate(data):
+            self.regs[(reg + i) & 0xff] = b
+
+    def read_raw(self, n):
+        return self.read(0, n)
+
+    def write_raw(self, data):
+        if data:
+            self.write(data[0], data[1:])
+
+
+class LIS2DW12(Registers):
+    """Accelerometer (utilities/i2c_bus.py).
+
+    The reading is a function of virtual time: set() holds one value,
+    script(fn) uses fn(seconds) -> (x, y, z) in g, shake() plays a burst.
+    In FIFO mode samples collect at the ODR; a read of 6*n bytes from OUT_X_L
+    pops n of them, like the chip's burst read.
+    """
+
+    WHO_AM_I = 0x0F
+    CTRL1 = 0x20
+    CTRL2 = 0x21
+    CTRL6 = 0x25
+    STATUS = 0x27
+    OUT_X_L = 0x28
+    FIFO_CTRL = 0x2E
+    FIFO_SAMPLES = 0x2F
+    FIFO_DEPTH = 32
+    ODR_HZ = {1: 12.5, 2: 12.5, 3: 25, 4: 50, 5: 100, 6: 200, 7: 400, 8: 800, 9: 1600}
+
+    def __init__(self, address=0x19):
+        super().__init__(address)
+        self.script_fn = lambda t: G_REST
+        self.reset()
+
+    def reset(self):
+        self.regs = bytearray(256)
+        self.regs[self.WHO_AM_I] = 0x44
+        self.fifo = []
+        self.fifo_time = None
+        self.overrun = False
+
+    def set(self, x, y, z):
+        self.script_fn = lambda t: (x, y, z)
+
+    def script(self, fn):
+        self.script_fn = fn
+
+    def shake(self, g=2.0, hz=5.0, seconds=1.0):
+        """Shake along x with amplitude g for seconds from now, then rest"""
+        start = self.seconds
+        rest = self.script_fn
+
+        def fn(t):
+            if start <= t < start + seconds:
+                return (g * math.sin(2 * math.pi * hz * (t - start)), 0.0, 1.0)
+            return rest(t)
+        self.script_fn = fn
+
+    def accel(self, t=None):
+        return self.script_fn(self.seconds if t is None else t)
+
+    @property
+    def odr(self):
+        return self.ODR_HZ.get(self.regs[self.CTRL1] >> 4, 0)
+
+    @property
+    def fifo_mode(self):
+        return self.regs[self.FIFO_CTRL] >> 5
+
+    def _raw(self, sample):
+        scale = 2 << (self.regs[self.CTRL6] >> 4 & 3)
+        out = b""
+        for v in sample:
+            raw = max(-32768, min(32767, int(v / scale * 32768)))
+            out += (raw & 0xffff).to_bytes(2, "little")
+        return out
+
+    def _fill_fifo(self):
+        now = self.seconds
+        if not self.fifo_mode or not self.odr:
+            self.fifo_time = None
+            return
+        if self.fifo_time is None:
+            self.fifo_time = now
+            return
+        period = 1 / self.odr
+        while self.fifo_time + period <= now:
+            self.fifo_time += period
+            if len(self.fifo) >= self.FIFO_DEPTH:
+                if self.fifo_mode == 1:     # FIFO mode stops when full
+                    self.overrun = True
+                    continue
+                self.fifo.pop(0)            # continuous mode drops the oldest
+                self.overrun = True
+            self.fifo.append(self.accel(self.fifo_time))
+
+    def read(self, reg, n):
+        self._fill_fifo()
+        if reg == self.STATUS:
+            self.regs[self.STATUS] = 0x01 if self.odr else 0
+        elif reg == self.FIFO_SAMPLES:
+            fth = self.regs[self.FIFO_CTRL] & 0x1f
+            self.regs[self.FIFO_SAMPLES] = (min(len(self.fifo), 63) | (0x40 if self.overrun else 0)
+                                            | (0x80 if fth and len(self.fifo) >= fth else 0))
+        elif reg == self.OUT_X_L:
+            if self.fifo_mode:
+                out = b""
+                for i in range(max(1, n // 6)):
+                    sample = self.fifo.pop(0) if self.fifo else self.accel()
+                    out += self._raw(sample)
+                self.overrun = False
+                return out[:n]
+            return self._raw(self.accel())[:n]
+        return super().read(reg, n)
+
+    def write(self, reg, data):
+        if reg == self.CTRL2 and data and data[0] & 0x40:    # soft reset
+            self.reset()
+            return
+        super().write(reg, data)
+        if reg == self.FIFO_CTRL:
+            self.fifo = []
+            self.overrun = False
+            self.fifo_time = None
+            self._fill_fifo()
+
+
+class MAX17048(Registers):
+    """Battery fuel gauge (utilities/max17048.py) - set percent and volts directly"""
+
+    def __init__(self, address=0x36, percent=87.0, volts=3.9):
+        super().__init__(address)
+        self.regs[0x08:0x0A] = b"\x00\x12"     # chip version
+        self.percent = percent
+        self.volts = volts
+
+    def read(self, reg, n):
+        soc = int(self.percent * 256)
+        self.regs[0x04:0x06] = soc.to_bytes(2, "big")
+        self.regs[0x02:0x04] = int(self.volts * 1_000_000 / 78.125).to_bytes(2, "big")
+        return super().read(reg, n)
+
+
+class SSD1306:
+    """128x64 OLED (ssd1306.py) - decodes the command stream into a copy of the panel RAM"""
+
+    ARGS = {0x20: 1, 0x21: 2, 0x22: 2, 0x81: 1, 0x8D: 1, 0xA8: 1, 0xD3: 1,
+            0xD5: 1, 0xD9: 1, 0xDA: 1, 0xDB: 1}
+
+    def __init__(self, address=0x3C, width=128, height=64):
+        self.address = address
+        self.width = width
+        self.pages = height // 8
+        self.ram = bytearray(width * self.pages)
+        self.command = []           # command waiting for its arguments
+        self.window = (0, width - 1, 0, self.pages - 1)
+        self.col = 0
+        self.page = 0
+        self.data_bytes = 0         # bytes of pixel data received
+        self.data_writes = 0        # data transfers
+        self.device = None
+
+    def attach(self, device):
+        self.device = device
+
+    def _cmd(self, b):
+        self.command.append(b)
+        if len(self.command) <= self.ARGS.get(self.command[0], 0):
+            return
+        op, *args = self.command
+        self.command = []
+        c0, c1, p0, p1 = self.window
+        if op == 0x21:
+            c0, c1 = args
+            self.col = c0
+        elif op == 0x22:
+            p0, p1 = args
+            self.page = p0
+        self.window = (c0, c1, p0, p1)
+
+    def _data(self, data):
+        c0, c1, p0, p1 = self.window
+        for b in data:
+            if self.page < self.pages and self.col < self.width:
+                self.ram[self.page * self.width + self.col] = b
+            self.col += 1
+            if self.col > c1:
+                self.col = c0
+                self.page = p0 if self.page >= p1 else self.page + 1
+        self.data_bytes += len(data)
+        self.data_writes += 1
+
+    def write_raw(self, data):
+        if not data:
+            return
+        if data[0] & 0x40:
+            self._data(data[1:])
+        else:
+            for b in data[1:]:
+                self._cmd(b)
+
+    def read_raw(self, n):
+        return bytes(n)
+
+    def read(self, reg, n):
+        return bytes(n)
+
+    def write(self, reg, data):
+        self.write_raw(bytes([reg]) + bytes(data))
+
+    def pixel(self, x, y):
+        return self.ram[(y // 8) * self.width + x] >> (y % 8) & 1
+
+    def ascii(self):
+        """The panel as text, two pixel rows per line"""
+        out = []
+        for y in range(0, self.pages * 8, 2):
+            out.append("".join(" '.:"[self.pixel(x, y) | self.pixel(x, y + 1) << 1]
+                               for x in range(self.width)).rstrip())
+        return "\n".join(out)
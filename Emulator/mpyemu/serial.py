@@ -0,0 +1,134 @@
+"""
+Virtual USB serial port of one device.
+
+The host side writes command lines with write() and reads everything the
+device printed from lines; frames() splits the hub's framed output
+(see SerialBridge in App_Web/webapp/hubCode/main.py) into channels.
+"""
+
+import json
+import asyncio
+
+FRAME_START = "\x1e"
+
+
+def parse_frame(line):
+    """(channel, payload) of one framed line, (None, line) for plain text"""
+    if not line.startswith(FRAME_START) or len(line) < 6:
+        return None, line
+    channel = line[1]
+    head, sep, rest = line[2:].partition(":")
+    if not sep or not head.isdigit():
+        return None, line
+    size = int(head)
+    payload, check = rest[:size], rest[size:]
+    if len(payload) != size or check != f"{sum(payload.encode()) & 0xff:02x}":
+        raise ValueError(f"bad frame: {line!r}")
+    return channel, payload
+
+
+class Stdin:
+    """sys.stdin of the device - asyncio.StreamReader(sys.stdin) reads from here"""
+
+    def __init__(self):
+        self.buffer = b""
+        self.event = asyncio.Event()
+
+    def feed(self, data):
+        self.buffer += data
+        self.event.set()
+
+    async def areadline(self):
+        while b"\n" not in self.buffer:
+            self.event.clear()
+            await self.event.wait()
+        line, _, self.buffer = self.buffer.partition(b"\n")
+        return line + b"\n"
+
+    async def aread(self, n=-1):
+        while not self.buffer:
+            self.event.clear()
+            await self.event.wait()
+        n = len(self.buffer) if n < 0 else n
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+    def read(self, n=-1):
+        # never blocks - the emulated REPL has nothing to wait for
+        n = len(self.buffer) if n < 0 else n
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data.decode()
+
+    def readline(self):
+        if b"\n" not in self.buffer:
+            return ""
+        line, _, self.buffer = self.buffer.partition(b"\n")
+        return (line + b"\n").decode()
+
+
+class Stdout:
+    def __init__(self, serial):
+        self.serial = serial
+
+    def write(self, text):
+        self.serial.output(text if isinstance(text, str) else bytes(text).decode())
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class VirtualSerial:
+    def __init__(self, name="", echo=False):
+        self.name = name
+        self.echo = echo        # also print the device output on the host, prefixed by name
+        self.stdin = Stdin()
+        self.stdout = Stdout(self)
+        self.lines = []         # complete output lines, oldest first
+        self.partial = ""
+        self.listeners = []     # called with each complete output line
+
+    def write(self, data):
+        """Host -> device. A str without a trailing newline gets one."""
+        if isinstance(data, str):
+            data = (data if data.endswith("\n") else data + "\n").encode()
+        self.stdin.feed(data)
+
+    def send_json(self, obj):
+        self.write(json.dumps(obj))
+
+    def output(self, text):
+        text = self.partial + text
+        *lines, self.partial = text.split("\n")
+        for line in lines:
+            line = line.rstrip("\r")
+            self.lines.append(line)
+            if self.echo:
+                print(f"[{self.name}] {line}")
+            for listener in self.listeners:
+                listener(line)
+
+    def text(self):
+        return "\n".join(self.lines)
+
+    def frames(self, channel=None, start=0):
+        """[(channel, payload), ...] of the framed lines from lines[start:]"""
+        found = []
+        for line in self.lines[start:]:
+            ch, payload = parse_frame(line)
+            if ch is not None and (channel is None or ch == channel):
+                found.append((ch, payload))
+        return found
+
+    def messages(self, channel="D", start=0):
+        """Decoded JSON payloads of one channel"""
+        found = []
+        for ch, payload in self.frames(channel, start):
+            try:
+                found.append(json.loads(payload))
+            except ValueError:
+                pass
+        return found
+
+    def clear(self):
+        self.lines = []
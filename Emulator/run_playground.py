@@ -0,0 +1,50 @@
+"""
+Run a hub and some modules in the emulator and send the hub a few commands.
+
+    python run_playground.py --modules 5 --loss 0.1 PING Shake stats
+    python run_playground.py --echo PING        # show every device's output
+"""
+
+import argparse
+import json
+
+from mpyemu import Emulator, Radio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("commands", nargs="*", default=["PING"], help="hub commands, sent 2 s apart")
+    parser.add_argument("--modules", type=int, default=3)
+    parser.add_argument("--loss", type=float, default=0.0, help="chance a receiver misses a packet")
+    parser.add_argument("--latency", type=float, default=1.0, help="radio latency in ms")
+    parser.add_argument("--spacing", type=float, default=2.0, help="metres between modules")
+    parser.add_argument("--cpu-scale", type=float, default=0, help="charge host CPU time x this to the clock")
+    parser.add_argument("--echo", action="store_true")
+    args = parser.parse_args()
+
+    radio = Radio(latency_ms=args.latency, loss=args.loss)
+    with Emulator(radio, cpu_scale=args.cpu_scale, echo=args.echo) as emu:
+        hub = emu.add_hub()
+        modules = [emu.add_module(f"plush{i + 1}", pos=((i + 1) * args.spacing, 0), boot_ms=37 * i)
+                   for i in range(args.modules)]
+        emu.run(2)
+        for command in args.commands:
+            start = len(hub.serial.lines)
+            hub.serial.send_json({"cmd": command})
+            emu.run(2)
+            print(f"--- {command} @ {emu.seconds:.2f} s")
+            for ch, payload in hub.serial.frames(start=start):
+                if ch != "G":
+                    print(ch, payload)
+
+        print(f"--- after {emu.seconds:.2f} virtual s")
+        print("radio", json.dumps(radio.stats()))
+        for device in [hub] + modules:
+            print(f"{device.name:8} {device.state:8} boots {device.boots} errors {len(device.errors)}"
+                  f" blocked {device.blocked_us // 1000} ms leds {device.pixels[:1]}")
+            for when, text in device.errors:
+                print(f"  {when:.2f}: {text.splitlines()[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Swarm - one ESP32 pretending to be many playground modules, to load a hub.
+
+Every virtual module sends /battery/<name> and /stats/<name> on its own
+timer (random phase, +-10% jitter), optionally /ping, and answers /scan in
+its slot like Plushie_Module does - unicast to the hub, and only until the
+hub has acked a reply in that scan. Stats go to the hub only too, once it
+has been heard. Settings come from swarm.json:
+
+    {"count": 50, "prefix": "load", "first": 0, "battery_ms": 1000,
+     "stats_ms": 5000, "ping_ms": 0, "scan": true, "log": false}
+
+Messages use the modules' binary format: copy this file, swarm.json and
+Plushie_Module/utilities/wire.py (as wire.py) to a spare ESP32 to load a real hub. All the
+virtual modules share that board's MAC, so the hub's scan list (keyed by MAC)
+only shows one of them; rates, drops and latency are still real. The
+emulator (Emulator/hub_load.py) runs one of these per emulated board instead.
+
+With "log" on, each first copy of a hub command prints "RX <topic> <seq>"
+and each stats packet "TX <name> <k>", which hub_load.py times.
+"""
+
+import json
+import time
+import random
+import asyncio
+import network
+import espnow
+import wire
+
+CONFIG = 'swarm.json'
+DEFAULTS = {'count': 10, 'prefix': 'load', 'first': 0, 'battery_ms': 60000,
+            'stats_ms': 30000, 'ping_ms': 0, 'scan': True, 'log': False}
+EVERYONE = b'\xff\xff\xff\xff\xff\xff'
+REPORT_MS = 10000
+
+def mac_hash(mac, salt = 0):
+    # same as Plushie_Module/utilities/now.py, so scan slots match real modules
+    h = 0x811c9dc5
+    for b in bytes(mac) + bytes((salt >> 8 & 0xff, salt & 0xff)):
+        h = ((h ^ b) * 0x01000193) & 0xffffffff
+    return h
+
+class Swarm:
+    def __init__(self, config):
+        self.config = config
+        self.names = [f"{config['prefix']}{config['first'] + i}" for i in range(config['count'])]
+        self.wifi = network.WLAN(network.STA_IF)
+        self.wifi.active(True)
+        self.net = espnow.ESPNow()
+        self.net.active(True)
+        self.net.add_peer(EVERYONE)
+        self.mac = self.wifi.config('mac')
+        self.sent = 0
+        self.failed = 0
+        self.received = {}      # topic -> first copies heard
+        self.seen = []          # recent (topic, seq) so broadcast repeats count once
+        self.k = 0              # stats packet counter, for matching at the hub
+        self.scanned = [None] * len(self.names)    # scan id each virtual module was acked in
+        self.hub = EVERYONE     # mac of the hub once it has sent something
+
+    def publish(self, msg, mac = EVERYONE):
+        # True if it went out (and, for a unicast, was acked)
+        try:
+            if mac != EVERYONE:
+                try:
+                    self.net.add_peer(mac)
+                except OSError:
+                    pass    # already registered
+            ok = self.net.send(mac, wire.encode(msg['topic'], msg['value']))
+            self.sent += 1
+            return ok
+        except OSError:
+            self.failed += 1
+            return False
+
+    def ident(self, i):
+        # what the slot hash runs over - the mac itself when this board is one module
+        return self.mac if len(self.names) == 1 else self.mac + self.names[i].encode()
+
+    def battery(self, i):
+        return {'topic': f'/battery/{self.names[i]}', 'value': 60 + (i * 7) % 40}
+
+    def stats(self, i):
+        self.k += 1
+        if self.config['log']:
+            print('TX', self.names[i], self.k)
+        return {'topic': f'/stats/{self.names[i]}',
+                'value': {'j': [0] * 8, 'q': 0, 'd': 0, 'n': self.k, 'l': 0, 'L': 0, 'w': 0,
+                          'm': 60000, 'M': 50000}}
+
+    def ping(self, i):
+        return {'topic': '/ping', 'value': 1}
+
+    async def every(self, period, make, i):
+        # one virtual module's timer, started at a random phase
+        await asyncio.sleep_ms(random.getrandbits(16) % period)
+        while True:
+            self.publish(make(i), self.hub if make == self.stats else EVERYONE)
+            await asyncio.sleep_ms(period - period // 10 + random.getrandbits(16) % (period // 5 + 1))
+
+    async def scan_reply(self, i, slot, nonce, scan, delay, hub):
+        await asyncio.sleep_ms(delay)
+        if self.publish({'topic': f'/scan/{self.names[i]}', 'value': (self.battery(i)['value'], 'load', slot, nonce)}, hub):
+            self.scanned[i] = scan
+
+    def handle(self, mac, msg):
+        message = wire.decode(msg)
+        if message is None:
+            return      # OTA chunks and the like
+        topic, value, seq = message[:3]
+        if seq is not None:
+            if (topic, seq) in self.seen:
+                return
+            self.seen = self.seen[-15:] + [(topic, seq)]
+        self.received[topic] = self.received.get(topic, 0) + 1
+        if topic == '/time':
+            self.hub = bytes(mac)   # only the hub sends the beacon
+        if self.config['log'] and topic != '/time':
+            print('RX', topic, seq)
+        if topic == '/scan' and self.config['scan']:
+            try:
+                slots, nonce, slot_ms = value[:3]
+                scan = value[3] if len(value) > 3 else None
+            except Exception:
+                slots, nonce, slot_ms, scan = 1, 0, 0, None
+            for i in range(len(self.names)):
+                if scan is not None and scan == self.scanned[i]:
+                    continue
+                slot = mac_hash(self.ident(i), nonce) % max(1, slots)
+                asyncio.create_task(self.scan_reply(i, slot, nonce, scan, slot * slot_ms, bytes(mac)))
+
+    async def receive(self):
+        flag = asyncio.ThreadSafeFlag()
+        self.net.irq(lambda net: flag.set())
+        while True:
+            await flag.wait()
+            while True:
+                mac, msg = self.net.irecv(0)
+                if mac is None:
+                    break
+                self.handle(mac, msg)
+
+    async def report(self):
+        while True:
+            await asyncio.sleep_ms(REPORT_MS)
+            print('SWARM', json.dumps({'modules': len(self.names), 'sent': self.sent,
+                                       'failed': self.failed, 'received': self.received}))
+
+    async def run(self):
+        c = self.config
+        for i in range(len(self.names)):
+            for period, make in ((c['battery_ms'], self.battery), (c['stats_ms'], self.stats), (c['ping_ms'], self.ping)):
+                if period:
+                    asyncio.create_task(self.every(period, make, i))
+        asyncio.create_task(self.report())
+        await self.receive()
+
+def load_config():
+    config = dict(DEFAULTS)
+    try:
+        with open(CONFIG) as f:
+            config.update(json.load(f))
+    except OSError:
+        pass
+    return config
+
+asyncio.run(Swarm(load_config()).run())
@@ -0,0 +1,38 @@
+# This file is executed on every boot, before main.py imports anything.
+# It activates the files of a finished OTA update (see utilities/ota.py): each
+# verified download waits as <path>.part and is listed in ota_pending.json.
+# Doing it here, with nothing but os and json, means the new utilities are the
+# ones main.py imports - not a copy renamed under an already running one.
+import os
+import json
+
+PENDING = 'ota_pending.json'   # keep in step with utilities/ota.py
+PART = '.part'
+
+def apply_pending():
+    # rename replaces the old file in one step, so a reset part way leaves each file whole
+    try:
+        with open(PENDING) as f:
+            paths = json.load(f)
+        if not isinstance(paths, list):
+            raise ValueError('not a list')
+    except OSError:
+        return []
+    except Exception as e:
+        # a corrupt list would fail again at every boot - drop it, the files stay as .part
+        print(f'ota bad {PENDING}: {e}')
+        os.remove(PENDING)
+        return []
+    applied = []
+    for path in paths:
+        try:
+            os.rename(path + PART, path)
+            applied.append(path)
+        except (OSError, TypeError):
+            pass    # missing .part or a bad entry - the rest still apply
+    os.remove(PENDING)
+    if applied:
+        print(f'ota applied {applied}')
+    return applied
+
+apply_pending()
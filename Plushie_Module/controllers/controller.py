@@ -1,11 +1,11 @@
 from machine import SoftI2C, Pin, ADC
-import time, json
+import time
 import micropython
-import ubinascii
 import asyncio
 from collections import deque
 
 import  utilities.now as now
+import utilities.wire as wire
 import config 
 tool = config.Controller_settings
 
@@ -25,6 +25,7 @@ class Control:
         self.n.connect()
         self.mac = self.n.wifi.config('mac')
         print('MAC: ',self.mac)
+        self.packets(range(-1, len(tool.games)))
         
         self.queue = deque([],1000)
         self.topics = {}
@@ -35,10 +36,12 @@ class Control:
         try:
             await asyncio.sleep(0)
             (msg, mac, rssi) = self.queue.popleft()
-            if not ('/ping' in msg): print(mac, msg, rssi)
-            payload = json.loads(msg)
-            topic = payload['topic']
-            value = payload['value']
+            message = wire.decode(msg)
+            if message is None:
+                print('pop error: unreadable message')
+                return
+            topic, value = message[:2]
+            if topic != '/ping': print(mac, topic, value, rssi)
             num = 1
             if topic in self.topics.keys():
                 num = 1 + self.topics[topic][1]
@@ -48,25 +51,26 @@ class Control:
         except Exception as e:
             print('pop error ',e)
             
+    def packets(self, games):
+        # every message packed once - the loops below ping 10 times a second
+        self.ping_packet = wire.encode('/ping', 1)
+        self.notify_packet = wire.encode('/notify', 1)
+        self.game_packets = {game: wire.encode('/game', game) for game in games}
+        
     def shutdown(self):
-        stop = json.dumps({'topic':'/game', 'value':-1})
-        self.n.publish(stop)
+        self.n.publish(self.game_packets[-1])
         
     def ping(self):
-        ping = json.dumps({'topic':'/ping', 'value':1})
-        self.n.publish(ping)
+        self.n.publish(self.ping_packet)
         
     def notify(self):
-        note = json.dumps({'topic':'/notify', 'value':1})
-        self.n.publish(note)
+        self.n.publish(self.notify_packet)
         print('notified')
         
     def choose(self, game):
-        encoded_bytes = ubinascii.b2a_base64(self.mac)
-        encoded_string = encoded_bytes.decode('ascii')
-
-        setup = json.dumps({'topic':'/game', 'value':(game,encoded_string)})
-        print(setup)
+        # modules take the controller mac from the ESP-NOW header
+        setup = self.game_packets.get(game) or wire.encode('/game', game)
+        print(game)
         self.n.publish(setup)
 
 
@@ -3,6 +3,7 @@ import time, json
 import ubinascii
 
 import  utilities.now as now
+import utilities.wire as wire
 
 ROW = 10
 
@@ -17,28 +18,29 @@ class Control:
         self.n.connect()
         self.mac = self.n.wifi.config('mac')
         print(self.mac)
+        self.packets(range(-1, 7))
+        self.gem_packet = json.dumps({'topic':'/gem', 'value':ubinascii.b2a_base64(self.mac).decode('ascii')})
+        
+    def packets(self, games):
+        # every message packed once - the loops below ping 10 times a second
+        self.ping_packet = wire.encode('/ping', 1)
+        self.notify_packet = wire.encode('/notify', 1)
+        self.game_packets = {game: wire.encode('/game', game) for game in games}
         
     def shutdown(self):
-        stop = json.dumps({'topic':'/game', 'value':-1})
-        self.n.publish(stop)
+        self.n.publish(self.game_packets[-1])
         
     def ping(self):
-        ping = json.dumps({'topic':'/ping', 'value':1})
-        self.n.publish(ping)
+        self.n.publish(self.ping_packet)
         
     def notify(self):
-        note = json.dumps({'topic':'/notify', 'value':1})
-        self.n.publish(note)
+        self.n.publish(self.notify_packet)
         print('notified')
         
     def choose(self, game):
-        encoded_bytes = ubinascii.b2a_base64(self.mac)
-        encoded_string = encoded_bytes.decode('ascii')
-        #time.sleep(0.5)
-        mac = json.dumps({'topic':'/gem', 'value':encoded_string})
-        self.n.publish(mac)
+        self.n.publish(self.gem_packet)
         #time.sleep(0.5)
-        setup = json.dumps({'topic':'/game', 'value':game})
+        setup = self.game_packets.get(game) or wire.encode('/game', game)
         self.n.publish(setup)
 
 
@@ -1,8 +1,8 @@
 from machine import SoftI2C, Pin, ADC
-import time, json
-import ubinascii
+import time
 
 import  utilities.now as now
+import utilities.wire as wire
 import config 
 tool = config.Controller_settings
 sophie = True
@@ -19,25 +19,27 @@ class Control:
         self.n.connect()
         self.mac = self.n.wifi.config('mac')
         print(self.mac)
+        self.packets(range(-1, 7))
+        
+    def packets(self, games):
+        # every message packed once - the loops below ping 10 times a second
+        self.ping_packet = wire.encode('/ping', 1)
+        self.notify_packet = wire.encode('/notify', 1)
+        self.game_packets = {game: wire.encode('/game', game) for game in games}
         
     def shutdown(self):
-        stop = json.dumps({'topic':'/game', 'value':-1})
-        self.n.publish(stop)
+        self.n.publish(self.game_packets[-1])
         
     def ping(self):
-        ping = json.dumps({'topic':'/ping', 'value':1})
-        self.n.publish(ping)
+        self.n.publish(self.ping_packet)
         
     def notify(self):
-        note = json.dumps({'topic':'/notify', 'value':1})
-        self.n.publish(note)
+        self.n.publish(self.notify_packet)
         print('notified')
         
     def choose(self, game):
-        encoded_bytes = ubinascii.b2a_base64(self.mac)
-        encoded_string = encoded_bytes.decode('ascii')
-
-        setup = json.dumps({'topic':'/game', 'value':(game,encoded_string)})
+        # modules take the controller mac from the ESP-NOW header
+        setup = self.game_packets.get(game) or wire.encode('/game', game)
         self.n.publish(setup)
 
 
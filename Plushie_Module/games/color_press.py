@@ -6,8 +6,8 @@ from games.game import Game
 from utilities.colors import *
 
 INTENSITY = 0.1
-UPRIGHT_THRESHOLD = 0.7   # x > 0.7 means upright
-UPSIDEDOWN_THRESHOLD = -0.7  # x < -0.7 means upside down
+UPRIGHT = 'x+'      # /motion/orientation - x above 0.7 g
+UPSIDE_DOWN = 'x-'  # x below -0.7 g
 
 
 class Color_Press(Game):
@@ -16,42 +16,43 @@ class Color_Press(Game):
         self.button_count = 0
         self.button_released = True
         self.state = 'Upright'
+        self.routes['/button/press'] = self.on_press
+        self.routes['/button/release'] = self.on_release
+        self.routes['/motion/orientation'] = self.on_orientation
 
     def start(self):
         self.main.lights.all_on(WHITE, INTENSITY)
               
     async def loop(self):
-        """
-        Async task to read the ping strength of hidden_gem.
-        """
-        try:
-            x,y,z = self.main.accel.read_accel()
-            
-            if self.main.button.pressed and self.state =='Upright': # Button pressed and upright
-                self.main.lights.all_off()
-                while self.main.button.pressed:
-                    pass
-                #self.main.lights.all_on(WHITE, INTENSITY)
-                self.button_count +=1
-                self.main.lights.all_on(WHITE, INTENSITY, self.button_count)
-                
-            if self.state == 'Upright':
-                if x < UPSIDEDOWN_THRESHOLD:
-                    self.state = 'Upside_down'
-            elif self.state == 'Upside_down':
-                if x > UPRIGHT_THRESHOLD:
-                    self.state = 'Upright'
-                    if self.button_count < 8 :
-                        print("setting lights on?")
-                        self.main.lights.all_on(COLORS[8-self.button_count], INTENSITY)
-                    else:
-                        self.main.lights.all_on(WHITE, INTENSITY)
-                    self.button_count = 0
-    
-        except Exception as e:
-            print(e)
+        pass    # everything happens in the button and motion handlers
+
+    def on_orientation(self, topic, up, info):
+        if self.state == 'Upright':
+            if up == UPSIDE_DOWN:
+                self.state = 'Upside_down'
+        elif self.state == 'Upside_down':
+            if up == UPRIGHT:
+                self.state = 'Upright'
+                if self.button_count < 8 :
+                    print("setting lights on?")
+                    self.main.lights.all_on(COLORS[8-self.button_count], INTENSITY)
+                else:
+                    self.main.lights.all_on(WHITE, INTENSITY)
+                self.button_count = 0
 
         
+    def on_press(self, topic, value, info):
+        if self.state == 'Upright':
+            self.main.lights.all_off()
+            self.button_released = False
+
+    def on_release(self, topic, value, info):
+        # every press counts, however quick - the button events come from its IRQ
+        if not self.button_released:
+            self.button_released = True
+            self.button_count +=1
+            self.main.lights.all_on(WHITE, INTENSITY, self.button_count)
+
     def close(self):
         self.main.lights.all_off() 
         
@@ -6,8 +6,8 @@ from games.game import Game
 from utilities.colors import *
 
 INTENSITY = 0.1
-UPRIGHT_THRESHOLD = 0.7
-UPSIDEDOWN_THRESHOLD = -0.7
+UPRIGHT = 'x+'      # /motion/orientation - x above 0.7 g
+UPSIDE_DOWN = 'x-'  # x below -0.7 g
 
 SCOOP_SIZE = 4
 NUM_SCOOPS = 3
@@ -26,6 +26,8 @@ class Color_Press_Mult(Game):
         self.scoop_index = 0
         self.scoop_colors = [None] * NUM_SCOOPS
         self.counting_mode = False
+        self.routes['/button/press'] = self.on_press
+        self.routes['/motion/orientation'] = self.on_orientation
 
     def start(self):
         self._reset_cycle()
@@ -87,51 +89,46 @@ class Color_Press_Mult(Game):
         self.counting_mode = False
 
     async def loop(self):
-        try:
-            x, y, z = self.main.accel.read_accel()
-
-            # --- button press while upright ---
-            if self.main.button.pressed and self.state == 'Upright':
-
-                # After scoop 3 is showing, first press begins a new cycle for scoop 1
-                if self.scoop_index >= NUM_SCOOPS:
-                    self._restart_for_new_cycle()
-
-                # debounce
-                while self.main.button.pressed:
-                    pass
-
-                self.button_count += 1
-                self.counting_mode = True
-
-                # focus counting view
-                self._render_count_bar()
-
-            # --- flip detection commits scoop ---
-            if self.state == 'Upright':
-                if x < UPSIDEDOWN_THRESHOLD:
-                    self.state = 'Upside_down'
-
-            elif self.state == 'Upside_down':
-                if x > UPRIGHT_THRESHOLD:
-                    self.state = 'Upright'
-
-                    # Commit ONLY if we are mid-cycle and the user actually counted presses
-                    if self.scoop_index < NUM_SCOOPS and self.counting_mode:
-                        chosen = self._color_from_count(self.button_count)
-                        self.scoop_colors[self.scoop_index] = chosen
-
-                        self.scoop_index += 1
-                        self.button_count = 0
-                        self.counting_mode = False
-
-                        # after commit, all scoops reappear
-                        self._render_committed()
-                    else:
-                        self._render_committed()
-
-        except Exception as e:
-            print(e)
+        pass    # everything happens in the button and motion handlers
+
+    def on_orientation(self, topic, up, info):
+        # --- flip detection commits scoop ---
+        if self.state == 'Upright':
+            if up == UPSIDE_DOWN:
+                self.state = 'Upside_down'
+
+        elif self.state == 'Upside_down':
+            if up == UPRIGHT:
+                self.state = 'Upright'
+
+                # Commit ONLY if we are mid-cycle and the user actually counted presses
+                if self.scoop_index < NUM_SCOOPS and self.counting_mode:
+                    chosen = self._color_from_count(self.button_count)
+                    self.scoop_colors[self.scoop_index] = chosen
+
+                    self.scoop_index += 1
+                    self.button_count = 0
+                    self.counting_mode = False
+
+                    # after commit, all scoops reappear
+                    self._render_committed()
+                else:
+                    self._render_committed()
+
+    def on_press(self, topic, value, info):
+        # --- button press while upright (debounced by the button's event queue) ---
+        if self.state != 'Upright':
+            return
+
+        # After scoop 3 is showing, first press begins a new cycle for scoop 1
+        if self.scoop_index >= NUM_SCOOPS:
+            self._restart_for_new_cycle()
+
+        self.button_count += 1
+        self.counting_mode = True
+
+        # focus counting view
+        self._render_count_bar()
 
     def close(self):
         self.main.lights.all_off()
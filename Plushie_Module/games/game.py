@@ -1,13 +1,92 @@
 import asyncio
 import json
+import time
+
+import utilities.metrics as metrics
+import utilities.motion as motion
 
 from utilities.colors import *
 
+RELEASE_POLL_MS = 20    # how often wait_release looks at the button
+
 class Game:
     def __init__(self, main, name = 'test'):
         self.name = name
         self.main = main
+        self.routes = {}        # topic -> handler(topic, value, info), subscribed while the game runs
+        self.subscribed = []    # (topic, deliver) pairs registered with main.router
+        self.effects = []       # effect tasks still running, cancelled when the game stops
+
+    def subscribe(self):
+        for topic, handler in self.routes.items():
+            deliver = self.deliver(handler)
+            self.main.router.subscribe(topic, deliver)
+            self.subscribed.append((topic, deliver))
+            if topic.startswith(motion.TOPIC):
+                self.main.motion.use()
+
+    def unsubscribe(self):
+        for topic, deliver in self.subscribed:
+            self.main.router.unsubscribe(topic, deliver)
+            if topic.startswith(motion.TOPIC):
+                self.main.motion.release()
+        self.subscribed = []
+
+    def deliver(self, handler):
+        # game handlers run in a task of their own once main.py is done with the
+        # message, so its receive flash does not paint over what they show
+        async def call(topic, value, info):
+            if not self.subscribed:
+                return      # the game stopped in the meantime
+            try:
+                result = handler(topic, value, info)
+                if result is not None:
+                    await result
+            except Exception as e:
+                self.main.log_message(f'{self.name} {topic} error {e}')
+        def schedule(topic, value, info):
+            # returns None, not the task - the router would await a task
+            asyncio.create_task(call(topic, value, info))
+        return schedule
     
+    # timed effects - each runs as its own task instead of sleeping in the game,
+    # so received messages keep being handled. Await the task to wait for it.
+    def effect(self, coro):
+        self.effects = [t for t in self.effects if not t.done()]
+        task = asyncio.create_task(coro)
+        self.effects.append(task)
+        return task
+
+    def tone(self, frequency, ms):
+        return self.effect(self._tone(frequency, ms))
+
+    async def _tone(self, frequency, ms):
+        self.main.buzzer.play(frequency)
+        try:
+            await asyncio.sleep_ms(ms)
+        finally:
+            self.main.buzzer.stop()
+
+    def blink(self, color, times, on_ms = 500, off_ms = 500, intensity = None, number = None):
+        return self.effect(self._blink(color, times, on_ms, off_ms, intensity, number))
+
+    async def _blink(self, color, times, on_ms, off_ms, intensity, number):
+        for i in range(times):
+            self.main.lights.all_on(color, intensity, number)
+            await asyncio.sleep_ms(on_ms)
+            self.main.lights.all_off()
+            await asyncio.sleep_ms(off_ms)
+
+    async def wait_release(self):
+        while self.main.button.pressed:
+            await asyncio.sleep_ms(RELEASE_POLL_MS)
+
+    def stop_effects(self):
+        for task in self.effects:
+            task.cancel()
+        self.effects = []
+        self.main.melody.stop()
+
     async def loop(self):
         if self.main.button.pressed:  # Button pressed
             self.main.lights.all_on(self.main.tool.color, self.main.tool.intensity)
@@ -26,16 +105,24 @@ class Game:
             self.main.log_message(f'starting game {self.name}')
             hub_name = self.main.tool.name
             self.start()
+            self.subscribe()
             i=0 
+            period = int(response * 1000)
+            due = time.ticks_add(time.ticks_ms(), period)
             while self.main.running:
                 if not i:
-                    msg = {'topic':f'/battery/{hub_name}', 'value':self.main.battery.read()}
-                    self.main.publish(msg)
-                    self.main.log_message(f'sent battery level {msg}')
+                    level = self.main.battery.read()
+                    self.main.publish(f'/battery/{hub_name}', level)
+                    self.main.log_message(f'sent battery level {level}')
                 i = i+1 if i < 60/response else 0
                 await self.loop()
                 await asyncio.sleep(response)
+                now = time.ticks_ms()
+                metrics.registry.tick(time.ticks_diff(now, due))
+                due = time.ticks_add(now, period)
         finally:
+            self.stop_effects()
+            self.unsubscribe()
             self.close()
             self.main.log_message(f"ending game {self.name}")
 
@@ -1,7 +1,5 @@
 # How we turn them all off
 
-import time
-
 from games.game import Game
 from utilities.colors import *
 
@@ -10,20 +8,22 @@ INTENSITY = 0.1
 class Hibernate(Game):
     def __init__(self, main):
         super().__init__(main, 'Hibernate Game')
+        self.routes['/notify'] = self.on_notify
         
     def start(self):
-        for i in range(5):
-            self.main.lights.all_on(RED, 0.1, 12)
-            time.sleep(0.5)
-            self.main.lights.all_off()
-            time.sleep(0.5)
+        self.effect(self.power_down())
+
+    async def power_down(self):
+        # blink a warning, then deep sleep unless someone holds the button
+        await self.blink(RED, 5, intensity = 0.1, number = 12)
         if not self.main.button.pressed:
             self.main.hibernate.hibernate()
             
     async def loop(self):
-        if self.main.topic == '/notify':
-            self.start()
-            self.main.topic = ''
+        pass
+
+    def on_notify(self, topic, value, info):
+        self.start()
 
     def close(self):
         self.main.lights.all_off()
@@ -29,7 +29,7 @@ class Pattern_btn(Game):
                 #while new_color == self.last_color:
                 #new_color = random.choice(COLORS)
                 new_color = self.main.tool.color
-                self.main.publish({'topic':'/color', 'value':new_color})
+                self.main.publish('/color', new_color)
                 self.last_color = new_color
                 print('sent ', new_color)
         else:  # Button released
@@ -12,6 +12,7 @@ FIFO = 12
 class Pattern_plush(Game):
     def __init__(self, main):
         super().__init__(main, 'Pattern Game Plush')
+        self.routes['/color'] = self.on_color
         
     def start(self):
         self.main.lights.all_on(WHITE, 0.01)
@@ -20,17 +21,19 @@ class Pattern_plush(Game):
         self.old_color = -1
 
     async def loop(self):
+        pass
+
+    def on_color(self, topic, value, info):
         """
-        Async task to wait for a message from a button and then show the color from the message
+        Show the color from a button's /color message
         """
-        if self.main.topic == '/color':  #might be better to just look at self.value...
-            new_color = self.main.tool.color
-            if new_color != self.old_color:
-                self.pattern.append(new_color)
-                self.pattern = self.pattern[-FIFO:]
-                for i, c in enumerate(self.pattern):
-                    self.main.lights.on(i, c, self.main.tool.intensity)
-                self.old_color = new_color
+        new_color = tuple(value)
+        if new_color != self.old_color:
+            self.pattern.append(new_color)
+            self.pattern = self.pattern[-FIFO:]
+            for i, c in enumerate(self.pattern):
+                self.main.lights.on(i, c, self.main.tool.intensity)
+            self.old_color = new_color
 
     def close(self):
         self.main.lights.all_off() 
@@ -4,7 +4,6 @@ import random
 import math
 import asyncio
 import time
-import json
 
 from games.game import Game
 from utilities.colors import *
@@ -14,21 +13,26 @@ INTENSITY = 0.1
 class Rainbow(Game):
     def __init__(self, main):
         super().__init__(main, 'Rainbow Game')
+        self.routes['/notify'] = self.on_notify
         
     def start(self):
         self.bat = int(self.main.battery.read()/100*self.main.tool.num_of_leds)
         self.bat = max(1, min(self.bat,self.main.tool.num_of_leds))
         print('Battery: ',self.bat)
         self.main.lights.all_on(GREEN, 0.1, self.bat)
-        self.main.espnow.publish(json.dumps({'topic':'/battery', 'value':self.bat}))
-        time.sleep(2)
+        self.main.publish('/battery', self.bat)
+        self.effect(self.rainbow())
+
+    async def rainbow(self):
+        await asyncio.sleep(2)    # battery level stays up for 2 s
         for i in range(self.main.tool.num_of_leds):
             self.main.lights.on(i, COLORS[i%7], INTENSITY)
             
     async def loop(self):
-        if self.main.topic == '/notify':
-            self.start()
-            self.main.topic = ''
+        pass
+
+    def on_notify(self, topic, value, info):
+        self.start()
 
     def close(self):
         self.main.lights.all_off()
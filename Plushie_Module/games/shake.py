@@ -1,7 +1,6 @@
 # shake to fill - harder you shake the more LEDs light up - can't go back - so always shows the greatest
 
 import random
-import math
 import asyncio
 
 from games.game import Game
@@ -12,16 +11,20 @@ from utilities.colors import *
 class Shake(Game):
     def __init__(self, main):
         super().__init__(main, 'Shakes Game')
+        self.routes['/motion/features'] = self.on_motion
         
     def start(self):
         self.color = random.choice(COLORS)
         print(f'your color is {self.color}')
         self.level = 0
-        
-    def accel_mag(self):
-        x,y,z = self.main.accel.read_accel()
-        return math.sqrt(x**2+y**2+z**2) - 1
-        
+
+    def on_motion(self, topic, motion, info):
+        # peak is the hardest |a| - 1 g of the tick in mg: LEDs = 1.5 * g^3, in centi-g to stay in small ints
+        if self.main.button.pressed:
+            return
+        cg = motion.peak // 10
+        acc = min(self.main.tool.num_of_leds, cg * cg * cg * 3 // 2000000)
+        if self.level < acc: self.level = acc
 
     async def loop(self):
         """
@@ -32,8 +35,6 @@ class Shake(Game):
             self.level = 0
             self.main.lights.all_off()
         else:  # Button released
-            acc = min(self.main.tool.num_of_leds, int(self.accel_mag()**3*1.5))
-            if self.level < acc: self.level = acc
             self.main.lights.all_on(self.color, 0.1, self.level)
 
     def close(self):
@@ -1,6 +1,5 @@
 # shake to fill - harder you shake the closer you get to purple (ROYGBIV) - all the LEDs light up
 
-import math
 import asyncio
 
 from games.game import Game
@@ -8,10 +7,14 @@ from utilities.colors import *
 
 SHAKE_COLOR_RANGE = [WHITE, RED, ORANGE, YELLOW, GREEN, BLUE, INDIGO, VIOLET]
 
+SHAKE_THRESHOLD = 150       # mg of shake energy before the color starts to move
+ACC_MAX = 10                # 1.5 * g^2 at the top of the range
+
 
 class Shake_Rainbow(Game):
     def __init__(self, main):
         super().__init__(main, 'Shake Rainbow')
+        self.routes['/motion/features'] = self.on_motion
 
     def start(self):
         print("Shake the plushy to change colors!")
@@ -19,36 +22,27 @@ class Shake_Rainbow(Game):
         self.current_level = 0
         self.current_color = SHAKE_COLOR_RANGE[self.current_level]
 
-        self.shake_threshold = 0.15 
-        self.acc_max = 10.0
-
-    def accel_mag(self):
-        x, y, z = self.main.accel.read_accel()
-        return math.sqrt(x**2 + y**2 + z**2) - 1
-
-    async def loop(self):
+    def on_motion(self, topic, motion, info):
         if self.main.button.pressed:
-            self.current_level = 0
-            self.current_color = SHAKE_COLOR_RANGE[self.current_level]
-            self.main.lights.all_off()
             return
-
-        acc_raw = self.accel_mag()
-
-        if acc_raw > self.shake_threshold:
-            # Shape + clamp
-            acc = (acc_raw ** 2) * 1.5
-            acc = max(0.0, min(self.acc_max, acc))
-
+        if motion.energy > SHAKE_THRESHOLD:
+            # 1.5 * g^2 of the hardest moment scaled onto the colors, clamped at ACC_MAX
+            peak = motion.peak
             n = len(SHAKE_COLOR_RANGE)
-            level = int((acc / self.acc_max) * (n - 1))
-            level = max(0, min(n - 1, level))
+            level = min(n - 1, peak * peak * 3 * (n - 1) // (2 * ACC_MAX * 1000000))
 
             # Only change color when the level changes
             if level > self.current_level:
                 self.current_level = level
                 self.current_color = SHAKE_COLOR_RANGE[level]
 
+    async def loop(self):
+        if self.main.button.pressed:
+            self.current_level = 0
+            self.current_color = SHAKE_COLOR_RANGE[self.current_level]
+            self.main.lights.all_off()
+            return
+
         # Always show the stored (sticky) color
         self.main.lights.all_on(self.current_color, 0.1)
 
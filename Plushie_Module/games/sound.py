@@ -5,6 +5,7 @@ import asyncio
 
 from games.game import Game
 from utilities.colors import *
+from utilities.melody import notes
 
 # all lights etc declared in Game
 
@@ -30,27 +31,37 @@ NOTE_COLORS = {
 class Notes(Game):
     def __init__(self, main):
         super().__init__(main, 'Notes Game')
+        self.routes['/reset'] = self.on_reset
+        self.routes['/button/press'] = self.on_press
+        self.routes['/button/release'] = self.on_release
         
-    def start(self):
+    def start(self, at = None):
         self.note = random.choice(list(NOTES.keys()))
         self.frequency = NOTES[self.note]
         self.main.log_message(f"You were assigned {self.note} at a frequency of {self.frequency}.")
+        # every module rings its note from the same hub time, so together they play a chord
+        self.main.lights.all_off()
+        # a module that got here late joins in part way through instead of lagging
+        self.main.melody.start(notes([(self.frequency, 800, 100, 0)]), self.main.start_at if at is None else at)
 
     async def loop(self):
+        pass
+
+    def on_press(self, topic, value, info):
         """
-        Async task to play a random note while button is pressed.
-        Stops when self.running is set to False.
+        Play the note while the button is held.
         """
-        if self.main.topic == '/reset':
-            self.main.topic = '/notify'
-            self.start()
-        if self.main.button.pressed:  # Button pressed
-            self.main.buzzer.play(self.frequency)
-            color = NOTE_COLORS[self.note]
-            self.main.lights.all_on(color, self.main.tool.intensity)
-        else:  # Button released
-            self.main.buzzer.stop()  # Silence
-            self.main.lights.all_off()
+        self.main.melody.stop()
+        self.main.buzzer.play(self.frequency)
+        color = NOTE_COLORS[self.note]
+        self.main.lights.all_on(color, self.main.tool.intensity)
+
+    def on_release(self, topic, value, info):
+        self.main.buzzer.stop()  # Silence
+        self.main.lights.all_off()
+
+    def on_reset(self, topic, value, info):
+        self.start(info[2])     # the hub picked this game again - new note
 
     def close(self):
         self.main.lights.all_off() 
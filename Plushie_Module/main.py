@@ -1,7 +1,6 @@
 import time
 import asyncio
-import json
-import ubinascii
+import machine
 
 from collections import deque
 
@@ -9,9 +8,24 @@ import utilities.utilities as utilities
 import utilities.lights as lights
 import utilities.now as now
 import utilities.i2c_bus as i2c_bus
+import utilities.timesync as timesync
+import utilities.show as show
+import utilities.ota as ota
+import utilities.metrics as metrics
+import utilities.wire as wire
+import utilities.router as router
+import utilities.melody as melody
+import utilities.motion as motion
 from utilities.colors import *
+
 import config 
 
+RSSI_SMOOTHING = 0.25   # weight of the newest sample in the per-sender rssi average
+MAX_START_WAIT = 2000   # ms - ignore 'at' times further ahead than this
+QUEUE_SIZE = 20         # received messages waiting for the main loop
+QUIET = ('/ping', '/time')  # frequent messages - no log line and no receive flash
+UPLINK = ('/scan/', '/stats/', '/battery/')  # other modules' reports to the hub - dropped unread
+
 class Tool:
     def __init__(self):
         self.tool = config.Box_settings
@@ -21,23 +35,35 @@ class Tool:
 
         self.game = -1
         self.running = False
-        self.topic = ''
-        self.value = -1
         self.task = None
         self.hidden_gem = None
-        self.queue = deque([], 20)
+        self.start_at = None    # hub time the running game was told to start at
+        self.scanned = None     # id of the scan the hub has acked our reply for
+        self.rssi = None
+        self.rssi_avg = {}  # sender mac -> smoothed rssi
+        self.dedupe = now.Dedupe()  # drops the repeated copies of reliable broadcasts
+        self.clock = timesync.ClockSync()  # follows the hub clock from its /time beacons
+        self.queue = deque([], QUEUE_SIZE)
         self.log_message('Plushie', False) 
+        self.router = router.Router(self.log_message)  # games subscribe while they run
+        for topic, handler in (('/ping', self.on_ping), ('/time', self.on_time), ('/game', self.on_game),
+                               ('/color', self.on_color), ('/show', self.on_show), ('/scan', self.on_scan),
+                               ('/battery', self.on_battery)):
+            self.router.subscribe(topic, handler)
 
         self.lights = lights.Lights(self.tool.num_of_leds)
         self.lights.color = self.tool.color
         self.lights.intensity = self.tool.intensity
         self.lights.on(0)
+        self.show = show.Show(self.lights, self.clock)  # light shows broadcast by the hub
         
         self.accel = i2c_bus.LIS2DW12()
+        self.motion = motion.Motion(self.accel)  # accelerometer features for the games, see utilities/motion.py
         self.battery = i2c_bus.Battery()
         self.button = utilities.Button(self.tool.module_type)
         self.buzzer = utilities.Buzzer(self.tool.volume)
         self.buzzer.stop()
+        self.melody = melody.Sequencer(self.buzzer, self.clock)  # timer-driven tunes, see utilities/melody.py
         self.hibernate = utilities.Hibernate()
         
         # this will initialize each game and pass in attributes of this class - (self) - 
@@ -63,15 +89,19 @@ class Tool:
         self.espnow.connect()
         self.lights.on(2)
         self.mac = self.espnow.wifi.config('mac')
+        self.ota = ota.Receiver(self.espnow.publish, self.log_message)
         self.log_message(f'my mac address is {[hex(b) for b in self.mac]}')
         self.lights.on(3)
-        self.topic = ''
-        self.msg = ''
         self.log_message('Started up') 
         
-    def publish(self, msg):
-        self.espnow.publish(json.dumps(msg))
-        #self.log_message(f'published {msg}')
+    def publish(self, topic, value, mac = None):
+        # to everyone, or only to mac (returns True once it acks)
+        return self.espnow.publish(wire.encode(topic, value), mac)
+
+    def uplink(self, topic, value):
+        # reports for the hub - only to it once a /game has told us which one it is
+        return self.publish(topic, value, self.hidden_gem)
+        #self.log_message(f'published {topic} {value}')
         
     def start_game(self, number):
         if number < 0 or number >= len(self.game_names):
@@ -79,7 +109,7 @@ class Tool:
             return
         if self.game == number:
             self.log_message(f'notify {number}')
-            self.topic = '/notify'
+            asyncio.create_task(self.router.dispatch('/notify', number))
             return
         self.log_message('starting game ', number)
         self.running = True
@@ -99,12 +129,15 @@ class Tool:
             self.stop_game(self.game)
         if self.espnow: self.espnow.close()
         self.lights.all_off()
+        self.melody.stop()
         self.buzzer.stop()
         self.log_message('Closed') 
 
     def now_callback(self, msg, mac, rssi):
         try:
-            self.queue.append((msg, mac, rssi))
+            dropped = len(self.queue) >= QUEUE_SIZE
+            self.queue.append((msg, mac, rssi, time.ticks_ms()))
+            metrics.registry.queued(len(self.queue), dropped)
         except Exception as e:
             self.log_message(f"Callback error: {e}")
     
@@ -113,81 +146,148 @@ class Tool:
         if not len(self.queue):
             return
         await asyncio.sleep(0)  # yield to wifi
+        received = None
         try:
-            (msg, mac, rssi) = self.queue.pop()
+            (msg, mac, rssi, received) = self.queue.pop()
             #print(msg, mac, rssi)
-            payload = json.loads(msg)
-            self.topic = payload['topic']
-            self.value = payload['value']
-
-            if self.topic == '/ping':
-                self.rssi = rssi
+            if ota.is_ota(msg):
+                if self.ota.handle(msg):
+                    self.log_message('OTA update ready - restarting')
+                    self.close()
+                    machine.reset()
+                return
+            decoded = wire.decode(msg)
+            if decoded is None:
+                self.log_message('pop error: unreadable message')
+                return
+            topic, value, seq, threshold, at = decoded
+            if topic[:topic.find('/', 1) + 1] in UPLINK:
+                return      # meant for the hub - no flash, no log line, no handler
+            self.track_rssi(mac, rssi)
+            if self.dedupe.seen(mac, seq):
+                return
+            info = (mac, rssi, at, received)
+            if topic in QUIET:
+                await self.router.dispatch(topic, value, info)
+                return
+            self.log_message(f'received {topic} {value}')
+            if not self.in_range(mac, threshold):
+                self.log_message(f'ignored {topic}: rssi {self.rssi_avg.get(mac)} < {threshold}')
                 return
+            if topic == '/show':
+                # no receive flash - it would show up as a glitch in the show
+                handled = await self.router.dispatch(topic, value, info)
             else:
-                #print(mac, msg, rssi)
                 current = list(self.lights.last_pattern)
                 self.lights.all_on(self.tool.color)
-                await self.execute_queue(self.topic, self.value, self.game)
+                handled = await self.router.dispatch(topic, value, info)
                 self.lights.array_on(current)
-                #self.lights.all_off()
+            if not handled:
+                self.log_message(f'unrecognized topic:{topic}')
             
         except Exception as e:
             self.log_message(f'pop error {e}')
+        finally:
+            if received is not None:
+                metrics.registry.processed(received)
                 
-    async def execute_queue(self, topic, reply, game):
-        await asyncio.sleep(0)  #yield to WiFi
-        #print(topic, value, game)
+    def now_synced_ms(self):
+        # hub time in ticks_ms - the same on every module once beacons have arrived
+        return self.clock.now()
+
+    async def wait_until(self, at):
+        # sleep until hub time 'at' so all modules act together
+        if at is None or not self.clock.synced:
+            return
+        wait = time.ticks_diff(self.clock.to_local(at), time.ticks_ms())
+        if 0 < wait <= MAX_START_WAIT:
+            await asyncio.sleep_ms(wait)
+
+    def track_rssi(self, mac, rssi):
+        # exponential average of how well we hear each sender
         try:
-            self.log_message(f'received {topic} {reply}')
-            if topic == '/game':
-                try:
-                    value, gem_mac = reply
-                except:
-                    self.log_message('received /game request for old firmware')
-                    return
-                gem_mac = ubinascii.a2b_base64(gem_mac.encode('ascii'))
-                self.log_message(f'controller mac address = {gem_mac}')
-                self.hidden_gem = gem_mac
-                
-                if value != game:
-                    self.button.flag = True #ignore button presses
-                    self.log_message(f'Game {value}')
-                    if game >= 0:
-                        await self.stop_game(game)
-                        await self.lights.animate(RED,timeout = 0, speed = 0.01)
-                    #self.game = self.value
-                    if value >= 0:
-                        self.log_message('starting game ',value)
-                        await self.lights.animate(COLORS[value],timeout = 0, speed = 0.01)
-                        self.start_time = time.ticks_ms()
-                        self.start_game(value)
-                    self.button.flag = False
-                elif game == 0:
-                    self.log_message('reset')
-                    topic = '/reset'
-                else:
-                    self.log_message('notifying')
-                    topic = '/notify'
-                    
-            elif topic == '/color':
-                self.color = value
-                self.log_message(f"color  {self.color}")
-                
-            elif '/battery' in topic:
-                value = reply
-                self.log_message(f"{topic}  {value}")
-            
-            else:
-                self.log_message(f'unrecognized topic:{topic}')
+            sample = rssi[mac][0]
+        except:
+            return
+        avg = self.rssi_avg.get(mac)
+        self.rssi_avg[mac] = sample if avg is None else avg + RSSI_SMOOTHING * (sample - avg)
+
+    def in_range(self, mac, threshold):
+        # threshold-targeted broadcasts only apply to modules that hear the sender well enough
+        if threshold is None:
+            return True
+        return self.rssi_avg.get(mac, -100) >= threshold
+
+    async def scan_reply(self, request, hub, received):
+        # answer in our slot so modules don't all reply at the same time - to the hub only,
+        # so the other modules don't queue, flash and log every reply
+        try:
+            slots, nonce, slot_ms = request[:3]
+            scan = request[3] if len(request) > 3 else None
+        except:
+            slots, nonce, slot_ms, scan = 1, 0, 0, None   # old hub - answer right away
+        if scan is not None and scan == self.scanned:
+            return      # already heard in this scan - leave the later rounds to the others
+        slot = now.mac_hash(self.mac, nonce) % max(1, slots)
+        wait = time.ticks_diff(time.ticks_add(received, slot * slot_ms), time.ticks_ms())
+        if wait > 0:
+            await asyncio.sleep_ms(wait)
+        if self.publish(f'/scan/{self.tool.name}', (self.battery.read(), self.tool.module_type, slot, nonce), hub):
+            self.scanned = scan
+
+    # message handlers - info is (sender mac, espnow rssi table, start time 'at', ticks_ms received)
+    def on_ping(self, topic, value, info):
+        self.rssi = info[1]
+
+    def on_time(self, topic, value, info):
+        self.clock.update(value, info[3])
+
+    async def on_game(self, topic, value, info):
+        mac, rssi, at, received = info
+        game = self.game
+        self.log_message(f'controller mac address = {mac}')
+        self.hidden_gem = mac   # the hub that sent the game, from the ESP-NOW header
+        if value == game:
+            # the running game again - tell it instead of restarting it
+            self.log_message('reset' if game == 0 else 'notifying')
+            self.start_at = at      # this round's time (or None) - not the one the game first started at
+            await self.router.dispatch('/reset' if game == 0 else '/notify', value, info)
+            return
+        self.show.stop()
+        self.button.flag = True #ignore button presses
+        self.log_message(f'Game {value}')
+        if game >= 0:
+            await self.stop_game(game)
+            await self.lights.animate(RED,timeout = 0, speed = 0.01)
+        if value >= 0:
+            self.log_message('starting game ',value)
+            await self.lights.animate(COLORS[value],timeout = 0, speed = 0.01)
+            await self.wait_until(at)
+            self.start_at = at
+            self.start_time = time.ticks_ms()
+            self.start_game(value)
+        self.button.flag = False
+
+    def on_color(self, topic, value, info):
+        self.color = value
+        self.log_message(f"color  {self.color}")
+
+    def on_show(self, topic, value, info):
+        self.show.start(value, self.mac, info[2])
+
+    def on_scan(self, topic, value, info):
+        received = info[3]
+        asyncio.create_task(self.scan_reply(value, info[0], received if received is not None else time.ticks_ms()))
+
+    def on_battery(self, topic, value, info):
+        self.log_message(f"{topic}  {value}")
 
-            self.topic =  topic
-            self.value = value
-        except Exception as e:
-            self.log_message(f'execute queue {e}')
-                    
     async def main(self):
         try:
             self.startup()
+            asyncio.create_task(metrics.registry.run(self.uplink, self.tool.name))
+            asyncio.create_task(self.button.run(self.router.dispatch))   # /button/... events
+            asyncio.create_task(self.motion.run(self.router.dispatch))   # /motion/... while a game wants them
             await asyncio.sleep(1)
             first_game = self.tool.first_game
             self.start_game(first_game)
@@ -42,6 +42,18 @@ I2C_CMD_TEST_GET_VER = 0xE2
 I2C_CMD_GET_DEVICE_UID = 0xF1
 
 
+def _reverse_rows(dst, src, offset):
+    # 64-byte frame at src[offset] into dst[8:72], each 8-byte row back to front
+    for j in range(8):
+        for k in range(7, -1, -1):
+            dst[8 + j * 8 + (7 - k)] = src[j * 8 + k + offset]
+
+try:
+    from utilities.native import reverse_rows   # viper build of _reverse_rows
+except Exception:   # no viper emitter here
+    reverse_rows = _reverse_rows
+
+
 class LEDMATRIX:
     def __init__(self, i2c, base_address=GROVE_TWO_RGB_LED_MATRIX_DEF_I2C_ADDR, offset_address=0):
         self.i2c = i2c
@@ -56,7 +68,7 @@ class LEDMATRIX:
     def _i2c_send_continue_bytes(self, address: int, data):
         """Send multiple bytes starting with a continue command."""
         cbytes = I2C_CMD_CONTINUE_DATA
-        self.i2c.writeto(address, bytearray([cbytes] + data))
+        self.i2c.writeto(address, bytearray([cbytes]) + bytearray(data))
 
     def _i2c_send_bytes(self, address, data):
         self.i2c.writeto(address, bytearray(data))
@@ -183,7 +195,8 @@ class LEDMATRIX:
         if frames_number == 0:
             return
         
-        data = [0x0]*72 # intialize an array of zeros 72 long
+        data = bytearray(72) # intialize an array of zeros 72 long
+        frames = buffer if isinstance(buffer, (bytes, bytearray)) else bytearray(buffer)
         data[0] = I2C_CMD_DISP_CUSTOM
         data[1] = 0x0
         data[2] = 0x0
@@ -195,9 +208,7 @@ class LEDMATRIX:
             
             # Fill the frame data (reverse byte order for each 8x8 block if necessary)
             """This version is for 64 bit integer buffer"""
-            for j in range(8):
-                for k in range(7, -1, -1):
-                    data[8 + j * 8 + (7 - k)] = buffer[j * 8 + k + i * 64]
+            reverse_rows(data, frames, i * 64)
             
 #             """This version is for 8 bit integer buffer"""
 #             for j in range(64):
@@ -4,6 +4,10 @@ import utilities.utilities as utilities
 import utilities.lights as lights
 import utilities.now as now
 import utilities.i2c_bus as i2c_bus
+import utilities.router as router
+import utilities.timesync as timesync
+import utilities.melody as melody
+import utilities.motion as motion
 from utilities.colors import *
 
 from games.sound import Notes
@@ -25,22 +29,25 @@ class SimplePlushie:
         self.lights.all_off()
         
         self.accel = i2c_bus.LIS2DW12()
+        self.motion = motion.Motion(self.accel)
         self.button = utilities.Button()
         self.buzzer = utilities.Buzzer()
         self.battery = i2c_bus.Battery()
         self.buzzer.stop()
+        self.melody = melody.Sequencer(self.buzzer, timesync.ClockSync())
         
         self.hibernate = utilities.Hibernate()
         
         self.hidden_gem = None
         self.rssi = None
-        self.topic = None
-        self.msg = None
+        self.router = router.Router()
         
 plush = SimplePlushie()
 
 async def main(code):
     plush.running = True
+    asyncio.create_task(plush.button.run(plush.router.dispatch))
+    asyncio.create_task(plush.motion.run(plush.router.dispatch))
     task = asyncio.create_task(code.run())
     for i in range(400):
         print('@',end='')
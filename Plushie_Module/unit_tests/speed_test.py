@@ -0,0 +1,90 @@
+import time
+import struct
+
+import utilities.lights as lights
+import utilities.lc709203f as lc709203f
+
+# Times the Python and viper versions of the hot loops in utilities/native.py
+# (and the struct unpack that replaced LIS2DW12.read_raw's shifts), checks
+# they agree, and prints the speedup. Run it on the module itself - viper
+# only exists there. Copy not_used/ledmatrix.py alongside to time it too.
+
+RUNS = 1000
+
+try:
+    import utilities.native as native
+except Exception as e:
+    native = None
+    print(f'no viper here ({e}) - timing the Python versions only')
+
+try:
+    import ledmatrix
+except ImportError:
+    ledmatrix = None
+
+def timed(fn, *args):
+    start = time.ticks_us()
+    for _ in range(RUNS):
+        fn(*args)
+    return time.ticks_diff(time.ticks_us(), start) / RUNS
+
+def report(name, slow, fast, *args):
+    before = timed(slow, *args)
+    if fast is None:
+        print(f'{name:12} {before:8.1f} us')
+        return
+    after = timed(fast, *args)
+    print(f'{name:12} {before:8.1f} us -> {after:8.1f} us   x{before / max(after, 0.001):.1f}')
+
+def same(name, slow, fast, make, *args):
+    # runs both on fresh buffers from make() and compares what they leave behind
+    if fast is None:
+        return
+    a, b = make(), make()
+    ra, rb = slow(a, *args), fast(b, *args)
+    if a != b or ra != rb:
+        print(f'{name}: the two versions disagree')
+
+def per_pixel(buf, color, count):
+    # what Lights.all_on did before: scale the color and set it, for every pixel
+    for i in range(count):
+        pixel = [int(c*0.1) for c in color]
+        for j in range(3):
+            buf[i * 3 + (1, 0, 2)[j]] = pixel[j]
+
+def shifts(data):
+    # what LIS2DW12.read_raw did before
+    x = data[0] | (data[1] << 8)
+    y = data[2] | (data[3] << 8)
+    z = data[4] | (data[5] << 8)
+    if x >= 0x8000: x -= 0x10000
+    if y >= 0x8000: y -= 0x10000
+    if z >= 0x8000: z -= 0x10000
+    return (x, y, z)
+
+def unpack(data):
+    return struct.unpack('<hhh', data)
+
+def speed_test():
+    leds = 12
+    pixel = bytes((25, 0, 12))
+    report('pixels (old)', per_pixel, None, bytearray(3 * leds), (255, 0, 128), leds)
+    report('fill', lights._fill, native and native.fill, bytearray(3 * leds), pixel, leds)
+    same('fill', lights._fill, native and native.fill, lambda: bytearray(3 * leds), pixel, leds)
+
+    message = bytes((0x16, 0x09, 0x17, 0x34, 0x12))
+    report('crc8', lc709203f._crc8, native and native.crc8, message)
+    same('crc8', lc709203f._crc8, native and native.crc8, lambda: message)
+
+    sample = bytes((0x10, 0x40, 0xF0, 0xFF, 0x00, 0x80))
+    report('read_raw', shifts, unpack, sample)
+    if shifts(sample) != unpack(sample):
+        print('read_raw: the two versions disagree')
+
+    if ledmatrix:
+        frames = bytes(range(64)) * 5
+        fast = native and native.reverse_rows
+        report('frames', ledmatrix._reverse_rows, fast, bytearray(72), frames, 4 * 64)
+        same('frames', ledmatrix._reverse_rows, fast, lambda: bytearray(72), frames, 4 * 64)
+
+speed_test()
@@ -1,4 +1,5 @@
 #accel.py
+import struct
 from machine import Pin, SoftI2C
 from time import sleep_ms, ticks_ms, ticks_diff
 from micropython import const
@@ -13,13 +14,22 @@ _CTRL2 = const(0x21)
 _CTRL6 = const(0x25)
 _STATUS = const(0x27)
 _OUT_X_L = const(0x28)
+_FIFO_CTRL = const(0x2E)
+_FIFO_SAMPLES = const(0x2F)
 
 _DEVICE_ID = const(0x44)
 
+ODR_200_HZ = const(0b0110)
 ODR_400_HZ = const(0b0111)
 MODE_HIGH_PERFORMANCE = const(0b01)
 RANGE_2G = const(0b00)
 
+FIFO_BYPASS = const(0b000)
+FIFO_CONTINUOUS = const(0b110)    # keeps the newest 32 samples
+FIFO_DEPTH = const(32)
+FIFO_COUNT = const(0x3F)          # FIFO_SAMPLES bits - unread samples
+FIFO_OVERRUN = const(0x40)        # ... and samples were lost since the last read
+
 SCL = 23
 SDA = 22
 ADDRESS = 0x19
@@ -45,6 +55,8 @@ class LIS2DW12:
         self.i2c = SoftI2C(scl=Pin(SCL), sda=Pin(SDA))
         self.address = ADDRESS
         self._scale = 2
+        self._status = bytearray(1)
+        self._raw = bytearray(6)
         
         if self.who_am_i() != _DEVICE_ID:
             raise RuntimeError("Failed to find LIS2DW12")
@@ -89,16 +101,24 @@ class LIS2DW12:
         status = self._read_register(_STATUS)[0]
         return bool(status & 0x01)
     
+    # FIFO - used by utilities/motion.py. While it runs, read_raw and
+    # read_accel take samples out of it: subscribe to /motion/... instead.
+    def set_fifo(self, mode, threshold = 0):
+        self._write_register(_FIFO_CTRL, (mode << 5) | (threshold & 0x1F))
+
+    def fifo_samples(self):
+        # unread samples | FIFO_OVERRUN
+        self.i2c.readfrom_mem_into(self.address, _FIFO_SAMPLES, self._status)
+        return self._status[0]
+
+    def read_fifo(self, samples, n):
+        # pops n samples into array('h') samples as raw x, y, z - one burst read, no allocation
+        self.i2c.readfrom_mem_into(self.address, _OUT_X_L, memoryview(samples)[:3 * n])
+
     def read_raw(self):
-        data = self._read_register(_OUT_X_L, 6)
-        
-        x = data[0] | (data[1] << 8)
-        y = data[2] | (data[3] << 8)
-        z = data[4] | (data[5] << 8)
-        if x >= 0x8000: x -= 0x10000
-        if y >= 0x8000: y -= 0x10000
-        if z >= 0x8000: z -= 0x10000
-        return (x, y, z)
+        # x, y, z as little-endian int16s - struct unpacks them in C
+        self.i2c.readfrom_mem_into(self.address, _OUT_X_L, self._raw)
+        return struct.unpack('<hhh', self._raw)
     
     def read_accel(self):
         x, y, z = self.read_raw()
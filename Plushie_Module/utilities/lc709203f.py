@@ -22,6 +22,25 @@ LC709203F_CMD_ALARMPERCENT = 0x13
 LC709203F_CMD_ALARMVOLTAGE = 0x14
 
 
+def _crc8(data):
+    """8-bit CRC algorithm for checking data"""
+    crc = 0x00
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x80:
+                crc = (crc << 1) ^ 0x07
+            else:
+                crc <<= 1
+            crc &= 0xFF
+    return crc
+
+try:
+    from utilities.native import crc8   # viper build of _crc8
+except Exception:   # no viper emitter here
+    crc8 = _crc8
+
+
 class PowerMode:
     OPERATE = 0x0001
     SLEEP = 0x0002
@@ -85,16 +104,7 @@ class LC709203F:
 
     def _generate_crc(self, data):
         """8-bit CRC algorithm for checking data"""
-        crc = 0x00
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = (crc << 1) ^ 0x07
-                else:
-                    crc <<= 1
-                crc &= 0xFF
-        return crc
+        return crc8(data)
 
     def _read_word(self, command):
         """Read a 16-bit word using proper I2C protocol with repeated start"""
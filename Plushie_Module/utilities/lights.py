@@ -2,11 +2,21 @@ import neopixel
 from machine import Pin
 import asyncio
 
+import utilities.metrics as metrics
 
 LED_PIN = 20
 
 from utilities.colors import *
 
+def _fill(buf, pixel, count):
+    count = min(count, len(buf) // len(pixel))
+    buf[:count * len(pixel)] = pixel * count
+
+try:
+    from utilities.native import fill   # viper build of _fill - no allocation
+except Exception:   # no viper emitter here
+    fill = _fill
+
 class Lights:
     def __init__(self, num_of_leds = 12):
         self.NUM_LED = num_of_leds
@@ -14,35 +24,51 @@ class Lights:
         self.color = RED
         self.intensity = 1
         self.last_pattern = [0]*self.NUM_LED
+        self.raw = bytearray(self.np.bpp)       # one pixel in the strip's byte order, for fill()
+        self.dark = bytes(self.np.bpp)
+        self.black = tuple(OFF)
         
-        
+    def write(self):
+        self.np.write()
+        metrics.registry.np_writes += 1
+
     def defaults(self, color = None, intensity = None):
         color = color if color else self.color
         intensity = intensity  if intensity else self.intensity
         return color, intensity
 
 
+    def scale(self, color, intensity):
+        # the color at this intensity - worked out once per call, not per pixel
+        pixel = tuple(int(c*intensity) for c in color)
+        order = self.np.ORDER
+        for j in range(len(pixel)):
+            self.raw[order[j]] = pixel[j]
+        return pixel
+
     def on(self, num, color = None, intensity = None):
         color, intensity = self.defaults(color, intensity)
         if num < self.NUM_LED:
-            self.np[num] = [int(c*intensity) for c in color]
+            self.np[num] = self.scale(color, intensity)
             self.last_pattern[num] = self.np[num]
-            self.np.write()
+            self.write()
             
     def all_on(self, color = None, intensity = None, number = None ):
         if number is None:
             number = self.NUM_LED
         color, intensity = self.defaults(color, intensity)
+        number = min(number, self.NUM_LED)
+        pixel = self.scale(color, intensity)
+        fill(self.np.buf, self.raw, number)
         for i in range(number):
-            self.np[i] = [int(c*intensity) for c in color]
-            self.last_pattern[i] = self.np[i]
-        self.np.write()
+            self.last_pattern[i] = pixel
+        self.write()
         
     def array_on(self, colors = []):
         for i,color in enumerate(colors):
             self.np[i] = color
             self.last_pattern[i] = self.np[i]
-        self.np.write()
+        self.write()
         
     def off(self, num):
         self.on(num, [0,0,0])
@@ -50,10 +76,11 @@ class Lights:
     def all_off(self, number = None):
         if number is None:
             number = self.NUM_LED
+        number = min(number, self.NUM_LED)
+        fill(self.np.buf, self.dark, number)
         for i in range(number):
-            self.np[i] = OFF
-            self.last_pattern[i] = self.np[i]
-        self.np.write()
+            self.last_pattern[i] = self.black
+        self.write()
         
     async def animate(self, color = None, intensity = None, number = None, repeat= 1, timeout = 1.0, speed = 0.1):
         if number is None:
@@ -72,8 +99,11 @@ class Lights:
 
     def show_number(self, number, color = None, intensity = None):
         color, intensity = self.defaults(color, intensity)
+        fill(self.np.buf, self.dark, self.NUM_LED)
         for i in range(self.NUM_LED):
-            self.np[i] = [int(c*intensity) for c in color] if (i == number) else OFF
-            self.last_pattern[i] = self.np[i]
-        self.np.write()
+            self.last_pattern[i] = self.black
+        if 0 <= number < self.NUM_LED:
+            self.np[number] = self.scale(color, intensity)
+            self.last_pattern[number] = self.np[number]
+        self.write()
 
@@ -0,0 +1,97 @@
+import time
+from array import array
+from machine import Timer
+
+TICK_MS = 5         # sequencer step - note changes and volume ramps land on this grid
+TIMER_ID = 0        # hardware timer the sequencer runs on
+STRIDE = 4          # values per note in a compiled melody
+
+# A melody is a flat array('H') of notes: frequency (Hz, 0 = rest), ms,
+# volume at the start and volume at the end of the note (percent of the
+# buzzer's volume, ramped in between). notes() builds one from tuples.
+# The sequencer steps through it from a timer callback against an absolute
+# start time, so the rhythm does not drift and the game loop does nothing.
+# Modules given the same hub time 'at' start together - chords across
+# plushies are each module playing its own note from the same 'at'.
+
+def notes(melody):
+    # [(freq, ms), (freq, ms, volume), (freq, ms, volume, end volume), ...]
+    out = array('H')
+    for note in melody:
+        volume = note[2] if len(note) > 2 else 100
+        out.append(note[0])
+        out.append(note[1])
+        out.append(volume)
+        out.append(note[3] if len(note) > 3 else volume)
+    return out
+
+class Sequencer:
+    def __init__(self, buzzer, clock):
+        self.buzzer = buzzer
+        self.clock = clock
+        self.timer = Timer(TIMER_ID)
+        self.tick = self._tick     # bound once, so arming the timer allocates nothing
+        self.melody = None
+        self.playing = False
+        self.start_ms = 0       # local ticks_ms of the first note
+        self.index = 0          # offset of the current note in melody
+        self.begin = 0          # ms from start_ms to the current note
+        self.end = 0            # ms from start_ms to the end of the current note
+        self.passes = 0         # passes left after this one (-1 = forever)
+        self.full = 0           # buzzer duty at 100 %
+
+    def start(self, melody, at = None, repeat = 1):
+        # at: hub ticks_ms to start on (default, or over one melody ago: now); repeat 0 = until stop()
+        self.stop()
+        if not melody:
+            return
+        self.melody = melody
+        now = time.ticks_ms()
+        self.start_ms = now
+        if at is not None and self.clock.synced:
+            start = self.clock.to_local(at)
+            # joining part way is fine, but an 'at' from long ago would skip the whole melody
+            length = 0
+            for i in range(1, len(melody), STRIDE):    # MicroPython arrays only slice with step 1
+                length += melody[i]
+            if time.ticks_diff(now, start) <= length:
+                self.start_ms = start
+        self.index = 0
+        self.begin = 0
+        self.end = melody[1]
+        self.passes = repeat - 1 if repeat else -1
+        self.full = int(self.buzzer.volume * 1000)
+        self.playing = True
+        self.timer.init(mode = Timer.PERIODIC, period = TICK_MS, callback = self.tick)
+
+    def stop(self):
+        if self.playing:
+            self.timer.deinit()
+            self.playing = False
+            self.buzzer.stop()
+
+    def _tick(self, timer):
+        t = time.ticks_diff(time.ticks_ms(), self.start_ms)
+        if t < 0:
+            return      # waiting for the synced start
+        melody = self.melody
+        i = self.index
+        while t >= self.end:
+            i += STRIDE
+            if i >= len(melody):
+                if not self.passes:
+                    self.stop()
+                    return
+                if self.passes > 0:
+                    self.passes -= 1
+                i = 0
+            self.begin = self.end
+            self.end += melody[i + 1]
+        self.index = i
+        freq = melody[i]
+        if not freq:
+            self.buzzer.sound(0, 0)
+            return
+        v0 = melody[i + 2]
+        level = v0 + (melody[i + 3] - v0) * (t - self.begin) // max(1, self.end - self.begin)
+        self.buzzer.sound(freq, self.full * level // 100)
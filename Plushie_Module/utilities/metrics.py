@@ -0,0 +1,76 @@
+import gc
+import time
+import asyncio
+
+JITTER_BUCKETS = (1, 2, 5, 10, 20, 50, 100)   # ms late - the last bucket holds anything later
+PUBLISH_S = 30      # /stats/<name> period
+
+class Metrics:
+    # Cheap counters for the running module. There is one shared registry below,
+    # so after Ctrl-C the REPL can still read it:
+    #   >>> import utilities.metrics as metrics
+    #   >>> metrics.registry.report()
+    def __init__(self):
+        self.jitter = [0] * (len(JITTER_BUCKETS) + 1)   # game loop ticks by ms late
+        self.queue_max = 0      # deepest the receive queue got
+        self.queue_drops = 0    # messages pushed out of a full queue
+        self.messages = 0       # messages processed
+        self.latency_sum = 0    # ms from receive to done, summed over messages
+        self.latency_max = 0
+        self.np_writes = 0      # neopixel writes (see Lights.write)
+        self.mem_free_min = gc.mem_free()
+        self.last_writes = 0
+        self.last_time = time.ticks_ms()
+
+    def tick(self, late_ms):
+        # a game loop iteration finished late_ms after it was due
+        for i, limit in enumerate(JITTER_BUCKETS):
+            if late_ms < limit:
+                self.jitter[i] += 1
+                return
+        self.jitter[-1] += 1
+
+    def queued(self, depth, dropped = False):
+        if depth > self.queue_max:
+            self.queue_max = depth
+        if dropped:
+            self.queue_drops += 1
+
+    def processed(self, received):
+        latency = time.ticks_diff(time.ticks_ms(), received)
+        self.messages += 1
+        self.latency_sum += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+
+    def snapshot(self):
+        # short keys - it has to fit in one ESP-NOW packet
+        now = time.ticks_ms()
+        elapsed = max(1, time.ticks_diff(now, self.last_time))
+        writes = (self.np_writes - self.last_writes) * 1000 // elapsed
+        self.last_writes = self.np_writes
+        self.last_time = now
+        free = gc.mem_free()
+        self.mem_free_min = min(self.mem_free_min, free)
+        return {'j': self.jitter, 'q': self.queue_max, 'd': self.queue_drops,
+                'n': self.messages, 'l': self.latency_sum // max(1, self.messages),
+                'L': self.latency_max, 'w': writes, 'm': free, 'M': self.mem_free_min}
+
+    def report(self):
+        s = self.snapshot()
+        print('loop jitter (ms late):', ', '.join(f'<{b}: {n}' for b, n in zip(JITTER_BUCKETS, s['j'])), f'more: {s["j"][-1]}')
+        print(f'queue max {s["q"]}, drops {s["d"]}')
+        print(f'messages {s["n"]}, latency avg {s["l"]} ms, max {s["L"]} ms')
+        print(f'np.write {s["w"]}/s')
+        print(f'free heap {s["m"]} (min {s["M"]})')
+
+    async def run(self, publish, name, period = PUBLISH_S):
+        # low-rate publish on /stats/<name> - main.py passes Tool.uplink, so it goes to the hub
+        while True:
+            await asyncio.sleep(period)
+            try:
+                publish(f'/stats/{name}', self.snapshot())
+            except Exception as e:
+                print('stats error', e)
+
+registry = Metrics()
@@ -0,0 +1,175 @@
+import time
+import asyncio
+from array import array
+
+import utilities.i2c_bus as i2c_bus
+
+TOPIC = '/motion/'      # games subscribing under this keep the engine running
+TICK_MS = 50            # how often the FIFO is emptied and features published
+RATE_HZ = 200           # accelerometer rate while running - the FIFO holds 160 ms of it
+ONE_G = 1000            # features are in mg
+FREEFALL_MG = 300       # |a| under this is falling
+JUMP_MIN_MS = 40        # shorter falls are bumps, not jumps
+STEP_MG = 1300          # an |a| peak over this is a step ...
+STEP_REARM_MG = 1100    # ... once |a| has dropped back under this since the last one
+STEP_GAP_MS = 250       # fastest steps counted
+ORIENT_MG = 700         # an axis averaging this much of 1 g points up (or down)
+STILL_MG = 250          # orientation only changes while energy is under this
+
+# Reads the accelerometer FIFO once per tick and works out, with integer
+# math over the batch, the features every game would otherwise compute for
+# itself from single read_accel() samples. Each tick publishes through the
+# router (info is (None, None, None, ticks_ms of the sample)):
+#   /motion/features     the engine - read energy, peak, jerk, freefall, up, steps, jumps
+#   /motion/orientation  up ('x+', 'x-', 'y+', 'y-', 'z+' or 'z-') when it changes
+#   /motion/jump         ms in the air, on landing from a free fall of JUMP_MIN_MS or more
+#   /motion/step         steps so far
+# It only runs while a game is subscribed under TOPIC (Game.subscribe calls use()).
+
+def isqrt(n, guess = ONE_G):
+    # Newton's method from a nearby guess - consecutive samples are close, so a step or two
+    if n <= 0:
+        return 0
+    x = (guess + n // guess) >> 1 if guess > 0 else n   # never below the root
+    while True:
+        y = (x + n // x) >> 1
+        if y >= x:
+            return x
+        x = y
+
+def orientation(x, y, z, current):
+    if x > ORIENT_MG: return 'x+'
+    if x < -ORIENT_MG: return 'x-'
+    if y > ORIENT_MG: return 'y+'
+    if y < -ORIENT_MG: return 'y-'
+    if z > ORIENT_MG: return 'z+'
+    if z < -ORIENT_MG: return 'z-'
+    return current      # moving too much to tell - keep the last one
+
+class Motion:
+    def __init__(self, accel):
+        self.accel = accel
+        self.samples = array('h', [0] * (3 * i2c_bus.FIFO_DEPTH))   # raw x, y, z - read_fifo fills it
+        self.users = 0
+        self.wake = asyncio.Event()
+        self.overruns = 0       # ticks that came too late to get every sample
+        self.reset()
+
+    def reset(self):
+        self.energy = 0         # mg - RMS of |a| - 1 g over the last tick
+        self.peak = 0           # mg - largest |a| - 1 g in the last tick
+        self.jerk = 0           # g/s - largest change between samples in the last tick
+        self.freefall = 0       # ms the current fall has lasted (0 when not falling)
+        self.up = None          # see orientation()
+        self.steps = 0
+        self.jumps = 0
+        self.x = self.y = self.z = 0    # last sample, mg
+        self.mag = ONE_G        # |a| of the last sample, mg - seeds isqrt
+        self.falling = 0        # samples in the current fall
+        self.armed = True       # a step can count
+        self.since_step = 0     # samples since the last step
+
+    def use(self):
+        self.users += 1
+        self.wake.set()
+
+    def release(self):
+        self.users = max(0, self.users - 1)
+
+    def start(self):
+        self.reset()
+        self.scale = self.accel._scale * ONE_G     # mg = raw * scale >> 15
+        self.accel.set_odr(i2c_bus.ODR_200_HZ)
+        self.accel.set_fifo(i2c_bus.FIFO_CONTINUOUS)
+
+    def stop(self):
+        self.accel.set_fifo(i2c_bus.FIFO_BYPASS)
+        self.accel.set_odr(i2c_bus.ODR_400_HZ)
+
+    async def run(self, emit):
+        while True:
+            self.wake.clear()
+            if not self.users:
+                await self.wake.wait()
+            self.start()
+            try:
+                while self.users:
+                    await asyncio.sleep_ms(TICK_MS)
+                    status = self.accel.fifo_samples()
+                    if status & i2c_bus.FIFO_OVERRUN:
+                        self.overruns += 1
+                    n = min(status & i2c_bus.FIFO_COUNT, i2c_bus.FIFO_DEPTH)
+                    if n:
+                        self.accel.read_fifo(self.samples, n)
+                        await self.update(n, emit)
+            finally:
+                self.stop()
+
+    async def update(self, n, emit):
+        s = self.samples
+        k = self.scale
+        x0, y0, z0, mag = self.x, self.y, self.z, self.mag
+        falling, armed, since_step = self.falling, self.armed, self.since_step
+        gap = STEP_GAP_MS * RATE_HZ // 1000
+        sx = sy = sz = 0
+        squares = 0
+        peak = 0
+        jerk = 0
+        steps = 0
+        landed = -1     # sample of the last landing this tick
+        airtime = 0
+        for i in range(0, 3 * n, 3):
+            x = s[i] * k >> 15
+            y = s[i + 1] * k >> 15
+            z = s[i + 2] * k >> 15
+            sx += x
+            sy += y
+            sz += z
+            d = abs(x - x0) + abs(y - y0) + abs(z - z0)
+            if d > jerk:
+                jerk = d
+            x0, y0, z0 = x, y, z
+            mag = isqrt(x * x + y * y + z * z, mag)
+            d = mag - ONE_G
+            squares += d * d
+            if d > peak:
+                peak = d
+            if mag < FREEFALL_MG:
+                falling += 1
+            elif falling:
+                ms = falling * 1000 // RATE_HZ
+                if ms >= JUMP_MIN_MS:
+                    landed, airtime = i // 3, ms
+                falling = 0
+            since_step += 1
+            if mag > STEP_MG:
+                if armed and since_step >= gap:
+                    steps += 1
+                    since_step = 0
+                armed = False
+            elif mag < STEP_REARM_MG:
+                armed = True
+        self.x, self.y, self.z, self.mag = x0, y0, z0, mag
+        self.falling, self.armed, self.since_step = falling, armed, since_step
+
+        self.energy = isqrt(squares // n, self.energy)
+        self.peak = peak
+        self.jerk = jerk * RATE_HZ // ONE_G
+        self.freefall = falling * 1000 // RATE_HZ
+        up = self.up
+        if self.energy < STILL_MG:
+            up = orientation(sx // n, sy // n, sz // n, up)
+
+        now = time.ticks_ms()
+        info = (None, None, None, now)
+        await emit('/motion/features', self, info)
+        if up != self.up:
+            self.up = up
+            await emit('/motion/orientation', up, info)
+        if landed >= 0:
+            self.jumps += 1
+            at = time.ticks_add(now, -(n - 1 - landed) * 1000 // RATE_HZ)
+            await emit('/motion/jump', airtime, (None, None, None, at))
+        if steps:
+            self.steps += steps
+            await emit('/motion/step', self.steps, info)
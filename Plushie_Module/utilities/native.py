@@ -0,0 +1,55 @@
+# Viper builds of the byte loops that run often enough to matter. Each caller
+# keeps its plain Python version and swaps in the one from here at import:
+#     try:
+#         from utilities.native import crc8
+#     except Exception:   # no viper emitter - the emulator, or another port
+#         crc8 = _crc8
+# Viper arguments are machine ints and raw pointers into objects with the
+# buffer protocol (bytes, bytearray, array), so these never allocate and
+# check their own bounds. unit_tests/speed_test.py times both versions.
+# Keep in step with App_Web/webapp/hubCode/utilities/native.py
+import micropython
+
+@micropython.viper
+def fill(buf, pixel, count: int):
+    # pixel (its bytes in the strip's order) into the first count pixels of a NeoPixel buf
+    dst = ptr8(buf)
+    src = ptr8(pixel)
+    bpp = int(len(pixel))
+    n = count * bpp
+    size = int(len(buf))
+    if n > size:
+        n = size
+    i = 0
+    while i < n:
+        j = 0
+        while j < bpp:
+            dst[i + j] = src[j]
+            j += 1
+        i += bpp
+
+@micropython.viper
+def crc8(data) -> int:
+    # CRC-8, polynomial 0x07 (the LC709203F's)
+    p = ptr8(data)
+    n = int(len(data))
+    crc = 0
+    for i in range(n):
+        crc ^= p[i]
+        for bit in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ 0x07) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+    return crc
+
+@micropython.viper
+def reverse_rows(dst, src, offset: int):
+    # 64-byte frame at src[offset] into dst[8:72], each 8-byte row back to front (ledmatrix)
+    if offset < 0 or offset + 64 > int(len(src)) or int(len(dst)) < 72:
+        raise IndexError
+    d = ptr8(dst)
+    s = ptr8(src)
+    for row in range(0, 64, 8):
+        for k in range(8):
+            d[15 + row - k] = s[offset + row + k]
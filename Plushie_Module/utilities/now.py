@@ -4,6 +4,47 @@ import espnow
 import time
 
 
+def mac_hash(mac, salt = 0):
+    # 32-bit FNV-1a over the mac address and a 16-bit salt
+    h = 0x811c9dc5
+    for b in bytes(mac) + bytes((salt >> 8 & 0xff, salt & 0xff)):
+        h = ((h ^ b) * 0x01000193) & 0xffffffff
+    return h
+
+
+class Dedupe():
+    # per-sender sliding window of recently seen 16-bit sequence numbers
+    def __init__(self, window = 32):
+        self.window = window
+        self.mask = (1 << window) - 1
+        self.senders = {}   # mac -> [highest seq, bitmap of seq, seq-1, ...]
+
+    def seen(self, mac, seq):
+        if seq is None:
+            return False    # sender does not number its packets
+        state = self.senders.get(mac)
+        if state is None:
+            self.senders[mac] = [seq, 1]
+            return False
+        top, bits = state
+        ahead = (seq - top) & 0xffff
+        if ahead == 0:
+            return True
+        if ahead < 0x8000:    # newer than anything so far - slide the window
+            state[0] = seq
+            state[1] = ((bits << ahead) | 1) & self.mask if ahead < self.window else 1
+            return False
+        back = 0x10000 - ahead
+        if back >= self.window:    # far behind - the sender restarted its count
+            state[0] = seq
+            state[1] = 1
+            return False
+        if bits >> back & 1:
+            return True
+        state[1] = bits | (1 << back)
+        return False
+
+
 class Now():
     def __init__(self, antenna, callback = None):
         self.connected= False
@@ -32,11 +73,13 @@ class Now():
     def irq_receive(self, remote_network):
         try:
             mac, msg = remote_network.irecv()
+            if mac is None:
+                return
             rssi = remote_network.peers_table
             #if mac != None and mac not in self.peers: #check if the peer has already been added
             #    self.peers.append(mac)
             #    self.now_network.add_peer(mac)
-            self.callback(msg, mac, rssi)
+            self.callback(bytes(msg), bytes(mac), rssi)   # irecv reuses its buffers - copy before they are queued
         except Exception as e:
             print(f"Receive Error: {e}")
 
@@ -53,10 +96,18 @@ class Now():
         self.connected = True
 
     def publish(self, msg, mac = None):
+        # broadcast, or unicast to mac - returns True if it was acked (always for a broadcast)
         if not mac:
             mac = self.everyone
+        elif mac not in self.peers:    # unicast needs the peer registered first
+            try:
+                self.now_network.add_peer(mac)
+            except OSError:
+                pass    # already registered
+            self.peers.append(mac)
         if self.connected:
-            self.now_network.send(mac, msg)
+            return self.now_network.send(mac, msg)
+        return False
 
     def close(self):
         self.now_network.irq(None)
@@ -0,0 +1,141 @@
+import os
+import json
+import struct
+import random
+import asyncio
+import ubinascii
+
+# Binary OTA packets - the first byte tells them apart from the JSON messages.
+# Keep in step with App_Web/webapp/hubCode/utilities/ota.py
+MAGIC = 0xA7
+OFFER, DATA, NACK, COMMIT = 0, 1, 2, 3
+OFFER_FMT = '<BBHBIHIHH'   # magic, kind, bundle, file, size, chunks, crc, slots, slot_ms + path
+DATA_FMT = '<BBHBHI'       # magic, kind, bundle, file, index, crc + chunk
+NACK_FMT = '<BBHB'         # magic, kind, bundle, file + bitmap of missing chunks
+COMMIT_FMT = '<BBHBB'      # magic, kind, bundle, files, reset
+
+CHUNK_SIZE = 200
+PENDING = 'ota_pending.json'   # files waiting to be activated at the next boot - boot.py does it
+PART = '.part'
+
+def is_ota(msg):
+    return len(msg) > 4 and msg[0] == MAGIC
+
+def _makedirs(path):
+    parts = path.split('/')[:-1]
+    for i in range(len(parts)):
+        try:
+            os.mkdir('/'.join(parts[:i + 1]))
+        except OSError:
+            pass    # already there
+
+class Receiver:
+    # Collects one file at a time into <path>.part, tracking received chunks in a bitmap
+    def __init__(self, publish, log = print):
+        self.publish = publish
+        self.log = log
+        self.key = None         # (bundle, file) being received
+        self.file = None
+        self.bitmap = None      # bit set = chunk still missing
+        self.done = {}          # bundle -> {file index: path} verified and ready
+
+    def handle(self, msg):
+        kind = msg[1]
+        if kind == OFFER:
+            self.offer(msg)
+        elif kind == DATA:
+            self.data(msg)
+        elif kind == COMMIT:
+            return self.commit(msg)
+
+    def offer(self, msg):
+        magic, kind, bundle, file, size, chunks, crc, slots, slot_ms = struct.unpack_from(OFFER_FMT, msg)
+        key = (bundle, file)
+        finished = file in self.done.get(bundle, {})
+        if key != self.key and not finished:
+            self.start(key, msg[struct.calcsize(OFFER_FMT):].decode(), size, chunks, crc)
+        if slots:
+            # poll: tell the hub what is missing, in a random slot so replies spread out
+            if finished:
+                bitmap = b''
+            else:
+                bitmap = bytes(self.bitmap)
+            reply = struct.pack(NACK_FMT, MAGIC, NACK, bundle, file) + bitmap
+            asyncio.create_task(self.reply(reply, random.getrandbits(8) % slots * slot_ms))
+
+    async def reply(self, msg, delay):
+        await asyncio.sleep_ms(delay)
+        self.publish(msg)
+
+    def start(self, key, path, size, chunks, crc):
+        self.close()
+        self.key = key
+        self.path = path
+        self.size = size
+        self.crc = crc
+        self.left = chunks
+        self.bitmap = bytearray((chunks + 7) // 8)
+        for i in range(chunks):
+            self.bitmap[i // 8] |= 1 << (i % 8)
+        _makedirs(path)
+        with open(path + PART, 'wb') as f:    # full size up front; chunks are written in place
+            blank = bytes(CHUNK_SIZE)
+            for i in range(chunks - 1):
+                f.write(blank)
+            f.write(bytes(size - (chunks - 1) * CHUNK_SIZE if chunks else 0))
+        self.file = open(path + PART, 'r+b')
+        self.log(f'ota receiving {path} ({chunks} chunks)')
+
+    def data(self, msg):
+        magic, kind, bundle, file, index, crc = struct.unpack_from(DATA_FMT, msg)
+        if (bundle, file) != self.key or not self.file:
+            return
+        if not self.bitmap[index // 8] & (1 << (index % 8)):
+            return      # already have it
+        chunk = msg[struct.calcsize(DATA_FMT):]
+        if ubinascii.crc32(chunk) != crc:
+            return      # corrupted - the next NACK asks for it again
+        self.file.seek(index * CHUNK_SIZE)
+        self.file.write(chunk)
+        self.bitmap[index // 8] &= ~(1 << (index % 8))
+        self.left -= 1
+        if not self.left:
+            self.verify()
+
+    def verify(self):
+        self.close()
+        crc = 0
+        with open(self.path + PART, 'rb') as f:
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                crc = ubinascii.crc32(data, crc)
+        bundle, file = self.key
+        if crc == self.crc and os.stat(self.path + PART)[6] == self.size:
+            self.done.setdefault(bundle, {})[file] = self.path
+            self.log(f'ota verified {self.path}')
+        else:
+            self.log(f'ota crc mismatch {self.path}')
+        self.key = None
+        self.bitmap = None
+
+    def commit(self, msg):
+        # returns True if the module should reset now to use the new files
+        magic, kind, bundle, files, reset = struct.unpack_from(COMMIT_FMT, msg)
+        ready = self.done.pop(bundle, {})
+        if len(ready) != files:
+            if ready:
+                self.log(f'ota incomplete bundle: {len(ready)} of {files} files')
+            return False
+        # written aside and renamed, like the files themselves, so a reset never leaves half a list
+        with open(PENDING + PART, 'w') as f:
+            json.dump([ready[i] for i in range(files)], f)
+        os.rename(PENDING + PART, PENDING)
+        self.log(f'ota bundle ready: {files} files')
+        return bool(reset)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
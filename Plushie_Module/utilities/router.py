@@ -0,0 +1,74 @@
+# Sends each received message to the handlers subscribed to its topic.
+# A topic ending in '/#' subscribes to everything under it: '/battery/#'
+# gets '/battery/box1' but not '/battery'. Exact topics are one dict lookup;
+# prefixes go through a trie of topic levels that is rebuilt when they
+# change, so dispatch only reads. Handler lists are tuples replaced on every
+# change, so a handler can subscribe or unsubscribe while a message is out.
+WILDCARD = '#'
+
+class Router:
+    def __init__(self, log = print):
+        self.log = log
+        self.exact = {}     # topic -> (handler, ...)
+        self.prefixes = {}  # '/battery/' -> (handler, ...)
+        self.trie = {}      # level -> child node; WILDCARD -> handlers under this prefix
+
+    def _table(self, topic):
+        if topic.endswith('/' + WILDCARD):
+            return self.prefixes, topic[:-1]
+        return self.exact, topic
+
+    def subscribe(self, topic, handler):
+        # handler(topic, value, info) - returns None or a coroutine, which is awaited
+        table, key = self._table(topic)
+        table[key] = table.get(key, ()) + (handler,)
+        if table is self.prefixes:
+            self._compile()
+
+    def unsubscribe(self, topic, handler):
+        table, key = self._table(topic)
+        handlers = tuple(h for h in table.get(key, ()) if h != handler)
+        if handlers:
+            table[key] = handlers
+        else:
+            table.pop(key, None)
+        if table is self.prefixes:
+            self._compile()
+
+    def _compile(self):
+        trie = {}
+        for prefix, handlers in self.prefixes.items():
+            node = trie
+            for level in prefix.split('/')[1:-1]:
+                node = node.setdefault(level, {})
+            node[WILDCARD] = handlers
+        self.trie = trie
+
+    async def _call(self, handlers, topic, value, info):
+        for handler in handlers:
+            try:
+                result = handler(topic, value, info)
+                if result is not None:
+                    await result
+            except Exception as e:
+                self.log(f'handler error {topic}: {e}')
+        return len(handlers)
+
+    async def dispatch(self, topic, value, info = None):
+        # each handler whose topic matches runs once; returns how many did
+        count = 0
+        handlers = self.exact.get(topic)
+        if handlers:
+            count += await self._call(handlers, topic, value, info)
+        node = self.trie
+        pos = 1
+        while node:
+            handlers = node.get(WILDCARD)
+            if handlers:
+                count += await self._call(handlers, topic, value, info)
+            end = topic.find('/', pos)
+            if end < 0:
+                break
+            node = node.get(topic[pos:end])
+            pos = end + 1
+        return count
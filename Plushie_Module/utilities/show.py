@@ -0,0 +1,93 @@
+import asyncio
+import time
+import ubinascii
+
+from utilities.colors import *
+from utilities.now import mac_hash
+
+FRAME_MS = 30       # render period while a show runs
+HASH_STEPS = 8      # modules spread over this many offsets in 'hash' mode
+
+# A show program is one small dict the hub broadcasts once:
+#   'k'   keyframes [[color, ms], ...] - fade to color over ms (0 = jump);
+#         color is an index into COLORS or [r, g, b]
+#   'n'   times through the keyframes (0 = until the next show or game)
+#   'i'   intensity (defaults to the module's)
+#   'led' ms delay from one LED to the next on the same module
+#   'dt'  ms delay from one module to the next
+#   'by'  'hash' - order modules by a hash of their mac,
+#         or a list of mac suffixes ('ddeeff') giving each module's position
+# The start time comes from the packet's 'at', on the hub clock.
+
+def _color(c):
+    return COLORS[c % len(COLORS)] if isinstance(c, int) else c
+
+class Show:
+    def __init__(self, lights, clock):
+        self.lights = lights
+        self.clock = clock
+        self.task = None
+
+    def start(self, program, mac, at = None):
+        self.stop()
+        if program.get('k'):
+            self.task = asyncio.create_task(self.play(program, mac, at))
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def offset(self, program, mac):
+        # ms this module lags behind the first one
+        dt = program.get('dt', 0)
+        if not dt:
+            return 0
+        order = program.get('by', 'hash')
+        if isinstance(order, list):
+            me = ubinascii.hexlify(mac[-3:]).decode()
+            if me in order:
+                return order.index(me) * dt
+        return mac_hash(mac) % HASH_STEPS * dt
+
+    def color_at(self, frames, t):
+        # colour t ms into one pass over frames, fading from the previous keyframe
+        prev = frames[-1][0]
+        for color, ms in frames:
+            if t < ms:
+                f = t / ms
+                return [int(a + (b - a) * f) for a, b in zip(prev, color)]
+            t -= ms
+            prev = color
+        return prev
+
+    async def play(self, program, mac, at = None):
+        frames = [(_color(c), ms) for c, ms in program['k']]
+        period = sum(ms for c, ms in frames) or 1
+        repeat = program.get('n', 1)
+        led_ms = program.get('led', 0)
+        intensity = program.get('i', self.lights.intensity)
+        np = self.lights.np
+        if at is None or not self.clock.synced:
+            at = self.clock.now()
+        start = time.ticks_add(at, self.offset(program, mac))
+        end = repeat * period + led_ms * (self.lights.NUM_LED - 1)
+        try:
+            while True:
+                t = time.ticks_diff(self.clock.now(), start)
+                if repeat and t >= end:
+                    break
+                for i in range(self.lights.NUM_LED):
+                    tl = t - i * led_ms
+                    if tl < 0:
+                        color = frames[-1][0]
+                    elif repeat and tl >= repeat * period:
+                        color = frames[-1][0]
+                    else:
+                        color = self.color_at(frames, tl % period)
+                    np[i] = [int(c * intensity) for c in color]
+                self.lights.write()
+                await asyncio.sleep_ms(FRAME_MS)
+        finally:
+            # hand the LEDs back to the game
+            self.lights.array_on(self.lights.last_pattern)
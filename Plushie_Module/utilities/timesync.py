@@ -0,0 +1,58 @@
+import time
+
+ALPHA = 0.3         # how far one beacon pulls the offset estimate
+BETA = 0.05         # how far one beacon pulls the drift estimate
+RESYNC_MS = 100     # an error this big means the hub restarted - start over
+MIN_BEACONS = 3     # beacons before the estimate is trusted
+
+class ClockSync:
+    # Tracks the hub clock from its /time beacons with an alpha-beta filter.
+    # Times are ticks_ms values, so all arithmetic goes through ticks_diff/ticks_add.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.offset = 0.0   # hub ms - local ms at self.last
+        self.drift = 0.0    # change of offset per local ms
+        self.last = None    # local receive time of the last beacon
+        self.count = 0
+
+    @property
+    def synced(self):
+        return self.count >= MIN_BEACONS
+
+    def update(self, hub_ms, local_ms):
+        # hub_ms: beacon timestamp, local_ms: ticks_ms when the packet arrived
+        measured = time.ticks_diff(hub_ms, local_ms)
+        if self.last is None:
+            self.offset = measured
+            self.last = local_ms
+            self.count = 1
+            return
+        dt = time.ticks_diff(local_ms, self.last)
+        if dt <= 0:
+            return      # out of order
+        predicted = self.offset + self.drift * dt
+        error = measured - predicted
+        if abs(error) > RESYNC_MS:
+            self.reset()
+            self.update(hub_ms, local_ms)
+            return
+        self.offset = predicted + ALPHA * error
+        self.drift += BETA * error / dt
+        self.last = local_ms
+        self.count += 1
+
+    def _offset_at(self, local_ms):
+        if self.last is None:
+            return 0
+        return int(self.offset + self.drift * time.ticks_diff(local_ms, self.last))
+
+    def now(self):
+        # current time on the hub clock (local clock until the first beacon)
+        local = time.ticks_ms()
+        return time.ticks_add(local, self._offset_at(local))
+
+    def to_local(self, hub_ms):
+        # local ticks_ms at which the hub clock reads hub_ms (drift over the wait is negligible)
+        return time.ticks_add(hub_ms, -self._offset_at(time.ticks_ms()))
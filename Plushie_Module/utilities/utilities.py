@@ -4,41 +4,138 @@ import micropython
 import esp32
 import time
 import asyncio
+from array import array
 
 BUTTON_PIN = 0
 BUZZER_PIN = 19
 MOTOR_PIN = 21
 
+DEBOUNCE_US = 20000     # edges closer than this are one bouncing edge
+LONG_PRESS_MS = 800     # held this long -> /button/long
+TAP_GAP_MS = 300        # a press within this of the last release continues a multi-tap
+EDGE_RING = 32          # button edges buffered between IRQ and run() (a power of two)
+EDGE_MASK = 0xFFFF      # ring indices count to this and wrap
+
 class Button:
+    # The pin IRQ only stores (level, ticks_us) in a preallocated ring. run()
+    # reads it: an edge counts once the pin has been quiet for DEBOUNCE_US and
+    # is timed from the first edge of its bounce. Each change becomes an
+    # event passed to emit(topic, value, info):
+    #   /button/press    0
+    #   /button/release  ms held
+    #   /button/long     ms held - once per press, while still held
+    #   /button/taps     short presses in a row, once TAP_GAP_MS pass without another
+    # info is (None, None, None, ticks_ms of the edge) - a message from no one.
     def __init__(self, module_type = 'plushie', callback = None):
         self.module_type = module_type
         self.motor = Motor(self.module_type)
         self.pressed = False
-        self.time_of_button_press = 0
-        self.old_pressed_time = 0
-        self.time_of_button_released = 0
-        self.flag = False
-        
+        self.flag = False       # set while main.py switches games - events are dropped
+        self.callback = callback
+        self.emit = None
+
+        self.times = array('L', [0] * EDGE_RING)
+        self.levels = bytearray(EDGE_RING)
+        self.head = 0           # next slot the IRQ writes (counts to EDGE_MASK, wrapping)
+        self.tail = 0           # next slot run() reads
+        self.ready = asyncio.ThreadSafeFlag()
+        self.burst = None       # ticks_us of the first edge of a bounce not yet settled
+        self.last_edge = 0
+        self.last_level = 1     # pin level after the newest edge (pulled up = released)
+        self.down = 0           # ticks_us of the last press and release
+        self.up = 0
+        self.long_sent = False
+        self.taps = 0
 
         self.button = Pin(BUTTON_PIN, Pin.IN, Pin.PULL_UP)
-        self.button.irq(handler=self.update, trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING)       
+        self.button.irq(handler=self.edge, trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, hard=True)
         esp32.wake_on_ext1(pins = (self.button,), level = esp32.WAKEUP_ALL_LOW)
-        self.callback = callback
-        
-    def update(self, p):
-        try:
-            micropython.schedule(self.run_callback, p)
-        except:
-            pass
-    
-    def run_callback(self, p):
-        if self.button.value():
-            self.motor.stop()
+
+    def edge(self, pin):
+        # hard IRQ - no allocation
+        i = self.head & (EDGE_RING - 1)
+        self.times[i] = time.ticks_us()
+        self.levels[i] = pin.value()
+        self.head = (self.head + 1) & EDGE_MASK
+        self.ready.set()
+
+    async def run(self, emit = None):
+        self.emit = emit
+        while True:
+            timeout = self.timeout_ms()
+            if timeout is None:
+                await self.ready.wait()
+            else:
+                try:
+                    await asyncio.wait_for_ms(self.ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self.drain()
+            now = time.ticks_us()
+            if self.burst is not None and time.ticks_diff(now, self.last_edge) >= DEBOUNCE_US:
+                burst, self.burst = self.burst, None
+                await self.settle(self.last_level == 0, burst)
+            await self.check_timers(now)
+
+    def drain(self):
+        if (self.head - self.tail) & EDGE_MASK > EDGE_RING:
+            self.tail = (self.head - EDGE_RING) & EDGE_MASK   # overrun - the oldest were overwritten
+        while self.tail != self.head:
+            i = self.tail & (EDGE_RING - 1)
+            t = self.times[i]
+            if self.burst is None or time.ticks_diff(t, self.last_edge) > DEBOUNCE_US:
+                self.burst = t
+            self.last_edge = t
+            self.last_level = self.levels[i]
+            self.tail = (self.tail + 1) & EDGE_MASK
+
+    def timeout_ms(self):
+        # ms until run() has something to do without a new edge
+        now = time.ticks_us()
+        if self.burst is not None:
+            left = DEBOUNCE_US - time.ticks_diff(now, self.last_edge)
+        elif self.pressed and not self.long_sent:
+            left = LONG_PRESS_MS * 1000 - time.ticks_diff(now, self.down)
+        elif self.taps and not self.pressed:
+            left = TAP_GAP_MS * 1000 - time.ticks_diff(now, self.up)
         else:
+            return None
+        return max(1, left // 1000 + 1)
+
+    async def settle(self, pressed, t):
+        # the pin has been quiet long enough - pressed or not, since t
+        if pressed == self.pressed:
+            return      # a glitch, or a bounce back to where it was
+        self.pressed = pressed
+        if pressed:
             self.motor.start()
-        self.pressed = self.button.value() == 0
-        if self.callback: self.callback
+            self.down = t
+            self.long_sent = False
+            await self.send('/button/press', 0, t)
+        else:
+            self.motor.stop()
+            self.up = t
+            held = time.ticks_diff(t, self.down) // 1000
+            if not self.long_sent:
+                self.taps += 1
+            await self.send('/button/release', held, t)
+        if self.callback:
+            self.callback(pressed)
 
+    async def check_timers(self, now):
+        if self.pressed and not self.long_sent and time.ticks_diff(now, self.down) >= LONG_PRESS_MS * 1000:
+            self.long_sent = True
+            self.taps = 0
+            await self.send('/button/long', time.ticks_diff(now, self.down) // 1000, now)
+        elif self.taps and not self.pressed and time.ticks_diff(now, self.up) >= TAP_GAP_MS * 1000:
+            taps, self.taps = self.taps, 0
+            await self.send('/button/taps', taps, self.up)
+
+    async def send(self, topic, value, t):
+        if self.flag or not self.emit:
+            return
+        at = time.ticks_add(time.ticks_ms(), -(time.ticks_diff(time.ticks_us(), t) // 1000))
+        await self.emit(topic, value, (None, None, None, at))
         
 class Motor:
     def __init__(self, module_type = 'plushie'):
@@ -61,6 +158,7 @@ class Buzzer:
         self.volume = volume
         self.buzzer = PWM(Pin(BUZZER_PIN))
         self.freq = 0
+        self.level = 0
         self.buzzer.duty(0)
         
     def play(self, frequency):
@@ -71,8 +169,21 @@ class Buzzer:
 
     def stop(self):
         self.freq = 0
+        self.level = 0
         self.buzzer.duty(0)
 
+    def sound(self, frequency, duty):
+        # raw frequency and duty for utilities/melody.py - only writes what changed
+        if not duty:
+            if self.freq: self.stop()
+            return
+        if frequency != self.freq:
+            self.freq = frequency
+            self.buzzer.freq(frequency)
+        if duty != self.level:
+            self.level = duty
+            self.buzzer.duty(duty)
+
     def close(self):
         self.buzzer.deinit()
 
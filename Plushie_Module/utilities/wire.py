@@ -0,0 +1,211 @@
+import json
+import struct
+import ubinascii
+
+# Binary hub <-> module messages. Byte 0 is WIRE | VERSION, which tells them
+# apart from OTA packets (0xA7) and the old JSON messages ('{'), which
+# decode() still reads. Keep in step with App_Web/webapp/hubCode/utilities/wire.py
+#
+#   header   '<BBBH'  WIRE | VERSION, topic id, flags, seq (0 unless F_SEQ)
+#   then     rssi 'b' if F_RSSI, at 'I' if F_AT, the value, and for
+#            per-module topics (/scan/<name> ...) the name in the rest
+WIRE = 0xB0
+VERSION = 1
+HEADER = '<BBBH'
+HEADER_SIZE = 5
+F_SEQ, F_RSSI, F_AT = 1, 2, 4
+
+PING, TIME, GAME, NOTIFY, SCAN, SHOW, COLOR, BATTERY, SCAN_REPLY, STATS = range(1, 11)
+
+# topic -> id; a trailing '/' means the module's name follows
+IDS = {'/ping': PING, '/time': TIME, '/game': GAME, '/notify': NOTIFY, '/scan': SCAN,
+       '/show': SHOW, '/color': COLOR, '/battery/': BATTERY, '/scan/': SCAN_REPLY, '/stats/': STATS}
+TOPICS = {v: k for k, v in IDS.items()}
+
+# fixed-size values: id -> struct format (/scan and /color values are tuples)
+FORMATS = {PING: '<B', TIME: '<I', GAME: '<b', NOTIFY: '<B', SCAN: '<HHHH', COLOR: '<BBB', BATTERY: '<B'}
+
+SCAN_REPLY_FMT = '<BHHB'            # battery, slot, nonce, len(module type) + module type
+STATS_FMT = '<8HHHIHHHII'           # see Plushie_Module/utilities/metrics.py snapshot()
+STATS_KEYS = ('q', 'd', 'n', 'l', 'L', 'w', 'm', 'M')
+SHOW_FMT = '<BHHHB'                 # n, i * 1000 (NO_VALUE = module's own), led, dt, keyframes
+FRAME_FMT = '<BBBBH'                # color index (RGB = r, g, b follow), r, g, b, ms
+RGB = 0xFF
+NO_BATTERY = 0xFF
+NO_VALUE = 0xFFFF
+
+def _u16(v):
+    return min(max(int(v), 0), 0xFFFF)
+
+def _battery(level):
+    return NO_BATTERY if level is None else min(max(int(level + 0.5), 0), 254)
+
+def _pack_show(program):
+    frames = program.get('k', [])
+    i = program.get('i')
+    out = [struct.pack(SHOW_FMT, program.get('n', 1), NO_VALUE if i is None else _u16(i * 1000),
+                       _u16(program.get('led', 0)), _u16(program.get('dt', 0)), len(frames))]
+    for color, ms in frames:
+        if isinstance(color, int):
+            out.append(struct.pack(FRAME_FMT, color, 0, 0, 0, _u16(ms)))
+        else:
+            out.append(struct.pack(FRAME_FMT, RGB, color[0], color[1], color[2], _u16(ms)))
+    order = program.get('by')
+    if isinstance(order, list):    # mac suffixes, 3 bytes each
+        out.append(bytes((len(order),)))
+        out += [ubinascii.unhexlify(m) for m in order]
+    return b''.join(out)
+
+def _unpack_show(msg, pos):
+    n, i, led, dt, count = struct.unpack_from(SHOW_FMT, msg, pos)
+    pos += 8
+    frames = []
+    for k in range(count):
+        c, r, g, b, ms = struct.unpack_from(FRAME_FMT, msg, pos)
+        frames.append([[r, g, b] if c == RGB else c, ms])
+        pos += 6
+    program = {'k': frames, 'n': n}
+    if i != NO_VALUE:
+        program['i'] = i / 1000
+    if led:
+        program['led'] = led
+    if dt:
+        program['dt'] = dt
+    if pos < len(msg):
+        program['by'] = [ubinascii.hexlify(msg[pos + 1 + 3 * k:pos + 4 + 3 * k]).decode() for k in range(msg[pos])]
+    return program, len(msg)
+
+def _pack_value(tid, value):
+    fmt = FORMATS.get(tid)
+    if tid == BATTERY:
+        return struct.pack(fmt, _battery(value))
+    if tid == COLOR or tid == SCAN:
+        return struct.pack(fmt, *value)
+    if fmt:
+        return struct.pack(fmt, value)
+    if tid == SHOW:
+        return _pack_show(value)
+    if tid == SCAN_REPLY:
+        battery, kind, slot, nonce = value
+        kind = kind.encode()
+        return struct.pack(SCAN_REPLY_FMT, _battery(battery), slot, nonce, len(kind)) + kind
+    # STATS
+    fields = [_u16(b) for b in value['j']] + [_u16(value['q']), _u16(value['d']), value['n'], _u16(value['l']),
+                                              _u16(value['L']), _u16(value['w']), value['m'], value['M']]
+    return struct.pack(STATS_FMT, *fields)
+
+def _unpack_value(tid, msg, pos):
+    # returns (value, position after it)
+    fmt = FORMATS.get(tid)
+    if fmt:
+        value = struct.unpack_from(fmt, msg, pos)
+        size = struct.calcsize(fmt)
+        if tid == COLOR:
+            return list(value), pos + size
+        if tid == SCAN:
+            return value, pos + size
+        if tid == BATTERY:
+            return (None if value[0] == NO_BATTERY else value[0]), pos + size
+        return value[0], pos + size
+    if tid == SHOW:
+        return _unpack_show(msg, pos)
+    if tid == SCAN_REPLY:
+        battery, slot, nonce, size = struct.unpack_from(SCAN_REPLY_FMT, msg, pos)
+        pos += 6
+        kind = bytes(msg[pos:pos + size]).decode()
+        return ((None if battery == NO_BATTERY else battery), kind, slot, nonce), pos + size
+    # STATS
+    v = struct.unpack_from(STATS_FMT, msg, pos)
+    stats = {'j': list(v[:8])}
+    for k, key in enumerate(STATS_KEYS):
+        stats[key] = v[8 + k]
+    return stats, pos + struct.calcsize(STATS_FMT)
+
+def encode(topic, value, seq = None, rssi = None, at = None):
+    # one message as bytes; topics without an id go out as JSON
+    name = ''
+    tid = IDS.get(topic)
+    if tid is None:
+        cut = topic.find('/', 1) + 1
+        if cut:
+            tid = IDS.get(topic[:cut])
+            name = topic[cut:]
+    if tid is None:
+        msg = {'topic': topic, 'value': value}
+        if seq is not None:
+            msg['seq'] = seq
+        if rssi is not None:
+            msg['rssi'] = rssi
+        if at is not None:
+            msg['at'] = at
+        return json.dumps(msg)
+    flags = (F_SEQ if seq is not None else 0) | (F_RSSI if rssi is not None else 0) | (F_AT if at is not None else 0)
+    out = struct.pack(HEADER, WIRE | VERSION, tid, flags, seq or 0)
+    if rssi is not None:
+        out += struct.pack('<b', rssi)
+    if at is not None:
+        out += struct.pack('<I', at)
+    return out + _pack_value(tid, value) + name.encode()
+
+class Packet:
+    # one message packed ahead of time (at startup) into a bytearray; seq,
+    # rssi, at and a fixed-size value are patched in place with pack_into, so
+    # sending it again allocates nothing. Reserve rssi/at when building it.
+    # A broadcast repeat still queued sends the newest fill, which replaces
+    # the older message anyway.
+    def __init__(self, topic, value, seq = False, rssi = False, at = False):
+        self.buf = bytearray(encode(topic, value, 0 if seq else None, -128 if rssi else None, 0 if at else None))
+        self.fmt = FORMATS.get(self.buf[1])
+        self.at_pos = HEADER_SIZE + (1 if rssi else 0)
+        self.value_pos = self.at_pos + (4 if at else 0)
+
+    def fill(self, seq = None, rssi = None, at = None):
+        # patch the fields that were reserved; returns the buffer to send
+        buf = self.buf
+        if seq is not None:
+            struct.pack_into('<H', buf, 3, seq)
+        if rssi is not None:
+            struct.pack_into('<b', buf, HEADER_SIZE, rssi)
+        if at is not None:
+            struct.pack_into('<I', buf, self.at_pos, at)
+        return buf
+
+    def set(self, *value):
+        # new value for a fixed-size topic (/time, /scan, /color ...)
+        struct.pack_into(self.fmt, self.buf, self.value_pos, *value)
+        return self.buf
+
+def _legacy(msg):
+    payload = json.loads(msg)
+    topic = payload['topic']
+    value = payload['value']
+    if topic == '/game' and isinstance(value, (list, tuple)):
+        value = value[0]    # (game, base64 hub mac) - the mac is in the ESP-NOW header anyway
+    return topic, value, payload.get('seq'), payload.get('rssi'), payload.get('at')
+
+def decode(msg):
+    # (topic, value, seq, rssi, at) - seq, rssi and at are None when not sent;
+    # None for anything that is neither a known binary message nor JSON
+    try:
+        if msg[0] & 0xF0 != WIRE:
+            return _legacy(msg)
+        if msg[0] & 0x0F != VERSION:
+            return None
+        magic, tid, flags, seq = struct.unpack_from(HEADER, msg)
+        if tid not in TOPICS:
+            return None
+        pos = HEADER_SIZE
+        rssi = at = None
+        if flags & F_RSSI:
+            rssi = struct.unpack_from('<b', msg, pos)[0]
+            pos += 1
+        if flags & F_AT:
+            at = struct.unpack_from('<I', msg, pos)[0]
+            pos += 4
+        value, pos = _unpack_value(tid, msg, pos)
+        topic = TOPICS[tid]
+        if topic[-1] == '/':
+            topic += bytes(msg[pos:]).decode()
+        return topic, value, seq if flags & F_SEQ else None, rssi, at
+    except Exception:
+        return None
